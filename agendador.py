@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Rotinas periódicas executadas dentro do processo da aplicação.
+
+O agendador é iniciado no startup do FastAPI: cada rotina roda em uma tarefa
+asyncio que executa a função em uma thread (com sessão de banco própria) e dorme
+o intervalo configurado. Rotinas que dependem da data também acordam logo após a
+meia-noite. Execuções, falhas e tempos ficam em GET /health/agendador.
+
+Rotinas:
+    contas_vencidas  contas a pagar/receber PENDENTE com vencimento passado viram
+                     VENCIDO (e voltam a PENDENTE se o vencimento for adiado), com
+                     um UPDATE por tabela; a cada VARREDURA_VENCIDOS_INTERVALO segundos
+
+Os resumos mensais só contam contas pagas e não mudam com a varredura; o cache
+dos usuários afetados é invalidado. Com vários workers, só o processo que obtém a
+trava de arquivo AGENDADOR_TRAVA executa as rotinas; os demais tentam obtê-la a
+cada AGENDADOR_TRAVA_INTERVALO segundos (assumem se o worker dono encerrar). Para
+executar fora do servidor, use AGENDADOR_ATIVO=false e agende o comando abaixo
+(ex.: cron):
+    python agendador.py --contas-vencidas
+"""
+import argparse
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.orm import Session
+from config import VARREDURA_VENCIDOS_INTERVALO, AGENDADOR_TRAVA, AGENDADOR_TRAVA_INTERVALO
+from database import SessionLocal
+from models import ContaPagar, ContaReceber, StatusConta
+from cache import marcar_usuario_alterado
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Rotina:
+    nome: str
+    intervalo: int  # segundos
+    funcao: Callable[[Session], dict]
+    virada_do_dia: bool = False  # acordar também à meia-noite
+    execucoes: int = 0
+    falhas: int = 0
+    ultima_execucao: Optional[datetime] = None
+    ultima_duracao_ms: Optional[float] = None
+    duracao_total_ms: float = 0.0
+    ultimo_resultado: Optional[dict] = None
+    ultimo_erro: Optional[str] = None
+
+    def espera(self) -> float:
+        """Segundos até a próxima execução"""
+        if not self.virada_do_dia:
+            return self.intervalo
+        agora = datetime.now()
+        meia_noite = datetime.combine(agora.date() + timedelta(days=1), datetime.min.time())
+        return min(self.intervalo, (meia_noite - agora).total_seconds() + 1)
+
+    def estatisticas(self) -> dict:
+        return {
+            "intervalo": self.intervalo,
+            "execucoes": self.execucoes,
+            "falhas": self.falhas,
+            "ultima_execucao": self.ultima_execucao.isoformat() if self.ultima_execucao else None,
+            "ultima_duracao_ms": self.ultima_duracao_ms,
+            "duracao_media_ms": round(self.duracao_total_ms / self.execucoes, 2) if self.execucoes else None,
+            "ultimo_resultado": self.ultimo_resultado,
+            "ultimo_erro": self.ultimo_erro,
+        }
+
+
+class Agendador:
+    """Executa as rotinas registradas enquanto a aplicação estiver no ar"""
+
+    def __init__(self, trava: str = AGENDADOR_TRAVA, intervalo_trava: int = AGENDADOR_TRAVA_INTERVALO):
+        self.rotinas: Dict[str, Rotina] = {}
+        self.trava = trava
+        self.intervalo_trava = intervalo_trava
+        self._arquivo_trava = None
+        self._tarefas: List[asyncio.Task] = []
+
+    def registrar(self, nome: str, intervalo: int, funcao: Callable[[Session], dict], virada_do_dia: bool = False):
+        self.rotinas[nome] = Rotina(nome, intervalo, funcao, virada_do_dia)
+
+    def executar(self, rotina: Rotina):
+        """Executa a rotina uma vez, registrando o tempo e o resultado ou o erro"""
+        inicio = time.perf_counter()
+        db = SessionLocal()
+        try:
+            rotina.ultimo_resultado = rotina.funcao(db)
+            rotina.ultimo_erro = None
+        except Exception as erro:
+            db.rollback()
+            logger.exception("Rotina %s falhou", rotina.nome)
+            rotina.falhas += 1
+            rotina.ultimo_erro = str(erro)
+        finally:
+            db.close()
+            duracao = (time.perf_counter() - inicio) * 1000
+            rotina.execucoes += 1
+            rotina.ultima_execucao = datetime.now()
+            rotina.ultima_duracao_ms = round(duracao, 2)
+            rotina.duracao_total_ms += duracao
+
+    async def _laco(self, rotina: Rotina):
+        loop = asyncio.get_running_loop()
+        while True:
+            await loop.run_in_executor(None, self.executar, rotina)
+            await asyncio.sleep(rotina.espera())
+
+    def _obter_trava(self) -> bool:
+        """Trava exclusiva de arquivo, liberada pelo sistema se o processo encerrar"""
+        if self._arquivo_trava is not None:
+            return True
+        try:
+            import fcntl
+        except ImportError:  # Windows: sem trava entre processos (use um único worker)
+            self._arquivo_trava = True
+            return True
+        arquivo = open(self.trava, "a")
+        try:
+            fcntl.flock(arquivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            arquivo.close()
+            return False
+        self._arquivo_trava = arquivo
+        return True
+
+    def _liberar_trava(self):
+        if self._arquivo_trava not in (None, True):
+            self._arquivo_trava.close()  # fechar o arquivo libera o flock
+        self._arquivo_trava = None
+
+    def _iniciar_rotinas(self):
+        self._tarefas += [asyncio.create_task(self._laco(rotina)) for rotina in self.rotinas.values()]
+
+    async def _aguardar_trava(self):
+        while not self._obter_trava():
+            await asyncio.sleep(self.intervalo_trava)
+        logger.info("Agendador assumido por este processo")
+        self._iniciar_rotinas()
+
+    def iniciar(self):
+        """Inicia as rotinas no event loop atual (chamar no startup), se este processo
+        obtiver a trava; senão, fica tentando obtê-la"""
+        if self._tarefas:
+            return
+        if self._obter_trava():
+            self._iniciar_rotinas()
+        else:
+            logger.info("Agendador ativo em outro processo; aguardando a trava %s", self.trava)
+            self._tarefas = [asyncio.create_task(self._aguardar_trava())]
+
+    async def parar(self):
+        for tarefa in self._tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+        self._tarefas = []
+        self._liberar_trava()
+
+    def estatisticas(self) -> dict:
+        return {
+            "ativo": self._arquivo_trava is not None and bool(self._tarefas),
+            "rotinas": {nome: rotina.estatisticas() for nome, rotina in self.rotinas.items()},
+        }
+
+
+# ==================== ROTINAS ====================
+
+def marcar_contas_vencidas(db: Session, hoje: Optional[date] = None) -> dict:
+    """Marca como VENCIDO as contas pendentes com vencimento anterior a hoje e devolve a
+    PENDENTE as vencidas cujo vencimento foi adiado. Um UPDATE por tabela e sentido."""
+    hoje = hoje or date.today()
+    resultado = {}
+    for modelo in (ContaPagar, ContaReceber):
+        transicoes = (
+            ("vencidas", StatusConta.VENCIDO,
+             and_(modelo.status == StatusConta.PENDENTE, modelo.data_vencimento < hoje)),
+            ("reabertas", StatusConta.PENDENTE,
+             and_(modelo.status == StatusConta.VENCIDO, modelo.data_vencimento >= hoje)),
+        )
+        for nome, novo_status, filtro in transicoes:
+            user_ids = db.scalars(select(modelo.user_id).where(filtro).distinct()).all()
+            quantidade = 0
+            if user_ids:
+                quantidade = db.execute(
+                    update(modelo).where(filtro).values(status=novo_status, updated_at=func.now()),
+                    execution_options={"synchronize_session": False}
+                ).rowcount
+                # O UPDATE em lote não passa pelo flush: invalidar o cache aqui
+                for user_id in user_ids:
+                    marcar_usuario_alterado(db, user_id)
+            resultado[f"{modelo.__tablename__}_{nome}"] = quantidade
+    db.commit()
+    return resultado
+
+
+agendador = Agendador()
+agendador.registrar("contas_vencidas", VARREDURA_VENCIDOS_INTERVALO, marcar_contas_vencidas, virada_do_dia=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--contas-vencidas", action="store_true", help="Executar a varredura de contas vencidas")
+    args = parser.parse_args()
+
+    if not args.contas_vencidas:
+        parser.print_help()
+        return
+
+    rotina = agendador.rotinas["contas_vencidas"]
+    agendador.executar(rotina)
+    if rotina.ultimo_erro:
+        print(f"❌ Erro: {rotina.ultimo_erro}")
+        return
+    print(f"✅ Varredura concluída em {rotina.ultima_duracao_ms} ms: {rotina.ultimo_resultado}")
+
+
+if __name__ == "__main__":
+    main()
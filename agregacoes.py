@@ -0,0 +1,211 @@
+"""
+Motor de agregação mensal do módulo financeiro.
+
+Calcula todos os totais mensais de um usuário (receitas, despesas, investido,
+metas, contagens por status e quebras por categoria) com uma única consulta
+agrupada por tabela. Os endpoints de relatório montam suas respostas a partir
+do resultado, em vez de disparar uma consulta por métrica e por mês.
+"""
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import func, case, and_, or_
+from sqlalchemy.orm import Session
+from models import (
+    ContaPagar, ContaReceber, Investimento, TransacaoMeta, MetaFinanceira,
+    CategoriaConta, StatusConta, StatusMeta
+)
+from periodos import primeiro_dia, filtro_intervalo
+
+
+@dataclass
+class TotaisMes:
+    """Totais de um único mês"""
+    total_receitas: float = 0.0
+    total_despesas: float = 0.0
+    total_investido: float = 0.0
+    total_metas: float = 0.0
+    contas_pagas: int = 0
+    contas_vencidas: int = 0
+    metas_concluidas: int = 0
+    # categoria -> (total, quantidade)
+    receitas_por_categoria: Dict[CategoriaConta, Tuple[float, int]] = field(default_factory=dict)
+    despesas_por_categoria: Dict[CategoriaConta, Tuple[float, int]] = field(default_factory=dict)
+
+    @property
+    def saldo_mensal(self) -> float:
+        return self.total_receitas - self.total_despesas
+
+
+class AgregadoMensal:
+    """Resultado da agregação de um intervalo de meses"""
+
+    def __init__(self, inicio: date, fim: date):
+        self.inicio = inicio
+        self.fim = fim
+        self.meses: Dict[Tuple[int, int], TotaisMes] = {}
+        self.metas_ativas = 0
+
+    def _obter(self, ano: int, mes: int) -> TotaisMes:
+        chave = (int(ano), int(mes))
+        if chave not in self.meses:
+            self.meses[chave] = TotaisMes()
+        return self.meses[chave]
+
+    def mes(self, mes: int, ano: int) -> TotaisMes:
+        """Totais do mês; meses sem movimentação retornam zerados"""
+        if not (self.inicio <= primeiro_dia(mes, ano) < self.fim):
+            raise ValueError(f"Mês {mes}/{ano} fora do intervalo agregado")
+        return self.meses.get((ano, mes)) or TotaisMes()
+
+    def saldo_entre(self, inicio: date, fim: date) -> float:
+        """Soma dos saldos mensais dos meses em [inicio, fim)"""
+        return sum(
+            totais.saldo_mensal
+            for (ano, mes), totais in self.meses.items()
+            if inicio <= date(ano, mes, 1) < fim
+        )
+
+
+def extrair_ano_mes(coluna):
+    """Expressões de ano e mês da coluna (para SELECT/GROUP BY, não para filtros)"""
+    return func.extract('year', coluna), func.extract('month', coluna)
+
+
+def agregar_totais_mensais(db: Session, user_id: int, inicio: date, fim: date) -> AgregadoMensal:
+    """Agrega os totais mensais do usuário no intervalo [inicio, fim)"""
+    agregado = AgregadoMensal(inicio, fim)
+
+    # Receitas recebidas, por mês e categoria
+    ano, mes = extrair_ano_mes(ContaReceber.data_recebimento)
+    receitas = db.query(
+        ano, mes, ContaReceber.categoria,
+        func.sum(ContaReceber.valor), func.count(ContaReceber.id)
+    ).filter(
+        ContaReceber.user_id == user_id,
+        ContaReceber.status == StatusConta.PAGO,
+        *filtro_intervalo(ContaReceber.data_recebimento, inicio, fim)
+    ).group_by(ano, mes, ContaReceber.categoria).all()
+
+    for r_ano, r_mes, categoria, total, quantidade in receitas:
+        totais = agregado._obter(r_ano, r_mes)
+        totais.total_receitas += total or 0
+        totais.receitas_por_categoria[categoria] = (total or 0, quantidade)
+
+    # Despesas pagas (por data de pagamento) e contas vencidas (por data de vencimento)
+    data_ref = case(
+        (ContaPagar.status == StatusConta.PAGO, ContaPagar.data_pagamento),
+        else_=ContaPagar.data_vencimento
+    )
+    ano, mes = extrair_ano_mes(data_ref)
+    despesas = db.query(
+        ano, mes, ContaPagar.status, ContaPagar.categoria,
+        func.sum(ContaPagar.valor), func.count(ContaPagar.id)
+    ).filter(
+        ContaPagar.user_id == user_id,
+        or_(
+            and_(
+                ContaPagar.status == StatusConta.PAGO,
+                *filtro_intervalo(ContaPagar.data_pagamento, inicio, fim)
+            ),
+            and_(
+                ContaPagar.status == StatusConta.VENCIDO,
+                *filtro_intervalo(ContaPagar.data_vencimento, inicio, fim)
+            )
+        )
+    ).group_by(ano, mes, ContaPagar.status, ContaPagar.categoria).all()
+
+    for d_ano, d_mes, status, categoria, total, quantidade in despesas:
+        totais = agregado._obter(d_ano, d_mes)
+        if status == StatusConta.PAGO:
+            totais.total_despesas += total or 0
+            totais.contas_pagas += quantidade
+            totais.despesas_por_categoria[categoria] = (total or 0, quantidade)
+        else:
+            totais.contas_vencidas += quantidade
+
+    # Valor investido no mês
+    ano, mes = extrair_ano_mes(Investimento.data_investimento)
+    investimentos = db.query(ano, mes, func.sum(Investimento.valor_investido)).filter(
+        Investimento.user_id == user_id,
+        *filtro_intervalo(Investimento.data_investimento, inicio, fim)
+    ).group_by(ano, mes).all()
+
+    for i_ano, i_mes, total in investimentos:
+        agregado._obter(i_ano, i_mes).total_investido = total or 0
+
+    # Aportes em metas no mês
+    ano, mes = extrair_ano_mes(TransacaoMeta.data_transacao)
+    transacoes = db.query(ano, mes, func.sum(TransacaoMeta.valor)).filter(
+        TransacaoMeta.user_id == user_id,
+        *filtro_intervalo(TransacaoMeta.data_transacao, inicio, fim)
+    ).group_by(ano, mes).all()
+
+    for t_ano, t_mes, total in transacoes:
+        agregado._obter(t_ano, t_mes).total_metas = total or 0
+
+    # Metas ativas (total) e concluídas (pelo mês da última atualização)
+    ano, mes = extrair_ano_mes(MetaFinanceira.updated_at)
+    metas = db.query(ano, mes, MetaFinanceira.status, func.count(MetaFinanceira.id)).filter(
+        MetaFinanceira.user_id == user_id,
+        or_(
+            MetaFinanceira.status == StatusMeta.ATIVA,
+            and_(
+                MetaFinanceira.status == StatusMeta.CONCLUIDA,
+                *filtro_intervalo(MetaFinanceira.updated_at, inicio, fim)
+            )
+        )
+    ).group_by(ano, mes, MetaFinanceira.status).all()
+
+    for m_ano, m_mes, status, quantidade in metas:
+        if status == StatusMeta.ATIVA:
+            agregado.metas_ativas += quantidade
+        else:
+            agregado._obter(m_ano, m_mes).metas_concluidas += quantidade
+
+    return agregado
+
+
+# Contribuição de cada modelo para os resumos mensais (ResumoFinanceiro):
+# modelo -> (campo do resumo, coluna de valor, coluna de data, exige status PAGO)
+CONTRIBUICOES_RESUMO = {
+    ContaReceber: ("total_receitas", "valor", "data_recebimento", True),
+    ContaPagar: ("total_despesas", "valor", "data_pagamento", True),
+    Investimento: ("total_investido", "valor_investido", "data_investimento", False),
+    TransacaoMeta: ("total_metas", "valor", "data_transacao", False),
+}
+
+
+def agregar_resumos(
+    db: Session,
+    user_ids: Optional[Iterable[int]] = None,
+    inicio: Optional[date] = None,
+    fim: Optional[date] = None
+) -> Dict[Tuple[int, int, int], TotaisMes]:
+    """Totais dos resumos mensais agrupados por (user_id, ano, mes).
+    Sem user_ids agrega todos os usuários; sem intervalo, todo o histórico."""
+    resultado: Dict[Tuple[int, int, int], TotaisMes] = {}
+    if user_ids is not None:
+        user_ids = list(user_ids)
+
+    for modelo, (campo, coluna_valor, coluna_data, exige_pago) in CONTRIBUICOES_RESUMO.items():
+        data = getattr(modelo, coluna_data)
+        ano, mes = extrair_ano_mes(data)
+        filtros = [data.isnot(None)]
+        if exige_pago:
+            filtros.append(modelo.status == StatusConta.PAGO)
+        if user_ids is not None:
+            filtros.append(modelo.user_id.in_(user_ids))
+        if inicio is not None and fim is not None:
+            filtros.extend(filtro_intervalo(data, inicio, fim))
+
+        linhas = db.query(
+            modelo.user_id, ano, mes, func.sum(getattr(modelo, coluna_valor))
+        ).filter(*filtros).group_by(modelo.user_id, ano, mes).all()
+
+        for user_id, l_ano, l_mes, total in linhas:
+            chave = (user_id, int(l_ano), int(l_mes))
+            totais = resultado.setdefault(chave, TotaisMes())
+            setattr(totais, campo, total or 0)
+
+    return resultado
@@ -0,0 +1,236 @@
+"""
+Armazenamento dos uploads (fotos de perfil)
+
+ARMAZENAMENTO=local grava em UPLOAD_DIR, servido pela própria aplicação em
+/uploads. ARMAZENAMENTO=s3 grava num bucket S3 ou compatível (MinIO, moto_server)
+e /uploads redireciona para a URL pública ou pré-assinada do objeto, para que
+vários nós da aplicação compartilhem os mesmos arquivos. O S3 também aceita
+upload direto do navegador por POST pré-assinado, sem passar pelo uvicorn.
+
+Os nomes são relativos ("ab/cd/<sha256>.webp"); uploads diretos ainda não
+processados ficam em PREFIXO_ENTRADA.
+"""
+import os
+import time
+import uuid
+from typing import Iterator, Optional, Tuple
+from config import (
+    ARMAZENAMENTO, UPLOAD_DIR, ARMAZENAMENTO_S3_BUCKET, ARMAZENAMENTO_S3_ENDPOINT, ARMAZENAMENTO_S3_REGIAO,
+    ARMAZENAMENTO_S3_ACCESS_KEY, ARMAZENAMENTO_S3_SECRET_KEY, ARMAZENAMENTO_URL_PUBLICA, ARMAZENAMENTO_URL_EXPIRACAO,
+)
+
+PREFIXO_ENTRADA = "entrada/"
+
+
+class UploadDiretoIndisponivel(RuntimeError):
+    """O backend não oferece upload direto (armazenamento local)"""
+
+
+def _nome_seguro(nome: str) -> str:
+    partes = nome.split("/")
+    if not nome or nome.startswith("/") or "\\" in nome or any(parte in ("", ".", "..") for parte in partes):
+        raise ValueError(f"Nome de arquivo inválido: {nome!r}")
+    return nome
+
+
+class ArmazenamentoLocal:
+    """Arquivos em uma pasta local (um único nó, ou pasta compartilhada via NFS)"""
+
+    tipo = "local"
+
+    def __init__(self, pasta: str = UPLOAD_DIR):
+        self.pasta = pasta
+        os.makedirs(pasta, exist_ok=True)
+
+    def _caminho(self, nome: str) -> str:
+        return os.path.join(self.pasta, *_nome_seguro(nome).split("/"))
+
+    def existe(self, nome: str) -> bool:
+        return os.path.exists(self._caminho(nome))
+
+    def tamanho(self, nome: str) -> int:
+        return os.path.getsize(self._caminho(nome))
+
+    def modificado_em(self, nome: str) -> Optional[float]:
+        """Data de modificação (timestamp), ou None se o arquivo não existe"""
+        try:
+            return os.path.getmtime(self._caminho(nome))
+        except FileNotFoundError:
+            return None
+
+    def tocar(self, nome: str, tipo_conteudo: str = None, cache_control: str = None) -> bool:
+        """Renova a data de modificação; False se o arquivo não existe"""
+        try:
+            os.utime(self._caminho(nome))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def gravar(self, nome: str, conteudo: bytes, tipo_conteudo: str = None, cache_control: str = None):
+        """Grava de forma atômica (arquivo temporário + rename)"""
+        caminho = self._caminho(nome)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        temporario = f"{caminho}.{uuid.uuid4().hex}.tmp"
+        with open(temporario, "wb") as destino:
+            destino.write(conteudo)
+        os.replace(temporario, caminho)
+
+    def baixar(self, nome: str, destino: str):
+        with open(self._caminho(nome), "rb") as origem, open(destino, "wb") as saida:
+            while bloco := origem.read(64 * 1024):
+                saida.write(bloco)
+
+    def remover(self, nome: str):
+        """Remove o arquivo e as subpastas que ficarem vazias"""
+        caminho = self._caminho(nome)
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            return
+        pasta = os.path.dirname(caminho)
+        while os.path.abspath(pasta) != os.path.abspath(self.pasta) and not os.listdir(pasta):
+            os.rmdir(pasta)
+            pasta = os.path.dirname(pasta)
+
+    def listar(self) -> Iterator[Tuple[str, float]]:
+        """(nome, data de modificação) de todos os arquivos"""
+        for raiz, _, arquivos in os.walk(self.pasta):
+            for arquivo in arquivos:
+                caminho = os.path.join(raiz, arquivo)
+                yield os.path.relpath(caminho, self.pasta).replace(os.sep, "/"), os.path.getmtime(caminho)
+
+    def url(self, nome: str) -> str:
+        return f"/uploads/{nome}"
+
+    def url_upload_direto(self, chave: str, tamanho_maximo: int) -> dict:
+        raise UploadDiretoIndisponivel("Upload direto requer ARMAZENAMENTO=s3")
+
+
+class ArmazenamentoS3:
+    """Objetos em um bucket S3 ou compatível (MinIO, moto_server)"""
+
+    tipo = "s3"
+
+    def __init__(
+        self, bucket: str = ARMAZENAMENTO_S3_BUCKET, endpoint: Optional[str] = ARMAZENAMENTO_S3_ENDPOINT,
+        regiao: str = ARMAZENAMENTO_S3_REGIAO, access_key: Optional[str] = ARMAZENAMENTO_S3_ACCESS_KEY,
+        secret_key: Optional[str] = ARMAZENAMENTO_S3_SECRET_KEY, url_publica: Optional[str] = ARMAZENAMENTO_URL_PUBLICA,
+        expiracao: int = ARMAZENAMENTO_URL_EXPIRACAO,
+    ):
+        try:
+            import boto3
+            from botocore.config import Config
+        except ImportError:
+            raise RuntimeError("ARMAZENAMENTO=s3 requer o pacote 'boto3' (pip install boto3)")
+        if not bucket:
+            raise RuntimeError("ARMAZENAMENTO=s3 requer ARMAZENAMENTO_S3_BUCKET")
+
+        self.bucket = bucket
+        self.url_publica = url_publica.rstrip("/") if url_publica else None
+        self.expiracao = expiracao
+        # Sem credenciais explícitas, usa a cadeia padrão do boto3 (variáveis AWS_*, perfil, IAM)
+        # O cliente do boto3 é seguro entre threads: um só para a aplicação
+        self.cliente = boto3.client(
+            "s3", endpoint_url=endpoint, region_name=regiao,
+            aws_access_key_id=access_key, aws_secret_access_key=secret_key,
+            config=Config(signature_version="s3v4", s3={"addressing_style": "path"} if endpoint else {}),
+        )
+
+    def _nao_encontrado(self, erro) -> bool:
+        return erro.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+    def existe(self, nome: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.cliente.head_object(Bucket=self.bucket, Key=_nome_seguro(nome))
+            return True
+        except ClientError as erro:
+            if self._nao_encontrado(erro):
+                return False
+            raise
+
+    def tamanho(self, nome: str) -> int:
+        return self.cliente.head_object(Bucket=self.bucket, Key=_nome_seguro(nome))["ContentLength"]
+
+    def modificado_em(self, nome: str) -> Optional[float]:
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.cliente.head_object(Bucket=self.bucket, Key=_nome_seguro(nome))["LastModified"].timestamp()
+        except ClientError as erro:
+            if self._nao_encontrado(erro):
+                return None
+            raise
+
+    def tocar(self, nome: str, tipo_conteudo: str = None, cache_control: str = None) -> bool:
+        """Renova o LastModified copiando o objeto sobre ele mesmo (o S3 exige trocar os
+        metadados: os mesmos Content-Type e Cache-Control são regravados); False se o
+        objeto não existe"""
+        from botocore.exceptions import ClientError
+
+        chave = _nome_seguro(nome)
+        extras = {}
+        if tipo_conteudo:
+            extras["ContentType"] = tipo_conteudo
+        if cache_control:
+            extras["CacheControl"] = cache_control
+        try:
+            self.cliente.copy_object(
+                Bucket=self.bucket, Key=chave, CopySource={"Bucket": self.bucket, "Key": chave},
+                MetadataDirective="REPLACE", **extras,
+            )
+        except ClientError as erro:
+            if self._nao_encontrado(erro):
+                return False
+            raise
+        return True
+
+    def gravar(self, nome: str, conteudo: bytes, tipo_conteudo: str = None, cache_control: str = None):
+        """PUT do objeto; Content-Type e Cache-Control ficam gravados e são servidos pelo S3/CDN"""
+        extras = {}
+        if tipo_conteudo:
+            extras["ContentType"] = tipo_conteudo
+        if cache_control:
+            extras["CacheControl"] = cache_control
+        self.cliente.put_object(Bucket=self.bucket, Key=_nome_seguro(nome), Body=conteudo, **extras)
+
+    def baixar(self, nome: str, destino: str):
+        self.cliente.download_file(self.bucket, _nome_seguro(nome), destino)
+
+    def remover(self, nome: str):
+        self.cliente.delete_object(Bucket=self.bucket, Key=_nome_seguro(nome))
+
+    def listar(self) -> Iterator[Tuple[str, float]]:
+        paginador = self.cliente.get_paginator("list_objects_v2")
+        for pagina in paginador.paginate(Bucket=self.bucket):
+            for objeto in pagina.get("Contents", []):
+                yield objeto["Key"], objeto["LastModified"].timestamp()
+
+    def url(self, nome: str) -> str:
+        """URL pública (bucket público ou CDN) ou, sem ela, GET pré-assinado"""
+        if self.url_publica:
+            return f"{self.url_publica}/{_nome_seguro(nome)}"
+        return self.cliente.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": _nome_seguro(nome)}, ExpiresIn=self.expiracao
+        )
+
+    def url_upload_direto(self, chave: str, tamanho_maximo: int) -> dict:
+        """POST pré-assinado: o navegador envia o arquivo direto ao bucket, limitado
+        a tamanho_maximo pela própria política da assinatura"""
+        assinatura = self.cliente.generate_presigned_post(
+            self.bucket, _nome_seguro(chave),
+            Conditions=[["content-length-range", 1, tamanho_maximo]], ExpiresIn=self.expiracao,
+        )
+        return {"url": assinatura["url"], "campos": assinatura["fields"], "expira_em": int(time.time()) + self.expiracao}
+
+
+def criar_armazenamento(tipo: str = ARMAZENAMENTO):
+    if tipo == "s3":
+        return ArmazenamentoS3()
+    if tipo == "local":
+        return ArmazenamentoLocal()
+    raise RuntimeError(f"ARMAZENAMENTO='{tipo}' inválido; use local ou s3")
+
+
+armazenamento = criar_armazenamento()
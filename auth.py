@@ -1,17 +1,30 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_db, get_async_db, sessao_de_leitura, sessao_async
 from models import User
 from schemas import TokenData
-from config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from config import (
+    SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, BCRYPT_ROUNDS, BCRYPT_WORKERS, BCRYPT_MAX_PENDENTES,
+    DATABASE_READ_URL
+)
+from cache import obter_principal, guardar_principal, escrita_recente
 
 # Configuração de hash de senha
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# Pool dedicado ao bcrypt: mantém o event loop e o threadpool das demais rotas livres.
+# O bcrypt libera o GIL, então threads bastam para usar todos os núcleos.
+_pool_senhas = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+_vagas_senhas = threading.BoundedSemaphore(BCRYPT_WORKERS + BCRYPT_MAX_PENDENTES)
 
 # Configuração de autenticação
 security = HTTPBearer()
@@ -24,6 +37,28 @@ def get_password_hash(password: str) -> str:
     """Gera hash da senha"""
     return pwd_context.hash(password)
 
+async def _executar_no_pool_senhas(funcao, *args):
+    """Executa a função no pool do bcrypt; com a fila cheia responde 503 em vez de enfileirar"""
+    if not _vagas_senhas.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado, tente novamente",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_pool_senhas, funcao, *args)
+    finally:
+        _vagas_senhas.release()
+
+async def verificar_senha_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verifica a senha fora do event loop. Retorna (válida, novo hash), onde o novo hash
+    vem preenchido quando o hash salvo usa outro custo e deve ser substituído"""
+    return await _executar_no_pool_senhas(pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def gerar_hash_senha_async(password: str) -> str:
+    """Gera o hash da senha fora do event loop"""
+    return await _executar_no_pool_senhas(pwd_context.hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Cria token JWT"""
     to_encode = data.copy()
@@ -47,22 +82,62 @@ def verify_token(token: str, credentials_exception):
         raise credentials_exception
     return token_data
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
-    """Obtém o usuário atual baseado no token"""
-    credentials_exception = HTTPException(
+def _credenciais_invalidas() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
-    token = credentials.credentials
+
+def _carregar_usuario_do_token(db: Session, token: str) -> User:
+    """Valida o token, busca o usuário no banco e o guarda no cache de principais"""
+    credentials_exception = _credenciais_invalidas()
     token_data = verify_token(token, credentials_exception)
     
     user = db.query(User).filter(User.username == token_data.username).first()
     if user is None:
         raise credentials_exception
+    
+    expira_em = jwt.get_unverified_claims(token).get("exp", 0)
+    guardar_principal(token, user, int(expira_em - time.time()))
     return user
 
+def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+    """Obtém o usuário atual baseado no token"""
+    token = credentials.credentials
+    
+    # Token já validado recentemente: dispensa a consulta ao banco.
+    # Mudanças de role, status ou senha invalidam a entrada (ver cache.py).
+    user = obter_principal(token)
+    if user is not None:
+        return user
+    
+    return _carregar_usuario_do_token(db, token)
+
+async def get_current_user_async(credentials: HTTPAuthorizationCredentials = Depends(security), db=Depends(get_async_db)):
+    """Obtém o usuário atual nas rotas assíncronas (sessão de get_async_db)"""
+    token = credentials.credentials
+    
+    user = obter_principal(token)
+    if user is not None:
+        return user
+    
+    return await db.run_sync(_carregar_usuario_do_token, token)
+
+def _ler_da_replica(user_id: int) -> bool:
+    """Réplica configurada e nenhuma escrita recente do usuário (ler as próprias escritas)"""
+    return bool(DATABASE_READ_URL) and not escrita_recente(user_id)
+
+def get_read_db(current_user: User = Depends(get_current_user)):
+    """Sessão dos relatórios: réplica de leitura (DATABASE_READ_URL), ou o primário se o
+    usuário escreveu há menos de LEITURA_JANELA_ESCRITA segundos"""
+    yield from sessao_de_leitura(_ler_da_replica(current_user.id))
+
+async def get_async_read_db(current_user: User = Depends(get_current_user_async)):
+    """Versão assíncrona de get_read_db"""
+    async for db in sessao_async(_ler_da_replica(current_user.id)):
+        yield db
+
 def get_current_active_user(current_user: User = Depends(get_current_user)):
     """Obtém usuário ativo atual"""
     if not current_user.is_active:
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Teste de carga das rotas de leitura do financeiro
+
+Autentica uma vez e dispara requisições simultâneas (200 clientes por padrão)
+contra dashboard, dashboard-mensal e listagens de um servidor em execução,
+medindo vazão e latência (p50/p99) de cada rota. Para comparar o caminho
+síncrono com o assíncrono, rode o servidor com DB_ASYNC=false e depois com
+DB_ASYNC=true; desative o cache para medir o banco e não o cache.
+
+Uso:
+    CACHE_BACKEND=desativado DB_ASYNC=false python run.py      # em outro terminal
+    python benchmark_carga.py
+    CACHE_BACKEND=desativado DB_ASYNC=true python run.py
+    python benchmark_carga.py --clientes 200 --requisicoes 2000
+"""
+import argparse
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROTAS = [
+    "/api/financeiro/dashboard",
+    "/api/financeiro/dashboard-mensal",
+    "/api/financeiro/contas-pagar?limite=50",
+    "/api/financeiro/contas-receber?limite=50",
+    "/api/financeiro/investimentos?limite=50",
+]
+
+
+def requisitar(url, dados=None, token=None):
+    """Executa a requisição e retorna (status, segundos, corpo)"""
+    corpo = json.dumps(dados).encode() if dados is not None else None
+    cabecalhos = {"Content-Type": "application/json"}
+    if token:
+        cabecalhos["Authorization"] = f"Bearer {token}"
+    pedido = urllib.request.Request(url, data=corpo, headers=cabecalhos)
+    inicio = time.perf_counter()
+    try:
+        with urllib.request.urlopen(pedido, timeout=120) as resposta:
+            conteudo = resposta.read()
+            codigo = resposta.status
+    except urllib.error.HTTPError as erro:
+        conteudo, codigo = b"", erro.code
+    except (urllib.error.URLError, OSError):
+        conteudo, codigo = b"", 0
+    return codigo, time.perf_counter() - inicio, conteudo
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def resumir(nome, resultados, duracao):
+    tempos = [segundos * 1000 for _, segundos, _ in resultados]
+    codigos = {}
+    for codigo, _, _ in resultados:
+        codigos[codigo] = codigos.get(codigo, 0) + 1
+    print(f"\n▶ GET {nome}")
+    print(f"  requisições: {len(resultados)}  status: {codigos}")
+    print(f"  p50: {statistics.median(tempos):.1f} ms  p99: {percentil(tempos, 99):.1f} ms  "
+          f"máx: {max(tempos):.1f} ms")
+    print(f"  vazão: {len(resultados) / duracao:.1f} req/s")
+    return len(resultados) / duracao
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000", help="URL base do servidor")
+    parser.add_argument("--usuario", default="admin")
+    parser.add_argument("--senha", default="admin123")
+    parser.add_argument("--clientes", type=int, default=200, help="Requisições simultâneas")
+    parser.add_argument("--requisicoes", type=int, default=1000, help="Requisições por rota")
+    parser.add_argument("--rota", action="append", help="Rota a testar (pode repetir); padrão: rotas de leitura")
+    args = parser.parse_args()
+
+    codigo, _, _ = requisitar(f"{args.url}/health")
+    if codigo != 200:
+        print(f"❌ Servidor não respondeu em {args.url}/health")
+        return
+
+    codigo, _, corpo = requisitar(f"{args.url}/auth/login", {"username": args.usuario, "password": args.senha})
+    if codigo != 200:
+        print(f"❌ Login falhou ({codigo})")
+        return
+    token = json.loads(corpo)["access_token"]
+
+    print(f"🔄 {args.requisicoes} requisições por rota com {args.clientes} clientes em {args.url}...")
+    vazoes = []
+    with ThreadPoolExecutor(max_workers=args.clientes) as executor:
+        for rota in args.rota or ROTAS:
+            inicio = time.perf_counter()
+            resultados = list(executor.map(
+                lambda _: requisitar(f"{args.url}{rota}", token=token), range(args.requisicoes)
+            ))
+            vazoes.append(resumir(rota, resultados, time.perf_counter() - inicio))
+
+    print(f"\n📊 Vazão média: {statistics.mean(vazoes):.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
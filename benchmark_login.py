@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark de login sob concorrência
+
+Dispara logins simultâneos contra um servidor em execução e mede a latência
+(p50/p99) e a vazão do /auth/login. Ao mesmo tempo, consulta /health em paralelo
+para mostrar se a rajada de logins atrasa as demais rotas.
+
+Uso:
+    python run.py                                   # em outro terminal
+    python benchmark_login.py
+    python benchmark_login.py --requisicoes 400 --concorrencia 32
+    BCRYPT_ROUNDS=10 python run.py                  # para comparar custos
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def requisitar(url, dados=None):
+    """Executa a requisição e retorna (status, segundos)"""
+    corpo = json.dumps(dados).encode() if dados is not None else None
+    pedido = urllib.request.Request(url, data=corpo, headers={"Content-Type": "application/json"})
+    inicio = time.perf_counter()
+    try:
+        with urllib.request.urlopen(pedido, timeout=60) as resposta:
+            resposta.read()
+            codigo = resposta.status
+    except urllib.error.HTTPError as erro:
+        codigo = erro.code
+    except urllib.error.URLError:
+        codigo = 0
+    return codigo, time.perf_counter() - inicio
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def resumir(nome, resultados, duracao):
+    tempos = [segundos * 1000 for _, segundos in resultados]
+    codigos = {}
+    for codigo, _ in resultados:
+        codigos[codigo] = codigos.get(codigo, 0) + 1
+    print(f"\n▶ {nome}")
+    print(f"  requisições: {len(resultados)}  status: {codigos}")
+    if tempos:
+        print(f"  p50: {statistics.median(tempos):.1f} ms  p99: {percentil(tempos, 99):.1f} ms  "
+              f"máx: {max(tempos):.1f} ms")
+    if duracao:
+        print(f"  vazão: {len(resultados) / duracao:.1f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000", help="URL base do servidor")
+    parser.add_argument("--usuario", default="admin")
+    parser.add_argument("--senha", default="admin123")
+    parser.add_argument("--requisicoes", type=int, default=200, help="Total de logins")
+    parser.add_argument("--concorrencia", type=int, default=16, help="Logins simultâneos")
+    args = parser.parse_args()
+
+    codigo, _ = requisitar(f"{args.url}/health")
+    if codigo != 200:
+        print(f"❌ Servidor não respondeu em {args.url}/health")
+        return
+
+    credenciais = {"username": args.usuario, "password": args.senha}
+    print(f"🔄 {args.requisicoes} logins com concorrência {args.concorrencia} em {args.url}...")
+
+    # Sonda /health enquanto os logins acontecem
+    sondas = []
+    em_andamento = threading.Event()
+    em_andamento.set()
+
+    def sondar():
+        while em_andamento.is_set():
+            sondas.append(requisitar(f"{args.url}/health"))
+            time.sleep(0.05)
+
+    sonda = threading.Thread(target=sondar, daemon=True)
+    sonda.start()
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concorrencia) as executor:
+        logins = list(executor.map(
+            lambda _: requisitar(f"{args.url}/auth/login", credenciais), range(args.requisicoes)
+        ))
+    duracao = time.perf_counter() - inicio
+
+    em_andamento.clear()
+    sonda.join()
+
+    resumir("POST /auth/login", logins, duracao)
+    resumir("GET /health durante a rajada", sondas, None)
+    if any(codigo == 503 for codigo, _ in logins):
+        print("\nℹ️  Respostas 503 indicam a fila do bcrypt cheia (BCRYPT_MAX_PENDENTES).")
+
+
+if __name__ == "__main__":
+    main()
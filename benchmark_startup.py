@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark de inicialização de um worker
+
+Mede, em processos novos (como um worker do uvicorn ou um restart do --reload),
+o tempo de `import main` com `python -X importtime` e o tempo até a aplicação
+estar pronta (import + eventos de startup). Mostra os módulos que mais pesam na
+importação e compara a mediana com um orçamento: acima dele, sai com código 1
+(para usar em CI).
+
+Uso:
+    python benchmark_startup.py
+    python benchmark_startup.py --repeticoes 10 --orcamento-ms 1300 --top 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Executado no processo filho: import + startup/shutdown da aplicação, sem servidor
+PRONTO = """
+import asyncio, json, time
+inicio = time.perf_counter()
+import main
+importado = time.perf_counter()
+async def ciclo():
+    await main.app.router.startup()
+    pronto = time.perf_counter()
+    await main.app.router.shutdown()
+    return pronto
+pronto = asyncio.run(ciclo())
+print(json.dumps({"import_ms": (importado - inicio) * 1000, "pronto_ms": (pronto - inicio) * 1000}))
+"""
+
+
+def ler_importtime(saida: str):
+    """Linhas do -X importtime: [(módulo, próprio_us, acumulado_us, nível)]"""
+    modulos = []
+    for linha in saida.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        proprio, acumulado, nome = linha[len("import time:"):].split("|")
+        nivel = (len(nome) - len(nome.lstrip()) - 1) // 2
+        modulos.append((nome.strip(), int(proprio), int(acumulado), nivel))
+    return modulos
+
+
+def medir(modulo: str, ambiente: dict):
+    """Um processo novo: importtime do módulo e tempos até a aplicação ficar pronta"""
+    codigo = PRONTO.replace("import main", f"import {modulo}").replace("main.app", f"{modulo}.app")
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        capture_output=True, text=True, env=ambiente, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if resultado.returncode != 0:
+        raise RuntimeError(resultado.stderr.strip().splitlines()[-1])
+    tempos = json.loads(resultado.stdout.strip().splitlines()[-1])
+    return tempos, ler_importtime(resultado.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modulo", default="main", help="Módulo com a aplicação (atributo app)")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--orcamento-ms", type=float, default=1300, help="Máximo para a mediana até ficar pronto")
+    parser.add_argument("--top", type=int, default=10, help="Módulos mais pesados a listar")
+    args = parser.parse_args()
+
+    # Sem rotinas periódicas: mede só a inicialização da aplicação
+    ambiente = {**os.environ, "AGENDADOR_ATIVO": "false"}
+    print(f"🔄 {args.repeticoes} inicializações de '{args.modulo}' em processos novos...")
+    importacoes, prontos, acumulados = [], [], {}
+    medir(args.modulo, ambiente)  # aquece o cache de bytecode e do sistema de arquivos
+    for _ in range(args.repeticoes):
+        tempos, modulos = medir(args.modulo, ambiente)
+        importacoes.append(tempos["import_ms"])
+        prontos.append(tempos["pronto_ms"])
+        for nome, _, acumulado, nivel in modulos:
+            if nivel <= 2:
+                acumulados.setdefault(nome, []).append(acumulado / 1000)
+
+    print(f"\n▶ Módulos mais pesados (tempo acumulado, mediana)")
+    mais_pesados = sorted(((statistics.median(t), nome) for nome, t in acumulados.items()), reverse=True)
+    for tempo, nome in mais_pesados[:args.top]:
+        print(f"  {tempo:8.1f} ms  {nome}")
+
+    pronto = statistics.median(prontos)
+    print(f"\n  import {args.modulo}: {statistics.median(importacoes):.1f} ms (mediana)")
+    print(f"  pronto (import + startup): {pronto:.1f} ms (mediana)  orçamento: {args.orcamento_ms:.0f} ms")
+    if pronto > args.orcamento_ms:
+        print("❌ Acima do orçamento de inicialização")
+        sys.exit(1)
+    print("✅ Dentro do orçamento")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Preparação do banco, executada uma vez antes de subir os workers
+
+Em um banco novo, cria as tabelas e marca as migrações como aplicadas; em um
+banco existente, aplica as migrações pendentes (alembic upgrade head). Depois
+cria o usuário admin padrão, se não houver nenhum admin. Fica fora do caminho
+de importação de main.py: os workers só importam a aplicação, sem DDL nem hash
+bcrypt na inicialização.
+
+Uso:
+    python bootstrap.py
+    python bootstrap.py --sem-admin
+"""
+import argparse
+import os
+import time
+from sqlalchemy import inspect
+from database import Base, SessionLocal, engine as engine_padrao
+from models import User
+from config import ROLES
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+
+
+def _config_alembic(conexao):
+    from alembic.config import Config
+
+    config = Config(os.path.join(PASTA, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(PASTA, "migrations"))
+    config.attributes["connection"] = conexao  # migrations/env.py reutiliza a conexão
+    return config
+
+
+def preparar_banco(engine=None) -> str:
+    """Cria ou migra o esquema; retorna "criado" ou "migrado" """
+    from alembic import command
+
+    engine = engine or engine_padrao
+    with engine.begin() as conexao:
+        config = _config_alembic(conexao)
+        if not inspect(conexao).has_table(User.__tablename__):
+            # create_all já gera o esquema da última migração (índices e colunas inclusos)
+            Base.metadata.create_all(bind=conexao)
+            command.stamp(config, "head")
+            return "criado"
+        command.upgrade(config, "head")
+        return "migrado"
+
+
+def criar_admin_padrao(db) -> bool:
+    """Cria admin@erp.com / admin123 se não existir nenhum admin"""
+    from auth import get_password_hash
+
+    if db.query(User.id).filter(User.role == ROLES["admin"]).first():
+        return False
+    db.add(User(
+        email="admin@erp.com",
+        username="admin",
+        hashed_password=get_password_hash("admin123"),
+        full_name="Administrador",
+        role=ROLES["admin"],
+        is_active=True
+    ))
+    db.commit()
+    return True
+
+
+def banco_preparado(engine=None) -> bool:
+    """Verificação barata para o startup dos workers: as tabelas existem?"""
+    return inspect(engine or engine_padrao).has_table(User.__tablename__)
+
+
+def preparar(criar_admin: bool = True):
+    """Etapa completa: esquema e admin padrão (CLI, run.py e python main.py)"""
+    inicio = time.perf_counter()
+    print(f"🔄 Preparando o banco ({engine_padrao.url.render_as_string(hide_password=True)})...")
+    print(f"✅ Esquema {preparar_banco()}")
+    if criar_admin:
+        db = SessionLocal()
+        try:
+            if criar_admin_padrao(db):
+                print("✅ Usuário admin criado: admin@erp.com / admin123")
+        finally:
+            db.close()
+    print(f"🎉 Banco pronto em {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sem-admin", action="store_true", help="Não cria o usuário admin padrão")
+    args = parser.parse_args()
+    preparar(criar_admin=not args.sem_admin)
+
+
+if __name__ == "__main__":
+    main()
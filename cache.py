@@ -0,0 +1,347 @@
+"""
+Cache por usuário das respostas de dashboard e relatórios.
+
+As chaves incluem o usuário, o endpoint, os parâmetros e a versão dos dados do
+usuário. Toda transação que grava linhas financeiras de um usuário incrementa essa
+versão ao fazer commit, e as entradas antigas deixam de ser encontradas (e saem
+pelo LRU ou pelo TTL). Não há varredura de chaves para invalidar.
+
+Backends:
+    memoria  LRU + TTL no próprio processo (padrão; um worker)
+    redis    servidor compatível com Redis (Redis, Valkey, KeyDB...), compartilhado
+             entre workers; configure maxmemory-policy allkeys-lru no servidor
+    desativado
+
+Alterações na própria linha do usuário (role, status, senha, perfil) invalidam
+também o usuário autenticado guardado por auth.get_current_user.
+
+Escritas que não passam pelo flush da sessão (query.delete(), update em Core)
+devem chamar `marcar_usuario_alterado`.
+"""
+import functools
+import hashlib
+import inspect
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from config import (
+    CACHE_BACKEND, CACHE_URL, CACHE_TTL, CACHE_MAX_ITENS, PRINCIPAL_CACHE_TTL, DATABASE_READ_URL,
+    LEITURA_JANELA_ESCRITA
+)
+from models import (
+    User, ContaPagar, ContaReceber, Investimento, MetaFinanceira, TransacaoMeta, MetaMensal, ResumoFinanceiro
+)
+
+# Modelos cujas escritas mudam as respostas em cache do usuário
+MODELOS_FINANCEIROS = (
+    ContaPagar, ContaReceber, Investimento, MetaFinanceira, TransacaoMeta, MetaMensal, ResumoFinanceiro
+)
+
+_AUSENTE = object()
+
+
+class BackendCache:
+    """Interface dos backends de cache"""
+
+    def obter(self, chave: str) -> Any:
+        """Valor da chave, ou _AUSENTE se não existir/expirou"""
+        raise NotImplementedError
+
+    def gravar(self, chave: str, valor: Any, ttl: int):
+        raise NotImplementedError
+
+    def versao(self, chave: str) -> int:
+        raise NotImplementedError
+
+    def incrementar_versao(self, chave: str):
+        raise NotImplementedError
+
+    def limpar(self):
+        raise NotImplementedError
+
+    def tamanho(self) -> Optional[int]:
+        return None
+
+
+class BackendMemoria(BackendCache):
+    """LRU com TTL em memória, seguro entre threads"""
+
+    def __init__(self, max_itens: int):
+        self.max_itens = max_itens
+        self._itens: "OrderedDict[str, tuple]" = OrderedDict()
+        self._versoes = {}
+        self._lock = threading.Lock()
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return _AUSENTE
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self._itens[chave]
+                return _AUSENTE
+            self._itens.move_to_end(chave)
+            return valor
+
+    def gravar(self, chave, valor, ttl):
+        with self._lock:
+            self._itens[chave] = (time.monotonic() + ttl, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def versao(self, chave):
+        with self._lock:
+            return self._versoes.get(chave, 0)
+
+    def incrementar_versao(self, chave):
+        with self._lock:
+            self._versoes[chave] = self._versoes.get(chave, 0) + 1
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self._versoes.clear()
+
+    def tamanho(self):
+        with self._lock:
+            return len(self._itens)
+
+
+class BackendRedis(BackendCache):
+    """Servidor compatível com Redis; valores serializados com pickle"""
+
+    def __init__(self, cliente, prefixo: str = "erp:"):
+        self.cliente = cliente
+        self.prefixo = prefixo
+
+    def obter(self, chave):
+        dados = self.cliente.get(self.prefixo + chave)
+        return _AUSENTE if dados is None else pickle.loads(dados)
+
+    def gravar(self, chave, valor, ttl):
+        self.cliente.setex(self.prefixo + chave, ttl, pickle.dumps(valor, pickle.HIGHEST_PROTOCOL))
+
+    def versao(self, chave):
+        return int(self.cliente.get(self.prefixo + chave) or 0)
+
+    def incrementar_versao(self, chave):
+        self.cliente.incr(self.prefixo + chave)
+
+    def limpar(self):
+        for chave in self.cliente.scan_iter(self.prefixo + "*"):
+            self.cliente.delete(chave)
+
+
+class BackendDesativado(BackendCache):
+    def obter(self, chave):
+        return _AUSENTE
+
+    def gravar(self, chave, valor, ttl):
+        pass
+
+    def versao(self, chave):
+        return 0
+
+    def incrementar_versao(self, chave):
+        pass
+
+    def limpar(self):
+        pass
+
+
+def criar_backend(nome: str = CACHE_BACKEND) -> BackendCache:
+    """Cria o backend configurado em CACHE_BACKEND"""
+    if nome == "redis":
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requer o pacote 'redis' (pip install redis)")
+        return BackendRedis(redis.Redis.from_url(CACHE_URL))
+    if nome == "desativado":
+        return BackendDesativado()
+    return BackendMemoria(CACHE_MAX_ITENS)
+
+
+class CachePorUsuario:
+    """Cache de respostas versionado por usuário, com contadores de acertos e falhas
+    (atualizados sob lock: as rotas síncronas rodam no threadpool)"""
+
+    def __init__(self, backend: BackendCache, ttl: int = CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.acertos = 0
+        self.falhas = 0
+        self.invalidacoes = 0
+        self._lock = threading.Lock()
+
+    def versao_usuario(self, user_id: int, escopo: str = "dados") -> int:
+        return self.backend.versao(f"versao:{escopo}:{user_id}")
+
+    def chave(self, namespace: str, user_id: int, *partes) -> str:
+        """Chave na versão atual dos dados do usuário; deve ser obtida antes de calcular o valor"""
+        versao = self.versao_usuario(user_id)
+        return f"{namespace}:{user_id}:v{versao}:" + ":".join(repr(parte) for parte in partes)
+
+    def obter(self, chave: str):
+        valor = self.backend.obter(chave)
+        self.contar(valor is not _AUSENTE)
+        return valor
+
+    def contar(self, acerto: bool):
+        with self._lock:
+            if acerto:
+                self.acertos += 1
+            else:
+                self.falhas += 1
+
+    def gravar(self, chave: str, valor, ttl: Optional[int] = None):
+        self.backend.gravar(chave, valor, ttl or self.ttl)
+
+    def invalidar_usuario(self, user_id: int, escopo: str = "dados"):
+        """Descarta as entradas do usuário no escopo ("dados" financeiros ou "principal"
+        autenticado) incrementando a versão correspondente"""
+        self.backend.incrementar_versao(f"versao:{escopo}:{user_id}")
+        with self._lock:
+            self.invalidacoes += 1
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            acertos, falhas, invalidacoes = self.acertos, self.falhas, self.invalidacoes
+        total = acertos + falhas
+        return {
+            "backend": type(self.backend).__name__,
+            "acertos": acertos,
+            "falhas": falhas,
+            "taxa_acerto": round(acertos / total, 4) if total else 0.0,
+            "invalidacoes": invalidacoes,
+            "itens": self.backend.tamanho(),
+            "ttl": self.ttl,
+        }
+
+
+cache = CachePorUsuario(criar_backend())
+# Usuários autenticados por token, no mesmo backend e com contadores próprios
+principais = CachePorUsuario(cache.backend, PRINCIPAL_CACHE_TTL)
+
+
+def cache_por_usuario(endpoint: str):
+    """Decorator de endpoint: guarda a resposta por (usuário, endpoint, parâmetros).
+    O endpoint deve receber `current_user` e `db`; eles não entram na chave."""
+    def decorator(funcao):
+        assinatura = inspect.signature(funcao)
+
+        def chave_da_chamada(args, kwargs) -> str:
+            argumentos = assinatura.bind(*args, **kwargs)
+            argumentos.apply_defaults()
+            parametros = dict(argumentos.arguments)
+            user_id = parametros.pop("current_user").id
+            parametros.pop("db", None)
+            # Parâmetros omitidos usam a data de hoje como referência
+            partes = (date.today().isoformat(), *sorted(parametros.items()))
+            # Uma escrita concorrente durante o cálculo muda a versão e descarta o resultado
+            return cache.chave(endpoint, user_id, *partes)
+
+        if inspect.iscoroutinefunction(funcao):
+            @functools.wraps(funcao)
+            async def wrapper_async(*args, **kwargs):
+                chave = chave_da_chamada(args, kwargs)
+                valor = cache.obter(chave)
+                if valor is _AUSENTE:
+                    valor = await funcao(*args, **kwargs)
+                    cache.gravar(chave, valor)
+                return valor
+            return wrapper_async
+
+        @functools.wraps(funcao)
+        def wrapper(*args, **kwargs):
+            chave = chave_da_chamada(args, kwargs)
+            valor = cache.obter(chave)
+            if valor is _AUSENTE:
+                valor = funcao(*args, **kwargs)
+                cache.gravar(chave, valor)
+            return valor
+        return wrapper
+    return decorator
+
+
+def _chave_principal(token: str) -> str:
+    return "principal:" + hashlib.sha256(token.encode()).hexdigest()
+
+
+def obter_principal(token: str) -> Optional[User]:
+    """Usuário já autenticado com este token, se ainda estiver na versão atual"""
+    entrada = principais.backend.obter(_chave_principal(token))
+    if entrada is not _AUSENTE:
+        user_id, versao, usuario = entrada
+        if versao == principais.versao_usuario(user_id, "principal"):
+            principais.contar(True)
+            return usuario
+    principais.contar(False)
+    return None
+
+
+def guardar_principal(token: str, user: User, ttl: int):
+    """Guarda uma cópia desanexada da sessão do usuário autenticado pelo token.
+    O ttl deve terminar antes da expiração do token."""
+    if ttl <= 0:
+        return
+    copia = User(**{coluna.key: getattr(user, coluna.key) for coluna in User.__table__.columns})
+    versao = principais.versao_usuario(user.id, "principal")
+    principais.gravar(_chave_principal(token), (user.id, versao, copia), min(ttl, principais.ttl))
+
+
+# ==================== ESCRITAS RECENTES (RÉPLICA DE LEITURA) ====================
+
+# Com réplica, as escritas de cada usuário são registradas por LEITURA_JANELA_ESCRITA segundos
+# para que os relatórios dele leiam do primário nesse intervalo. Sem cache configurado, o
+# registro fica em memória mesmo assim.
+_escritas = BackendMemoria(CACHE_MAX_ITENS) if isinstance(cache.backend, BackendDesativado) else cache.backend
+
+
+def registrar_escrita(user_id: int):
+    _escritas.gravar(f"escrita:{user_id}", True, LEITURA_JANELA_ESCRITA)
+
+
+def escrita_recente(user_id: int) -> bool:
+    """Se o usuário gravou dados financeiros há menos de LEITURA_JANELA_ESCRITA segundos"""
+    return _escritas.obter(f"escrita:{user_id}") is not _AUSENTE
+
+
+# ==================== INVALIDAÇÃO ====================
+
+def marcar_usuario_alterado(db: Session, user_id: int, escopo: str = "dados"):
+    """Invalida o cache do usuário no escopo quando a transação da sessão fizer commit"""
+    db.info.setdefault("cache_usuarios_alterados", set()).add((escopo, user_id))
+
+
+def _registrar_usuarios_alterados(session, flush_context, instances):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        if isinstance(obj, MODELOS_FINANCEIROS) and obj.user_id is not None:
+            marcar_usuario_alterado(session, obj.user_id)
+        elif isinstance(obj, User) and obj.id is not None:
+            marcar_usuario_alterado(session, obj.id, "principal")
+
+
+def _invalidar_apos_commit(session):
+    for escopo, user_id in session.info.pop("cache_usuarios_alterados", ()):
+        (principais if escopo == "principal" else cache).invalidar_usuario(user_id, escopo)
+        if DATABASE_READ_URL and escopo == "dados":
+            registrar_escrita(user_id)
+
+
+def _descartar_usuarios_alterados(session):
+    session.info.pop("cache_usuarios_alterados", None)
+
+
+event.listen(Session, "before_flush", _registrar_usuarios_alterados)
+event.listen(Session, "after_commit", _invalidar_apos_commit)
+event.listen(Session, "after_rollback", _descartar_usuarios_alterados)
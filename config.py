@@ -1,4 +1,6 @@
+import hashlib
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -6,15 +8,108 @@ load_dotenv()
 # Configurações do banco de dados
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./erp.db")
 
+# Réplica de leitura dos relatórios (opcional). Depois de uma escrita, o usuário lê do
+# primário por LEITURA_JANELA_ESCRITA segundos (deve ser maior que o atraso da réplica)
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+LEITURA_JANELA_ESCRITA = int(os.getenv("LEITURA_JANELA_ESCRITA", "5"))
+
+# Engine assíncrono para as rotas de leitura do financeiro (opcional; requer aiosqlite ou asyncpg)
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "sim")
+DATABASE_ASYNC_URL = os.getenv("DATABASE_ASYNC_URL")  # padrão: DATABASE_URL com o driver assíncrono
+
+# Perfil do engine (database.py): "otimizado" ou "padrao" (padrões do SQLAlchemy)
+DB_PERFIL = os.getenv("DB_PERFIL", "otimizado")
+# Pool de conexões (PostgreSQL e outros servidores)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "30"))  # pool + overflow >= threads do Starlette (40)
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # segundos esperando uma conexão livre
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # segundos até renovar a conexão
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "sim")
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))  # PostgreSQL; 0 desativa
+# PRAGMAs do SQLite
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # seguro com WAL
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # bytes
+
 # Configurações JWT
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
+# Configurações de hash de senha (bcrypt)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))  # hashes com outro custo são refeitos no login
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(os.cpu_count() or 2)))
+BCRYPT_MAX_PENDENTES = int(os.getenv("BCRYPT_MAX_PENDENTES", "64"))  # além disso, responde 503
+
+# Configurações de cache das respostas de dashboard e relatórios
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memoria")  # "memoria", "redis" ou "desativado"
+CACHE_URL = os.getenv("CACHE_URL", "redis://localhost:6379/0")
+CACHE_TTL = int(os.getenv("CACHE_TTL", "60"))  # segundos
+CACHE_MAX_ITENS = int(os.getenv("CACHE_MAX_ITENS", "10000"))
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", "30"))  # usuário autenticado por token
+
+# Tarefas em segundo plano (tarefas.py)
+TAREFAS_WORKERS = int(os.getenv("TAREFAS_WORKERS", "2"))
+TAREFAS_RETENCAO = int(os.getenv("TAREFAS_RETENCAO", "3600"))  # segundos que o status fica consultável
+
+# Rotinas periódicas (agendador.py)
+AGENDADOR_ATIVO = os.getenv("AGENDADOR_ATIVO", "true").lower() in ("1", "true", "sim")
+VARREDURA_VENCIDOS_INTERVALO = int(os.getenv("VARREDURA_VENCIDOS_INTERVALO", "3600"))  # segundos
+# Com vários workers, só o dono desta trava de arquivo executa as rotinas (uma por banco)
+_ID_BANCO = hashlib.sha1(f"{os.getcwd()}|{DATABASE_URL}".encode()).hexdigest()[:12]
+AGENDADOR_TRAVA = os.getenv("AGENDADOR_TRAVA") or os.path.join(tempfile.gettempdir(), f"erp_agendador_{_ID_BANCO}.lock")
+AGENDADOR_TRAVA_INTERVALO = int(os.getenv("AGENDADOR_TRAVA_INTERVALO", "60"))  # segundos entre tentativas
+
+# Inicialização dos workers (main.py): routers pesados carregados na primeira requisição.
+# Com SERVIDOR_PRELOAD, run.py os inclui no processo mestre, antes do fork.
+ROUTERS_SOB_DEMANDA = os.getenv("ROUTERS_SOB_DEMANDA", "true").lower() in ("1", "true", "sim")
+
+# Servidor (run.py): "dev" = um processo com --reload; "producao" = vários workers
+SERVIDOR_MODO = os.getenv("SERVIDOR_MODO", "dev")
+SERVIDOR_HOST = os.getenv("SERVIDOR_HOST", "0.0.0.0")
+SERVIDOR_PORTA = int(os.getenv("SERVIDOR_PORTA", "8000"))
+SERVIDOR = os.getenv("SERVIDOR", "uvicorn")  # uvicorn (--workers) ou gunicorn (requer pip install gunicorn)
+# Mais de um worker requer CACHE_BACKEND=redis (cache, tarefas e leituras pós-escrita são por processo)
+SERVIDOR_WORKERS = int(os.getenv("SERVIDOR_WORKERS", str(os.cpu_count() or 1) if CACHE_BACKEND == "redis" else "1"))
+SERVIDOR_LOOP = os.getenv("SERVIDOR_LOOP", "auto")  # auto (uvloop se instalado), uvloop ou asyncio
+SERVIDOR_HTTP = os.getenv("SERVIDOR_HTTP", "auto")  # auto (httptools se instalado), httptools ou h11
+SERVIDOR_TIMEOUT_ENCERRAMENTO = int(os.getenv("SERVIDOR_TIMEOUT_ENCERRAMENTO", "30"))  # segundos p/ concluir requisições
+SERVIDOR_PRELOAD = os.getenv("SERVIDOR_PRELOAD", "true").lower() in ("1", "true", "sim")  # só gunicorn
+
+# Paginação das listagens (paginacao.py)
+PAGINACAO_LIMITE_PADRAO = int(os.getenv("PAGINACAO_LIMITE_PADRAO", "100"))
+PAGINACAO_LIMITE_MAXIMO = int(os.getenv("PAGINACAO_LIMITE_MAXIMO", "1000"))
+
+# Importação de extratos bancários (importacao.py)
+IMPORTACAO_TAMANHO_LOTE = int(os.getenv("IMPORTACAO_TAMANHO_LOTE", "1000"))  # lançamentos por commit
+IMPORTACAO_REGRAS = os.getenv("IMPORTACAO_REGRAS")  # JSON {"palavra-chave": "categoria"}, opcional
+
 # Configurações de upload
-UPLOAD_DIR = "uploads"
-MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
-ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif"}
+UPLOAD_DIR = os.getenv("UPLOAD_PATH", "uploads")
+MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", str(5 * 1024 * 1024)))  # 5MB
+ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+
+# Fotos de perfil (imagens.py): convertidas para WebP, sem metadados, com miniaturas quadradas
+IMAGEM_TAMANHO_MAXIMO = int(os.getenv("IMAGEM_TAMANHO_MAXIMO", "1024"))  # px, maior lado da foto
+IMAGEM_MINIATURAS = [int(t) for t in os.getenv("IMAGEM_MINIATURAS", "64,320").split(",")]  # px
+IMAGEM_QUALIDADE = int(os.getenv("IMAGEM_QUALIDADE", "82"))  # WebP, 0-100
+IMAGEM_MAX_PIXELS = int(os.getenv("IMAGEM_MAX_PIXELS", str(40_000_000)))  # recusa "bombas" de descompressão
+IMAGEM_WORKERS = int(os.getenv("IMAGEM_WORKERS", "2"))
+# Fotos gravadas ou reaproveitadas há menos que isso não são removidas (upload concorrente
+# da mesma foto ainda sem commit); python imagens.py --limpar-orfaos as remove depois
+IMAGEM_CARENCIA_REMOCAO = int(os.getenv("IMAGEM_CARENCIA_REMOCAO", "600"))  # segundos
+
+# Armazenamento dos uploads (armazenamento.py): local (UPLOAD_PATH) ou s3 (S3, MinIO ou compatível)
+ARMAZENAMENTO = os.getenv("ARMAZENAMENTO", "local").lower()
+ARMAZENAMENTO_S3_BUCKET = os.getenv("ARMAZENAMENTO_S3_BUCKET")
+ARMAZENAMENTO_S3_ENDPOINT = os.getenv("ARMAZENAMENTO_S3_ENDPOINT")  # ex.: http://localhost:9000 (MinIO)
+ARMAZENAMENTO_S3_REGIAO = os.getenv("ARMAZENAMENTO_S3_REGIAO", "us-east-1")
+ARMAZENAMENTO_S3_ACCESS_KEY = os.getenv("ARMAZENAMENTO_S3_ACCESS_KEY")  # sem elas, credenciais padrão do boto3
+ARMAZENAMENTO_S3_SECRET_KEY = os.getenv("ARMAZENAMENTO_S3_SECRET_KEY")
+ARMAZENAMENTO_URL_PUBLICA = os.getenv("ARMAZENAMENTO_URL_PUBLICA")  # bucket público ou CDN; sem ela, URLs pré-assinadas
+ARMAZENAMENTO_URL_EXPIRACAO = int(os.getenv("ARMAZENAMENTO_URL_EXPIRACAO", "3600"))  # segundos
 
 # Configurações de permissões
 ROLES = {
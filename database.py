@@ -1,17 +1,133 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from config import DATABASE_URL
+from starlette.concurrency import run_in_threadpool
+from config import (
+    DATABASE_URL, DATABASE_READ_URL, DATABASE_ASYNC_URL, DB_ASYNC, DB_PERFIL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS, SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS,
+    SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHE_SIZE_KB, SQLITE_MMAP_SIZE,
+)
+
+# Driver assíncrono de cada banco quando DATABASE_ASYNC_URL não é informada: (driver, pacote)
+DRIVERS_ASSINCRONOS = {"sqlite": ("aiosqlite", "aiosqlite"), "postgresql": ("asyncpg", "asyncpg")}
+
+
+def _configurar_sqlite(conexao, _registro):
+    """PRAGMAs aplicados a cada nova conexão SQLite.
+    WAL deixa leituras e a escrita concorrerem; busy_timeout espera o lock em vez de
+    falhar com "database is locked"."""
+    cursor = conexao.cursor()
+    # Antes do journal_mode: a troca para WAL precisa de lock exclusivo e deve esperar
+    # as outras conexões abertas no mesmo instante
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")  # negativo: em KiB
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.close()
+
+
+def _opcoes_engine(url, perfil: str) -> dict:
+    """Argumentos de create_engine/create_async_engine para o banco e o perfil"""
+    backend = url.get_backend_name()
+    sqlite = backend == "sqlite"
+    connect_args = {"check_same_thread": False} if sqlite else {}
+    if perfil != "otimizado":
+        return {"connect_args": connect_args}
+
+    if backend == "postgresql" and DB_STATEMENT_TIMEOUT_MS:
+        if url.get_driver_name() == "asyncpg":
+            connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+        else:
+            connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    opcoes = {"connect_args": connect_args}
+    if not (sqlite and url.database in (None, "", ":memory:")):  # SQLite em memória usa um pool próprio
+        opcoes.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+    return opcoes
+
+
+def criar_engine(url: str = DATABASE_URL, perfil: str = DB_PERFIL):
+    """Cria o engine com o perfil de ajuste do banco.
+    perfil "otimizado": pool dimensionado, PRAGMAs no SQLite e statement_timeout no PostgreSQL;
+    perfil "padrao": padrões do SQLAlchemy/driver (para comparação no benchmark_banco.py)."""
+    url = make_url(url)
+    engine = create_engine(url, **_opcoes_engine(url, perfil))
+    if perfil == "otimizado" and url.get_backend_name() == "sqlite":
+        event.listen(engine, "connect", _configurar_sqlite)
+    return engine
+
+
+def url_assincrona(url: str = DATABASE_URL) -> str:
+    """URL com o driver assíncrono (sqlite+aiosqlite, postgresql+asyncpg)"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in DRIVERS_ASSINCRONOS:
+        raise RuntimeError(f"DB_ASYNC=true não suporta '{backend}'; informe DATABASE_ASYNC_URL")
+    return url.set(drivername=f"{backend}+{DRIVERS_ASSINCRONOS[backend][0]}").render_as_string(hide_password=False)
+
+
+def criar_engine_assincrono(url: str = None, perfil: str = DB_PERFIL):
+    """Cria o AsyncEngine com o mesmo perfil de ajuste do engine síncrono"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    url = make_url(url or DATABASE_ASYNC_URL or url_assincrona())
+    opcoes = _opcoes_engine(url, perfil)
+    if "pool_size" in opcoes:
+        opcoes["poolclass"] = AsyncAdaptedQueuePool  # o aiosqlite usaria NullPool
+    try:
+        engine = create_async_engine(url, **opcoes)
+    except ImportError:
+        pacote = DRIVERS_ASSINCRONOS.get(url.get_backend_name(), (None, url.get_driver_name()))[1]
+        raise RuntimeError(f"DB_ASYNC=true requer o pacote '{pacote}' (pip install {pacote})")
+    if perfil == "otimizado" and url.get_backend_name() == "sqlite":
+        event.listen(engine.sync_engine, "connect", _configurar_sqlite)
+    return engine
+
 
 # Criar engine do banco de dados
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {})
+engine = criar_engine()
 
 # Criar sessão do banco
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Réplica de leitura dos relatórios (opcional, DATABASE_READ_URL); sem ela, o próprio primário
+engine_leitura = criar_engine(DATABASE_READ_URL) if DATABASE_READ_URL else engine
+SessionLeitura = sessionmaker(autocommit=False, autoflush=False, bind=engine_leitura)
+
+# Engine assíncrono (opcional, DB_ASYNC=true)
+async_engine = None
+async_engine_leitura = None
+AsyncSessionLocal = None
+AsyncSessionLeitura = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_engine = criar_engine_assincrono()
+    async_engine_leitura = (
+        criar_engine_assincrono(url_assincrona(DATABASE_READ_URL)) if DATABASE_READ_URL else async_engine
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    AsyncSessionLeitura = async_sessionmaker(async_engine_leitura, autoflush=False, expire_on_commit=False)
+
 # Base para os modelos
 Base = declarative_base()
 
+def descartar_conexoes_herdadas():
+    """Após o fork de um worker (gunicorn), troca os pools herdados do processo mestre
+    por pools novos, sem fechar as conexões, que continuam sendo do mestre"""
+    for engine_herdado in {engine, engine_leitura}:
+        engine_herdado.dispose(close=False)
+    for engine_herdado in {async_engine, async_engine_leitura} - {None}:
+        engine_herdado.sync_engine.dispose(close=False)
+
 # Dependency para obter sessão do banco
 def get_db():
     db = SessionLocal()
@@ -19,3 +135,52 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+class SessaoEmThread:
+    """Sessão síncrona com a interface run_sync da AsyncSession: sem DB_ASYNC, as rotas
+    assíncronas executam as consultas no threadpool, como as rotas síncronas"""
+
+    def __init__(self, fabrica=None):
+        self._fabrica = fabrica or SessionLocal
+        self._sessao = None
+
+    def _executar(self, funcao, *args, **kwargs):
+        if self._sessao is None:
+            self._sessao = self._fabrica()
+        return funcao(self._sessao, *args, **kwargs)
+
+    async def run_sync(self, funcao, *args, **kwargs):
+        return await run_in_threadpool(self._executar, funcao, *args, **kwargs)
+
+    async def close(self):
+        if self._sessao is not None:
+            await run_in_threadpool(self._sessao.close)
+
+
+# Dependency assíncrona: AsyncSession (DB_ASYNC=true) ou SessaoEmThread.
+# As rotas usam `await db.run_sync(funcao, ...)`, com funcao(sessao_sincrona, ...).
+async def get_async_db():
+    async for db in sessao_async():
+        yield db
+
+
+async def sessao_async(leitura: bool = False):
+    """Sessão assíncrona do primário ou, com leitura=True, da réplica de leitura"""
+    if AsyncSessionLocal is not None:
+        db = (AsyncSessionLeitura if leitura else AsyncSessionLocal)()
+    else:
+        db = SessaoEmThread(SessionLeitura if leitura else SessionLocal)
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+def sessao_de_leitura(leitura: bool = True):
+    """Sessão da réplica de leitura ou, com leitura=False, do primário (ver auth.get_read_db)"""
+    db = (SessionLeitura if leitura else SessionLocal)()
+    try:
+        yield db
+    finally:
+        db.close()
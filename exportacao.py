@@ -0,0 +1,252 @@
+"""
+Exportação em streaming de transações e resumos mensais.
+
+As linhas são lidas do banco em lotes (yield_per) e convertidas em blocos de bytes
+à medida que chegam, então a memória usada não depende do período exportado e o
+download começa assim que o primeiro lote fica pronto.
+
+Conteúdos:
+    transacoes  contas a pagar e a receber, investimentos e aportes em metas do
+                período, por tipo e data (uma linha por registro)
+    resumos     totais mensais de resumos_financeiros, com o saldo acumulado
+
+Formatos: csv, json (lista), ndjson (um objeto por linha) e parquet. O parquet é
+gravado em row groups de LOTE_EXPORTACAO linhas e requer o pacote opcional
+`pyarrow` (pip install pyarrow).
+"""
+import csv
+import io
+import json
+from datetime import date
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import literal, null, select, tuple_
+from sqlalchemy.orm import Session
+from models import ContaPagar, ContaReceber, Investimento, TransacaoMeta, ResumoFinanceiro
+from periodos import filtro_intervalo
+
+FORMATOS = ("csv", "json", "ndjson", "parquet")
+CONTEUDOS = ("transacoes", "resumos")
+
+TIPOS_MIDIA = {
+    "csv": "text/csv; charset=utf-8",
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Linhas lidas do banco por vez (e por row group no parquet)
+LOTE_EXPORTACAO = 5000
+# Tamanho aproximado dos blocos enviados ao cliente
+TAMANHO_BLOCO = 64 * 1024
+
+# (nome, tipo) das colunas de cada conteúdo; o tipo define a coluna no parquet
+COLUNAS_TRANSACOES = [
+    ("tipo", "texto"), ("id", "inteiro"), ("data", "data"), ("data_liquidacao", "data"),
+    ("descricao", "texto"), ("categoria", "texto"), ("status", "texto"), ("valor", "decimal"),
+]
+COLUNAS_RESUMOS = [
+    ("ano", "inteiro"), ("mes", "inteiro"), ("total_receitas", "decimal"), ("total_despesas", "decimal"),
+    ("saldo_mensal", "decimal"), ("total_investido", "decimal"), ("total_metas", "decimal"),
+    ("saldo_acumulado", "decimal"),
+]
+
+
+def verificar_formato(formato: str):
+    """Levanta ValueError se o formato não existir ou depender de um pacote ausente"""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato deve ser um de: {', '.join(FORMATOS)}")
+    if formato == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError("Formato parquet requer o pacote 'pyarrow' (pip install pyarrow)")
+
+
+# ==================== CONSULTAS ====================
+
+def _consultas_transacoes(user_id: int) -> list:
+    """(select com as colunas de COLUNAS_TRANSACOES, coluna de data) de cada tipo de registro"""
+    return [
+        (select(
+            literal("conta_pagar"), ContaPagar.id, ContaPagar.data_vencimento, ContaPagar.data_pagamento,
+            ContaPagar.descricao, ContaPagar.categoria, ContaPagar.status, ContaPagar.valor
+        ).where(ContaPagar.user_id == user_id), ContaPagar.data_vencimento),
+        (select(
+            literal("conta_receber"), ContaReceber.id, ContaReceber.data_vencimento, ContaReceber.data_recebimento,
+            ContaReceber.descricao, ContaReceber.categoria, ContaReceber.status, ContaReceber.valor
+        ).where(ContaReceber.user_id == user_id), ContaReceber.data_vencimento),
+        (select(
+            literal("investimento"), Investimento.id, Investimento.data_investimento, Investimento.data_resgate,
+            Investimento.nome, Investimento.tipo, null(), Investimento.valor_investido
+        ).where(Investimento.user_id == user_id), Investimento.data_investimento),
+        (select(
+            literal("transacao_meta"), TransacaoMeta.id, TransacaoMeta.data_transacao, TransacaoMeta.data_transacao,
+            TransacaoMeta.descricao, null(), null(), TransacaoMeta.valor
+        ).where(TransacaoMeta.user_id == user_id), TransacaoMeta.data_transacao),
+    ]
+
+
+def _valor_simples(valor):
+    # Enums (categoria, status, tipo de investimento) saem pelo valor
+    return getattr(valor, "value", valor)
+
+
+def linhas_transacoes(db: Session, user_id: int, inicio: Optional[date] = None, fim: Optional[date] = None) -> Iterator[tuple]:
+    """Transações do usuário em [inicio, fim) (sem intervalo, todo o histórico)"""
+    for consulta, coluna_data in _consultas_transacoes(user_id):
+        if inicio is not None and fim is not None:
+            consulta = consulta.where(*filtro_intervalo(coluna_data, inicio, fim))
+        consulta = consulta.order_by(coluna_data, consulta.selected_columns[1])
+        for linha in db.execute(consulta.execution_options(yield_per=LOTE_EXPORTACAO)):
+            yield tuple(_valor_simples(valor) for valor in linha)
+
+
+def linhas_resumos(db: Session, user_id: int, inicio: Optional[date] = None, fim: Optional[date] = None) -> Iterator[tuple]:
+    """Resumos mensais do usuário dos meses que começam em [inicio, fim)"""
+    consulta = select(*(getattr(ResumoFinanceiro, nome) for nome, _ in COLUNAS_RESUMOS)).where(
+        ResumoFinanceiro.user_id == user_id
+    )
+    if inicio is not None and fim is not None:
+        mes_ano = tuple_(ResumoFinanceiro.ano, ResumoFinanceiro.mes)
+        consulta = consulta.where(mes_ano >= (inicio.year, inicio.month), mes_ano < (fim.year, fim.month))
+    consulta = consulta.order_by(ResumoFinanceiro.ano, ResumoFinanceiro.mes)
+    yield from db.execute(consulta.execution_options(yield_per=LOTE_EXPORTACAO))
+
+
+# ==================== FORMATOS ====================
+
+def _em_blocos(partes: Iterable[str]) -> Iterator[bytes]:
+    """Junta as partes em blocos de ~TAMANHO_BLOCO bytes"""
+    buffer, tamanho = [], 0
+    for parte in partes:
+        buffer.append(parte)
+        tamanho += len(parte)
+        if tamanho >= TAMANHO_BLOCO:
+            yield "".join(buffer).encode()
+            buffer, tamanho = [], 0
+    if buffer:
+        yield "".join(buffer).encode()
+
+
+def _partes_csv(nomes: List[str], linhas: Iterable[tuple]) -> Iterator[str]:
+    saida = io.StringIO()
+    escritor = csv.writer(saida)
+    escritor.writerow(nomes)
+    for linha in linhas:
+        escritor.writerow(linha)
+        if saida.tell() >= TAMANHO_BLOCO:
+            yield saida.getvalue()
+            saida.seek(0)
+            saida.truncate()
+    yield saida.getvalue()
+
+
+def _serializar_json(nomes: List[str], linha: tuple) -> str:
+    return json.dumps(dict(zip(nomes, linha)), ensure_ascii=False, default=str)
+
+
+def _partes_json(nomes: List[str], linhas: Iterable[tuple]) -> Iterator[str]:
+    yield "["
+    separador = "\n"
+    for linha in linhas:
+        yield separador + _serializar_json(nomes, linha)
+        separador = ",\n"
+    yield "\n]"
+
+
+def _partes_ndjson(nomes: List[str], linhas: Iterable[tuple]) -> Iterator[str]:
+    for linha in linhas:
+        yield _serializar_json(nomes, linha) + "\n"
+
+
+class _SaidaParquet:
+    """Arquivo somente de escrita cujo conteúdo é retirado a cada row group"""
+
+    def __init__(self):
+        self._partes: List[bytes] = []
+        self._posicao = 0
+        self.closed = False
+
+    def write(self, dados) -> int:
+        dados = bytes(dados)
+        self._partes.append(dados)
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self) -> int:
+        return self._posicao
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def retirar(self) -> bytes:
+        dados = b"".join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+def _blocos_parquet(colunas: List[Tuple[str, str]], linhas: Iterable[tuple]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tipos = {"texto": pa.string(), "inteiro": pa.int64(), "data": pa.date32(), "decimal": pa.float64()}
+    esquema = pa.schema([(nome, tipos[tipo]) for nome, tipo in colunas])
+    saida = _SaidaParquet()
+    escritor = pq.ParquetWriter(saida, esquema, compression="snappy")
+
+    def gravar(lote):
+        escritor.write_batch(pa.RecordBatch.from_arrays(
+            [pa.array(valores, type=campo.type) for valores, campo in zip(zip(*lote), esquema)], schema=esquema
+        ))
+
+    try:
+        lote = []
+        for linha in linhas:
+            lote.append(linha)
+            if len(lote) >= LOTE_EXPORTACAO:
+                gravar(lote)
+                lote.clear()
+                yield saida.retirar()
+        if lote:
+            gravar(lote)
+    finally:
+        escritor.close()
+    yield saida.retirar()
+
+
+def serializar(colunas: List[Tuple[str, str]], linhas: Iterable[tuple], formato: str) -> Iterator[bytes]:
+    """Converte as linhas no formato pedido, em blocos de bytes"""
+    nomes = [nome for nome, _ in colunas]
+    if formato == "parquet":
+        return _blocos_parquet(colunas, linhas)
+    partes: Callable[[List[str], Iterable[tuple]], Iterator[str]] = {
+        "csv": _partes_csv, "json": _partes_json, "ndjson": _partes_ndjson
+    }[formato]
+    return _em_blocos(partes(nomes, linhas))
+
+
+def exportar(
+    db: Session,
+    user_id: int,
+    conteudo: str,
+    formato: str,
+    inicio: Optional[date] = None,
+    fim: Optional[date] = None
+) -> Iterator[bytes]:
+    """Blocos do arquivo exportado com o conteúdo do período [inicio, fim)"""
+    if conteudo == "resumos":
+        return serializar(COLUNAS_RESUMOS, linhas_resumos(db, user_id, inicio, fim), formato)
+    return serializar(COLUNAS_TRANSACOES, linhas_transacoes(db, user_id, inicio, fim), formato)
+
+
+def partes_csv_transacoes(db: Session, user_id: int, inicio: date, fim: date) -> Iterator[str]:
+    """Seção de transações (cabeçalho e linhas) para anexar a um CSV já iniciado"""
+    return _partes_csv([nome for nome, _ in COLUNAS_TRANSACOES], linhas_transacoes(db, user_id, inicio, fim))
+
+
+def partes_json_transacoes(db: Session, user_id: int, inicio: date, fim: date) -> Iterator[str]:
+    """Lista JSON de transações para anexar a um documento JSON já iniciado"""
+    return _partes_json([nome for nome, _ in COLUNAS_TRANSACOES], linhas_transacoes(db, user_id, inicio, fim))
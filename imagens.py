@@ -0,0 +1,421 @@
+"""
+Pipeline das fotos de perfil
+
+O corpo multipart é lido direto do socket (request.stream()), sem o
+UploadFile do Starlette, que receberia e gravaria o corpo inteiro antes da rota:
+um Content-Length acima de MAX_FILE_SIZE é recusado antes de ler qualquer byte e,
+em uploads chunked, a leitura para assim que o arquivo passa do limite. O campo
+"file" é gravado uma única vez, em um arquivo temporário. A decodificação com o
+Pillow roda num pool próprio, fora do event loop: valida a imagem, aplica a
+orientação do EXIF e grava em WebP, sem metadados, a foto (até
+IMAGEM_TAMANHO_MAXIMO px) e as miniaturas quadradas de IMAGEM_MINIATURAS.
+
+O armazenamento (armazenamento.py) é endereçado por conteúdo: o nome é o
+sha256 da foto em WebP, em subpastas pelos primeiros caracteres do hash. Fotos
+iguais viram um único arquivo, compartilhado pelos usuários que o referenciam,
+e um arquivo nunca é sobrescrito, então a URL pode ser cacheada como imutável.
+Reaproveitar uma foto existente renova a data de modificação dela, e fotos mais
+novas que IMAGEM_CARENCIA_REMOCAO não são removidas: assim, liberar_foto de outro
+usuário não apaga uma foto que um upload concorrente está prestes a referenciar.
+
+Arquivos gravados para a foto "ab/cd/<sha256>.webp":
+    ab/cd/<sha256>.webp  ab/cd/<sha256>_64.webp  ab/cd/<sha256>_320.webp
+
+Uso (remove do armazenamento os arquivos que nenhum usuário referencia):
+    python imagens.py --limpar-orfaos
+"""
+import argparse
+import asyncio
+import hashlib
+import io
+import os
+import re
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import aiofiles
+from sqlalchemy import func
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, RedirectResponse
+from starlette.routing import Route, Router
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from armazenamento import PREFIXO_ENTRADA, armazenamento as armazenamento_padrao
+from config import (
+    MAX_FILE_SIZE, ALLOWED_EXTENSIONS, IMAGEM_TAMANHO_MAXIMO, IMAGEM_MINIATURAS, IMAGEM_QUALIDADE, IMAGEM_MAX_PIXELS,
+    IMAGEM_WORKERS, IMAGEM_CARENCIA_REMOCAO, ARMAZENAMENTO_URL_EXPIRACAO,
+)
+
+FORMATOS_ACEITOS = {"JPEG", "PNG", "GIF", "WEBP"}
+TAMANHO_BLOCO = 64 * 1024
+MARGEM_MULTIPART = 16 * 1024  # delimitadores e cabeçalhos das partes, além do arquivo
+NIVEIS_SUBPASTA = 2  # ab/cd/<sha256>.webp: no máximo 256 entradas por pasta nos dois níveis
+
+# Caminho endereçado por conteúdo: subpastas, hash e, nas miniaturas, o tamanho
+ENDERECADO_POR_CONTEUDO = re.compile(r"^(?:[0-9a-f]{2}/){%d}([0-9a-f]{64}(?:_\d+)?)\.webp$" % NIVEIS_SUBPASTA)
+CACHE_IMUTAVEL = "public, max-age=31536000, immutable"
+
+# Pool dedicado à decodificação: o Pillow libera o GIL na maior parte do trabalho
+_pool_imagens = ThreadPoolExecutor(max_workers=IMAGEM_WORKERS, thread_name_prefix="imagens")
+
+
+class ArquivoMuitoGrande(ValueError):
+    """Upload maior que o limite configurado"""
+
+
+class _CampoArquivo:
+    """Callbacks do parser multipart: separa os bytes do campo de arquivo das demais partes"""
+
+    def __init__(self, campo: str):
+        self.campo = campo.encode()
+        self.nome_arquivo = None
+        self.encontrado = False
+        self.blocos: List[bytes] = []
+        self._no_campo = False
+        self._cabecalhos = {}
+        self._cabecalho = self._valor = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._inicio_parte, "on_header_field": self._campo_cabecalho,
+            "on_header_value": self._valor_cabecalho, "on_header_end": self._fim_cabecalho,
+            "on_headers_finished": self._fim_cabecalhos, "on_part_data": self._dados,
+        }
+
+    def _inicio_parte(self):
+        self._cabecalhos = {}
+        self._no_campo = False
+
+    def _campo_cabecalho(self, dados, inicio, fim):
+        self._cabecalho += dados[inicio:fim]
+
+    def _valor_cabecalho(self, dados, inicio, fim):
+        self._valor += dados[inicio:fim]
+
+    def _fim_cabecalho(self):
+        self._cabecalhos[self._cabecalho.lower()] = self._valor
+        self._cabecalho = self._valor = b""
+
+    def _fim_cabecalhos(self):
+        from multipart.multipart import parse_options_header
+
+        _, opcoes = parse_options_header(self._cabecalhos.get(b"content-disposition", b""))
+        self._no_campo = not self.encontrado and opcoes.get(b"name") == self.campo
+        if self._no_campo:
+            self.encontrado = True
+            self.nome_arquivo = opcoes.get(b"filename", b"").decode("utf-8", "replace")
+
+    def _dados(self, dados, inicio, fim):
+        if self._no_campo:
+            self.blocos.append(dados[inicio:fim])
+
+
+async def salvar_upload_limitado(request, limite: int = MAX_FILE_SIZE, campo: str = "file") -> Tuple[str, str]:
+    """Lê o corpo multipart da requisição e grava o campo em um arquivo temporário;
+    retorna (caminho, nome do arquivo enviado). Levanta ArquivoMuitoGrande pelo
+    Content-Length, antes de ler, ou assim que o arquivo passa do limite, sem ler
+    o restante; ValueError se o corpo não for multipart ou não tiver o campo."""
+    from multipart.exceptions import MultipartParseError
+    from multipart.multipart import MultipartParser, parse_options_header
+
+    erro_tamanho = ArquivoMuitoGrande(f"Arquivo maior que {limite // 1024} KB")
+    declarado = request.headers.get("content-length", "")
+    if declarado.isdigit() and int(declarado) > limite + MARGEM_MULTIPART:
+        raise erro_tamanho
+    tipo, opcoes = parse_options_header(request.headers.get("content-type", ""))
+    if tipo != b"multipart/form-data" or not opcoes.get(b"boundary"):
+        raise ValueError("Envie a foto como multipart/form-data")
+
+    leitor = _CampoArquivo(campo)
+    parser = MultipartParser(opcoes[b"boundary"], leitor.callbacks())
+    caminho = os.path.join(tempfile.gettempdir(), f"erp-upload-{uuid.uuid4().hex}")
+    recebidos = gravados = 0
+    try:
+        async with aiofiles.open(caminho, "wb") as destino:
+            async for pedaco in request.stream():
+                recebidos += len(pedaco)
+                if recebidos > limite + MARGEM_MULTIPART:  # corpo chunked, sem Content-Length
+                    raise erro_tamanho
+                try:
+                    parser.write(pedaco)
+                except MultipartParseError:
+                    raise ValueError("Corpo multipart inválido")
+                for bloco in leitor.blocos:
+                    gravados += len(bloco)
+                    if gravados > limite:
+                        raise erro_tamanho
+                    await destino.write(bloco)
+                leitor.blocos.clear()
+        if not leitor.encontrado:
+            raise ValueError(f"Campo '{campo}' ausente")
+    except BaseException:
+        _remover(caminho)
+        raise
+    return caminho, leitor.nome_arquivo
+
+
+def nome_miniatura(nome: str, tamanho: int) -> str:
+    raiz, _ = os.path.splitext(nome)
+    return f"{raiz}_{tamanho}.webp"
+
+
+def miniaturas_da_foto(nome: Optional[str]) -> Optional[Dict[str, str]]:
+    """Miniaturas de uma foto gravada por este pipeline ({"64": "ab/cd/<sha256>_64.webp", ...}).
+    Fotos antigas (antes do WebP) não têm miniaturas."""
+    if not nome or not nome.endswith(".webp"):
+        return None
+    return {str(tamanho): nome_miniatura(nome, tamanho) for tamanho in IMAGEM_MINIATURAS}
+
+
+def arquivos_da_foto(nome: Optional[str]) -> List[str]:
+    """Todos os arquivos de uma foto: a própria e as miniaturas"""
+    if not nome or ".." in nome.split("/") or os.path.isabs(nome):
+        return []
+    return [nome] + list((miniaturas_da_foto(nome) or {}).values())
+
+
+def caminho_por_conteudo(conteudo: bytes) -> str:
+    """Nome relativo da foto pelo sha256 do conteúdo (ab/cd/<sha256>.webp)"""
+    digest = hashlib.sha256(conteudo).hexdigest()
+    subpastas = [digest[2 * nivel:2 * nivel + 2] for nivel in range(NIVEIS_SUBPASTA)]
+    return "/".join(subpastas + [f"{digest}.webp"])
+
+
+def _webp(imagem) -> bytes:
+    # Sem exif=/icc_profile=, o WebP sai sem metadados (GPS, câmera etc.)
+    saida = io.BytesIO()
+    imagem.save(saida, "WEBP", quality=IMAGEM_QUALIDADE, method=4)
+    return saida.getvalue()
+
+
+def _remover(caminho: str):
+    try:
+        os.remove(caminho)
+    except FileNotFoundError:
+        pass
+
+
+def remover_foto(nome: Optional[str], armazenamento=None):
+    """Remove a foto e as miniaturas (ver liberar_foto)"""
+    armazenamento = armazenamento or armazenamento_padrao
+    for arquivo in arquivos_da_foto(nome):
+        armazenamento.remover(arquivo)
+
+
+def referencias_da_foto(db, nome: str) -> int:
+    """Quantos usuários usam a foto (contagem de referências do arquivo compartilhado)"""
+    from models import User
+
+    return db.query(func.count(User.id)).filter(User.profile_picture == nome).scalar()
+
+
+def _dentro_da_carencia(armazenamento, nome: str, carencia: int) -> bool:
+    modificado_em = armazenamento.modificado_em(nome)
+    return modificado_em is not None and time.time() - modificado_em < carencia
+
+
+def liberar_foto(db, nome: Optional[str], armazenamento=None, carencia: int = IMAGEM_CARENCIA_REMOCAO) -> bool:
+    """Remove a foto que deixou de ser usada, após o commit que trocou ou excluiu a
+    referência. Fotos ainda referenciadas por outro usuário são mantidas, assim como
+    as gravadas ou reaproveitadas há menos de `carencia` segundos (ficam para
+    limpar_orfaos)."""
+    armazenamento = armazenamento or armazenamento_padrao
+    if not nome or referencias_da_foto(db, nome):
+        return False
+    if _dentro_da_carencia(armazenamento, nome, carencia):
+        return False
+    remover_foto(nome, armazenamento)
+    return True
+
+
+def processar_foto(caminho: str, armazenamento=None) -> str:
+    """Valida e converte a imagem em caminho; retorna o nome da foto gravada no armazenamento.
+    Levanta ValueError se o arquivo não for uma imagem aceita."""
+    # Pillow só quando há foto a processar: fora do caminho de importação dos workers
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    armazenamento = armazenamento or armazenamento_padrao
+    try:
+        with Image.open(caminho) as imagem:
+            if imagem.format not in FORMATOS_ACEITOS:
+                raise ValueError("Tipo de arquivo não permitido")
+            if imagem.width * imagem.height > IMAGEM_MAX_PIXELS:
+                raise ValueError("Imagem com resolução muito grande")
+            imagem.load()  # só o primeiro quadro de GIFs animados
+            imagem = ImageOps.exif_transpose(imagem)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError):
+        raise ValueError("Arquivo não é uma imagem válida")
+
+    modo = "RGBA" if imagem.mode in ("RGBA", "LA", "PA") or "transparency" in imagem.info else "RGB"
+    imagem = imagem.convert(modo)
+
+    foto = imagem.copy()
+    foto.thumbnail((IMAGEM_TAMANHO_MAXIMO, IMAGEM_TAMANHO_MAXIMO), Image.LANCZOS)
+    conteudo = _webp(foto)
+    nome = caminho_por_conteudo(conteudo)
+    gravados = []
+    try:
+        # Mesma foto, mesmo nome: as miniaturas também já existem e não são refeitas; a
+        # data renovada protege os arquivos da remoção até o commit (ver liberar_foto)
+        if not armazenamento.tocar(nome, "image/webp", CACHE_IMUTAVEL):
+            armazenamento.gravar(nome, conteudo, "image/webp", CACHE_IMUTAVEL)
+            gravados.append(nome)
+        for tamanho in IMAGEM_MINIATURAS:
+            miniatura = nome_miniatura(nome, tamanho)
+            if not armazenamento.tocar(miniatura, "image/webp", CACHE_IMUTAVEL):
+                conteudo_miniatura = _webp(ImageOps.fit(imagem, (tamanho, tamanho), Image.LANCZOS))
+                armazenamento.gravar(miniatura, conteudo_miniatura, "image/webp", CACHE_IMUTAVEL)
+                gravados.append(miniatura)
+    except BaseException:
+        for arquivo in gravados:
+            armazenamento.remover(arquivo)
+        raise
+    return nome
+
+
+async def gravar_foto_perfil(request, armazenamento=None, limite: int = MAX_FILE_SIZE) -> str:
+    """Upload limitado + processamento no pool de imagens; retorna o nome da nova foto"""
+    caminho, nome_arquivo = await salvar_upload_limitado(request, limite)
+    try:
+        # O conteúdo é validado pelo Pillow; a extensão só filtra envios por engano
+        if os.path.splitext(nome_arquivo)[1].lower() not in ALLOWED_EXTENSIONS:
+            raise ValueError("Tipo de arquivo não permitido")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_pool_imagens, processar_foto, caminho, armazenamento)
+    finally:
+        _remover(caminho)
+
+
+def chave_upload_direto(user_id: int) -> str:
+    """Chave de entrada de um upload direto; o prefixo amarra a chave ao usuário"""
+    return f"{PREFIXO_ENTRADA}{user_id}/{uuid.uuid4().hex}"
+
+
+def _processar_upload_direto(chave: str, armazenamento, limite: int) -> str:
+    """Baixa o objeto de entrada, processa a foto e remove a entrada"""
+    caminho = os.path.join(tempfile.gettempdir(), f"erp-upload-{uuid.uuid4().hex}")
+    try:
+        if not armazenamento.existe(chave):
+            raise ValueError("Upload não encontrado")
+        if armazenamento.tamanho(chave) > limite:
+            raise ArquivoMuitoGrande(f"Arquivo maior que {limite // 1024} KB")
+        armazenamento.baixar(chave, caminho)
+        return processar_foto(caminho, armazenamento)
+    finally:
+        _remover(caminho)
+        armazenamento.remover(chave)
+
+
+async def confirmar_upload_direto(
+    chave: str, user_id: int, armazenamento=None, limite: int = MAX_FILE_SIZE
+) -> str:
+    """Processa a foto enviada direto ao armazenamento (ver armazenamento.url_upload_direto).
+    O download e a conversão rodam no pool de imagens; retorna o nome da nova foto."""
+    if not chave.startswith(f"{PREFIXO_ENTRADA}{user_id}/"):
+        raise ValueError("Chave de upload inválida")
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _pool_imagens, _processar_upload_direto, chave, armazenamento or armazenamento_padrao, limite
+    )
+
+
+def limpar_orfaos(
+    db, armazenamento=None, idade_minima_entrada: int = ARMAZENAMENTO_URL_EXPIRACAO,
+    carencia: int = IMAGEM_CARENCIA_REMOCAO,
+) -> List[str]:
+    """Remove os arquivos que nenhum usuário referencia; retorna os removidos.
+    Uploads diretos em andamento (entradas mais novas que a validade da URL) e fotos
+    gravadas ou reaproveitadas há menos de `carencia` segundos são mantidos."""
+    from models import User
+
+    armazenamento = armazenamento or armazenamento_padrao
+    referenciados = set()
+    for (nome,) in db.query(User.profile_picture).filter(User.profile_picture.isnot(None)):
+        referenciados.update(arquivos_da_foto(nome))
+    limite_entrada = time.time() - idade_minima_entrada
+    limite_carencia = time.time() - carencia
+    removidos = []
+    for nome, modificado_em in sorted(armazenamento.listar()):
+        if nome in referenciados or modificado_em > limite_carencia:
+            continue
+        if nome.startswith(PREFIXO_ENTRADA) and modificado_em > limite_entrada:
+            continue
+        armazenamento.remover(nome)
+        removidos.append(nome)
+    return removidos
+
+
+class ArquivosImutaveis(StaticFiles):
+    """StaticFiles para as fotos: arquivos endereçados por conteúdo saem com cache
+    imutável de um ano e ETag forte (o próprio hash); os demais (fotos antigas, com
+    nome aleatório) são revalidados a cada uso. If-None-Match aceita lista e "*"."""
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        request_headers = Headers(scope=scope)
+        relativo = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+        endereco = ENDERECADO_POR_CONTEUDO.match(relativo)
+        if endereco:
+            cabecalhos = {"etag": f'"{endereco.group(1)}"', "cache-control": CACHE_IMUTAVEL}
+        else:
+            cabecalhos = {"cache-control": "no-cache"}
+        response = FileResponse(
+            full_path, status_code=status_code, stat_result=stat_result, method=scope["method"],
+            headers=cabecalhos,
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def is_not_modified(self, response_headers, request_headers) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is None:  # If-None-Match tem precedência sobre If-Modified-Since
+            return super().is_not_modified(response_headers, request_headers)
+        etag = response_headers.get("etag", "").removeprefix("W/")
+        candidatos = {candidato.strip().removeprefix("W/") for candidato in if_none_match.split(",")}
+        return "*" in candidatos or etag in candidatos
+
+
+def app_uploads(armazenamento=None):
+    """Aplicação montada em /uploads: arquivos locais com ArquivosImutaveis ou, no S3,
+    redirecionamento para a URL do objeto"""
+    armazenamento = armazenamento or armazenamento_padrao
+    if armazenamento.tipo == "local":
+        return ArquivosImutaveis(directory=armazenamento.pasta)
+
+    async def redirecionar(request):
+        nome = request.path_params["nome"]
+        try:
+            url = armazenamento.url(nome)
+        except ValueError:
+            return RedirectResponse("/static/default-avatar.svg")
+        if armazenamento.url_publica and ENDERECADO_POR_CONTEUDO.match(nome):
+            return RedirectResponse(url, status_code=301, headers={"cache-control": CACHE_IMUTAVEL})
+        # URL pré-assinada: pode ser reaproveitada só enquanto ainda for válida
+        return RedirectResponse(url, headers={"cache-control": f"private, max-age={armazenamento.expiracao // 2}"})
+
+    return Router(routes=[Route("/{nome:path}", redirecionar, methods=["GET", "HEAD"])])
+
+
+def main():
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limpar-orfaos", action="store_true", help="Remove uploads sem usuário")
+    args = parser.parse_args()
+    if not args.limpar_orfaos:
+        parser.print_help()
+        return
+
+    db = SessionLocal()
+    try:
+        removidos = limpar_orfaos(db)
+    finally:
+        db.close()
+    for arquivo in removidos:
+        print(f"  🗑️  {arquivo}")
+    print(f"✅ {len(removidos)} arquivo(s) órfão(s) removido(s) do armazenamento {armazenamento_padrao.tipo}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Importação de extratos bancários (OFX e CSV) para contas a pagar e a receber.
+
+O arquivo é lido de forma incremental: o CSV linha a linha e o OFX em blocos,
+transação a transação. Os lançamentos são gravados em lotes de
+IMPORTACAO_TAMANHO_LOTE, com um commit por lote, e o progresso é informado ao fim
+de cada lote. Assim a memória usada não depende do tamanho do arquivo.
+
+Saídas (valor negativo) viram ContaPagar e entradas viram ContaReceber, já pagas
+na data do lançamento. A categoria vem das regras de palavras-chave
+(REGRAS_PADRAO e, antes delas, as do arquivo JSON em IMPORTACAO_REGRAS, no formato
+{"palavra-chave": "categoria"}).
+
+Cada lançamento recebe um hash (data, valor, descrição e FITID do OFX ou a
+ocorrência no dia, no CSV) guardado em hash_importacao, com índice único por
+usuário: importar o mesmo extrato de novo, ou extratos sobrepostos, não duplica
+lançamentos. No CSV, lançamentos idênticos no mesmo dia são distinguidos pela
+ordem em que aparecem; o extrato deve estar ordenado por data.
+
+CSV: cabeçalho com as colunas de data, descrição e valor (nomes reconhecidos em
+COLUNAS_CSV), separador ";", "," ou tabulação, datas dd/mm/aaaa ou aaaa-mm-dd e
+valores em qualquer um dos formatos 1.234,56 ou 1234.56.
+
+Uso:
+    python importacao.py extrato.ofx --usuario admin
+    python importacao.py extrato.csv --usuario admin --lote 5000 --encoding latin-1
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import unicodedata
+from dataclasses import dataclass, field, asdict
+from datetime import date, datetime
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple, Union
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from models import ContaPagar, ContaReceber, CategoriaConta, StatusConta
+from config import IMPORTACAO_REGRAS, IMPORTACAO_TAMANHO_LOTE
+from cache import marcar_usuario_alterado
+from resumos import aplicar_deltas, novos_deltas
+
+FORMATOS = ("ofx", "csv")
+
+# Mensagens de erro guardadas no progresso (as demais só são contadas)
+MAX_MENSAGENS_ERRO = 20
+
+# Nomes de coluna aceitos no cabeçalho do CSV (comparados sem acentos e em minúsculas)
+COLUNAS_CSV = {
+    "data": ("data", "date", "data lancamento", "data do lancamento", "data movimento", "dt"),
+    "descricao": ("descricao", "historico", "description", "memo", "lancamento", "detalhe"),
+    "valor": ("valor", "amount", "valor (r$)", "quantia"),
+}
+
+REGRAS_PADRAO: Dict[str, CategoriaConta] = {
+    "supermercado": CategoriaConta.ALIMENTACAO,
+    "mercado": CategoriaConta.ALIMENTACAO,
+    "padaria": CategoriaConta.ALIMENTACAO,
+    "restaurante": CategoriaConta.ALIMENTACAO,
+    "lanchonete": CategoriaConta.ALIMENTACAO,
+    "ifood": CategoriaConta.ALIMENTACAO,
+    "uber": CategoriaConta.TRANSPORTE,
+    "99app": CategoriaConta.TRANSPORTE,
+    "posto": CategoriaConta.TRANSPORTE,
+    "combustivel": CategoriaConta.TRANSPORTE,
+    "estacionamento": CategoriaConta.TRANSPORTE,
+    "pedagio": CategoriaConta.TRANSPORTE,
+    "aluguel": CategoriaConta.MORADIA,
+    "condominio": CategoriaConta.MORADIA,
+    "energia": CategoriaConta.MORADIA,
+    "saneamento": CategoriaConta.MORADIA,
+    "internet": CategoriaConta.MORADIA,
+    "farmacia": CategoriaConta.SAUDE,
+    "drogaria": CategoriaConta.SAUDE,
+    "hospital": CategoriaConta.SAUDE,
+    "clinica": CategoriaConta.SAUDE,
+    "plano de saude": CategoriaConta.SAUDE,
+    "escola": CategoriaConta.EDUCACAO,
+    "faculdade": CategoriaConta.EDUCACAO,
+    "curso": CategoriaConta.EDUCACAO,
+    "livraria": CategoriaConta.EDUCACAO,
+    "cinema": CategoriaConta.LAZER,
+    "netflix": CategoriaConta.LAZER,
+    "spotify": CategoriaConta.LAZER,
+    "viagem": CategoriaConta.LAZER,
+}
+
+
+@dataclass
+class Lancamento:
+    data: date
+    descricao: str
+    valor: float  # negativo para saídas
+    identificador: Optional[str] = None  # FITID do OFX
+
+
+@dataclass
+class ErroLeitura:
+    posicao: int  # linha do CSV ou transação do OFX
+    mensagem: str
+
+
+@dataclass
+class ProgressoImportacao:
+    lidos: int = 0
+    importados: int = 0
+    duplicados: int = 0
+    erros: int = 0
+    lotes: int = 0
+    concluido: bool = False
+    mensagens_erro: List[str] = field(default_factory=list)
+
+    def registrar_erro(self, erro: ErroLeitura):
+        self.erros += 1
+        if len(self.mensagens_erro) < MAX_MENSAGENS_ERRO:
+            self.mensagens_erro.append(f"{erro.posicao}: {erro.mensagem}")
+
+    def dict(self) -> dict:
+        return asdict(self)
+
+
+# ==================== NORMALIZAÇÃO ====================
+
+def normalizar_texto(texto: str) -> str:
+    """Minúsculas, sem acentos e com espaços simples"""
+    sem_acentos = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode()
+    return " ".join(sem_acentos.lower().split())
+
+
+def converter_valor(texto: str) -> float:
+    """Aceita 1.234,56 / 1234,56 / 1,234.56 / 1234.56, com sinal ou 'R$'"""
+    limpo = texto.strip().replace("R$", "").replace(" ", "")
+    if "," in limpo and "." in limpo:
+        # O último separador é o decimal
+        if limpo.rfind(",") > limpo.rfind("."):
+            limpo = limpo.replace(".", "").replace(",", ".")
+        else:
+            limpo = limpo.replace(",", "")
+    elif "," in limpo:
+        limpo = limpo.replace(",", ".")
+    return float(limpo)
+
+
+def converter_data(texto: str) -> date:
+    texto = texto.strip()
+    for formato in ("%d/%m/%Y", "%Y-%m-%d", "%d/%m/%y", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            continue
+    raise ValueError(f"data inválida '{texto}'")
+
+
+# ==================== LEITORES ====================
+
+def _detectar_delimitador(cabecalho: str) -> str:
+    return max((";", ",", "\t"), key=cabecalho.count)
+
+
+def _validar(lancamento: Lancamento, posicao: int) -> Union[Lancamento, ErroLeitura]:
+    if lancamento.valor == 0:
+        return ErroLeitura(posicao, "lançamento com valor zero")
+    return lancamento
+
+
+def ler_csv(arquivo: TextIO) -> Iterator[Union[Lancamento, ErroLeitura]]:
+    """Valida o cabeçalho e devolve um iterador que lê o CSV linha a linha"""
+    primeira = arquivo.readline()
+    if not primeira:
+        raise ValueError("Arquivo CSV vazio")
+    delimitador = _detectar_delimitador(primeira)
+    cabecalho = [normalizar_texto(nome) for nome in next(csv.reader([primeira], delimiter=delimitador))]
+
+    indices = {}
+    for campo, nomes in COLUNAS_CSV.items():
+        encontrados = [i for i, nome in enumerate(cabecalho) if nome in nomes]
+        if not encontrados:
+            raise ValueError(f"Coluna de {campo} não encontrada no cabeçalho do CSV")
+        indices[campo] = encontrados[0]
+    return _linhas_csv(arquivo, delimitador, indices)
+
+
+def _linhas_csv(arquivo: TextIO, delimitador: str, indices: Dict[str, int]) -> Iterator[Union[Lancamento, ErroLeitura]]:
+    ultima_coluna = max(indices.values())
+    for numero, linha in enumerate(csv.reader(arquivo, delimiter=delimitador), start=2):
+        if not any(celula.strip() for celula in linha):
+            continue
+        if len(linha) <= ultima_coluna:
+            yield ErroLeitura(numero, "colunas faltando")
+            continue
+        try:
+            yield _validar(Lancamento(
+                data=converter_data(linha[indices["data"]]),
+                descricao=linha[indices["descricao"]].strip(),
+                valor=converter_valor(linha[indices["valor"]]),
+            ), numero)
+        except ValueError as erro:
+            yield ErroLeitura(numero, str(erro))
+
+
+def _tokens_ofx(arquivo: TextIO, tamanho_bloco: int = 64 * 1024) -> Iterator[str]:
+    """Trechos entre '<' do OFX, lidos em blocos (o OFX pode vir em uma única linha)"""
+    resto = ""
+    while True:
+        bloco = arquivo.read(tamanho_bloco)
+        if not bloco:
+            break
+        partes = (resto + bloco).split("<")
+        resto = partes.pop()
+        yield from partes
+    if resto:
+        yield resto
+
+
+def ler_ofx(arquivo: TextIO) -> Iterator[Union[Lancamento, ErroLeitura]]:
+    """Lê as transações (<STMTTRN>) do OFX, em SGML (OFX 1.x) ou XML (OFX 2.x)"""
+    transacao: Optional[Dict[str, str]] = None
+    numero = 0
+    for token in _tokens_ofx(arquivo):
+        nome, _, valor = token.partition(">")
+        nome = nome.strip().upper()
+        if nome == "STMTTRN":
+            transacao = {}
+        elif nome == "/STMTTRN" and transacao is not None:
+            numero += 1
+            try:
+                yield _validar(Lancamento(
+                    data=datetime.strptime(transacao.get("DTPOSTED", "")[:8], "%Y%m%d").date(),
+                    descricao=transacao.get("MEMO") or transacao.get("NAME") or "",
+                    valor=converter_valor(transacao.get("TRNAMT", "")),
+                    identificador=transacao.get("FITID") or None,
+                ), numero)
+            except ValueError as erro:
+                yield ErroLeitura(numero, str(erro))
+            transacao = None
+        elif transacao is not None and not nome.startswith("/"):
+            transacao[nome] = valor.strip()
+
+
+def abrir_leitor(arquivo: TextIO, formato: str) -> Iterator[Union[Lancamento, ErroLeitura]]:
+    """Leitor do formato; erros de cabeçalho/formato são levantados aqui (ValueError)"""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato '{formato}' não suportado; use {' ou '.join(FORMATOS)}")
+    return ler_ofx(arquivo) if formato == "ofx" else ler_csv(arquivo)
+
+
+def detectar_formato(nome_arquivo: str) -> str:
+    extensao = os.path.splitext(nome_arquivo or "")[1].lower().lstrip(".")
+    if extensao not in FORMATOS:
+        raise ValueError(f"Não foi possível identificar o formato de '{nome_arquivo}'; informe ofx ou csv")
+    return extensao
+
+
+# ==================== CATEGORIAS ====================
+
+def carregar_regras(caminho: Optional[str] = IMPORTACAO_REGRAS) -> List[Tuple[str, CategoriaConta]]:
+    """Regras (palavra-chave, categoria) na ordem de prioridade: as do arquivo, depois as padrão"""
+    regras = []
+    if caminho:
+        with open(caminho, encoding="utf-8") as arquivo:
+            for palavra, categoria in json.load(arquivo).items():
+                regras.append((normalizar_texto(palavra), CategoriaConta(categoria)))
+    regras.extend(REGRAS_PADRAO.items())
+    return regras
+
+
+def classificar(descricao: str, regras: List[Tuple[str, CategoriaConta]]) -> CategoriaConta:
+    texto = normalizar_texto(descricao)
+    for palavra, categoria in regras:
+        if palavra in texto:
+            return categoria
+    return CategoriaConta.OUTROS
+
+
+# ==================== IMPORTAÇÃO ====================
+
+def hash_lancamento(lancamento: Lancamento, ocorrencia: int = 0) -> str:
+    partes = (
+        lancamento.data.isoformat(),
+        f"{lancamento.valor:.2f}",
+        normalizar_texto(lancamento.descricao),
+        lancamento.identificador or str(ocorrencia),
+    )
+    return hashlib.sha256("|".join(partes).encode()).hexdigest()
+
+
+class _Hasher:
+    """Conta lançamentos idênticos no mesmo dia; só guarda as contagens do dia corrente"""
+
+    def __init__(self):
+        self.dia = None
+        self.ocorrencias: Dict[Tuple[float, str], int] = {}
+
+    def __call__(self, lancamento: Lancamento) -> str:
+        if lancamento.identificador:
+            return hash_lancamento(lancamento)
+        if lancamento.data != self.dia:
+            self.dia = lancamento.data
+            self.ocorrencias.clear()
+        chave = (lancamento.valor, normalizar_texto(lancamento.descricao))
+        ocorrencia = self.ocorrencias.get(chave, 0)
+        self.ocorrencias[chave] = ocorrencia + 1
+        return hash_lancamento(lancamento, ocorrencia)
+
+
+def _hashes_existentes(db: Session, modelo, user_id: int, hashes: List[str]) -> set:
+    if not hashes:
+        return set()
+    return set(db.scalars(
+        select(modelo.hash_importacao).where(modelo.user_id == user_id, modelo.hash_importacao.in_(hashes))
+    ).all())
+
+
+def _gravar_lote(
+    db: Session,
+    user_id: int,
+    lancamentos: List[Tuple[str, Lancamento]],
+    regras: List[Tuple[str, CategoriaConta]],
+    progresso: ProgressoImportacao
+):
+    """Insere os lançamentos ainda não importados com um INSERT por tabela e soma-os aos resumos"""
+    # Duplicados dentro do próprio lote (extratos sobrepostos no mesmo arquivo)
+    unicos = dict(lancamentos)
+    progresso.duplicados += len(lancamentos) - len(unicos)
+
+    saidas = [h for h, lancamento in unicos.items() if lancamento.valor < 0]
+    entradas = [h for h, lancamento in unicos.items() if lancamento.valor > 0]
+    existentes = (
+        _hashes_existentes(db, ContaPagar, user_id, saidas)
+        | _hashes_existentes(db, ContaReceber, user_id, entradas)
+    )
+    progresso.duplicados += len(existentes)
+
+    contas_pagar, contas_receber = [], []
+    deltas = novos_deltas()
+    for h, lancamento in unicos.items():
+        if h in existentes:
+            continue
+        valor = abs(lancamento.valor)
+        linha = {
+            "user_id": user_id,
+            "descricao": lancamento.descricao or "Lançamento importado",
+            "valor": valor,
+            "data_vencimento": lancamento.data,
+            "categoria": classificar(lancamento.descricao, regras),
+            "status": StatusConta.PAGO,
+            "observacoes": "Importado de extrato",
+            "hash_importacao": h,
+        }
+        chave = (user_id, lancamento.data.year, lancamento.data.month)
+        if lancamento.valor < 0:
+            contas_pagar.append({**linha, "data_pagamento": lancamento.data})
+            deltas[chave]["total_despesas"] += valor
+        else:
+            contas_receber.append({**linha, "data_recebimento": lancamento.data})
+            deltas[chave]["total_receitas"] += valor
+
+    # O INSERT em lote não passa pelo flush: resumos e cache são atualizados aqui
+    if contas_pagar:
+        db.execute(insert(ContaPagar), contas_pagar)
+    if contas_receber:
+        db.execute(insert(ContaReceber), contas_receber)
+    if contas_pagar or contas_receber:
+        aplicar_deltas(db, deltas)
+        marcar_usuario_alterado(db, user_id)
+    progresso.importados += len(contas_pagar) + len(contas_receber)
+
+
+def importar_extrato(
+    db: Session,
+    user_id: int,
+    leitor: Iterator[Union[Lancamento, ErroLeitura]],
+    tamanho_lote: int = IMPORTACAO_TAMANHO_LOTE,
+    regras: Optional[List[Tuple[str, CategoriaConta]]] = None
+) -> Iterator[ProgressoImportacao]:
+    """Importa os lançamentos do leitor (ver `abrir_leitor`) em lotes, com um commit por lote,
+    e produz o progresso após cada um. Em caso de erro, os lotes anteriores permanecem
+    gravados; importar o arquivo de novo pula o que já foi importado."""
+    regras = carregar_regras() if regras is None else regras
+    hasher = _Hasher()
+    progresso = ProgressoImportacao()
+
+    while True:
+        lote = list(islice(leitor, tamanho_lote))
+        if not lote:
+            break
+        progresso.lidos += len(lote)
+        lancamentos = []
+        for item in lote:
+            if isinstance(item, ErroLeitura):
+                progresso.registrar_erro(item)
+            else:
+                lancamentos.append((hasher(item), item))
+
+        _gravar_lote(db, user_id, lancamentos, regras, progresso)
+        db.commit()
+        progresso.lotes += 1
+        yield progresso
+
+    progresso.concluido = True
+    yield progresso
+
+
+def main():
+    from database import SessionLocal
+    from models import User
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("arquivo", help="Extrato OFX ou CSV")
+    parser.add_argument("--usuario", required=True, help="Username do dono dos lançamentos")
+    parser.add_argument("--formato", choices=FORMATOS, help="Padrão: pela extensão do arquivo")
+    parser.add_argument("--lote", type=int, default=IMPORTACAO_TAMANHO_LOTE, help="Lançamentos por commit")
+    parser.add_argument("--encoding", default="utf-8-sig", help="Codificação do arquivo (ex.: latin-1)")
+    args = parser.parse_args()
+
+    formato = args.formato or detectar_formato(args.arquivo)
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == args.usuario).first()
+        if user is None:
+            print(f"❌ Usuário '{args.usuario}' não encontrado")
+            return
+        print(f"🔄 Importando {args.arquivo} ({formato}) para {user.username}...")
+        with open(args.arquivo, encoding=args.encoding, errors="replace", newline="") as arquivo:
+            for progresso in importar_extrato(db, user.id, abrir_leitor(arquivo, formato), args.lote):
+                print(f"  lidos: {progresso.lidos}  importados: {progresso.importados}  "
+                      f"duplicados: {progresso.duplicados}  erros: {progresso.erros}")
+        for mensagem in progresso.mensagens_erro:
+            print(f"  ⚠️  {mensagem}")
+        print("✅ Importação concluída")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,28 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from database import engine, get_db
-from models import Base, User
-from routers import auth, users, web, financeiro
-from config import ROLES
-from auth import get_password_hash
-import os
+from starlette.concurrency import run_in_threadpool
+from database import async_engine
+from routers import auth, users, web
+from config import AGENDADOR_ATIVO, ROUTERS_SOB_DEMANDA
+from cache import cache, principais
+from agendador import agendador
+from imagens import app_uploads
+from bootstrap import banco_preparado
+import resumos  # noqa: F401 - manutenção dos resumos em toda sessão, mesmo antes do router financeiro
+import importlib
+import logging
 
-# Criar tabelas do banco de dados
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
+
+# Routers pesados, incluídos na primeira requisição ao prefixo da URL quando
+# ROUTERS_SOB_DEMANDA=true: {prefixo da URL: (módulo, prefix do include_router)}
+ROUTERS_PESADOS = {
+    "/api/financeiro": ("routers.financeiro", "/api"),
+}
+
+# As tabelas, as migrações e o admin padrão ficam em bootstrap.py, executado uma
+# vez antes de subir os workers (run.py já o executa): importar main não toca no banco.
 
 # Criar aplicação FastAPI
 app = FastAPI(
@@ -26,39 +38,71 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Proximo-Cursor", "X-Total-Count"],
 )
 
 # Incluir routers
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(web.router)
-app.include_router(financeiro.router, prefix="/api")
+
+_routers_pendentes = dict(ROUTERS_PESADOS)
+
+def incluir_router_pendente(prefixo_url: str):
+    """Importa e inclui um router de ROUTERS_PESADOS (uma única vez)"""
+    modulo, prefix = _routers_pendentes.pop(prefixo_url)
+    app.include_router(importlib.import_module(modulo).router, prefix=prefix)
+
+def incluir_routers_pendentes():
+    for prefixo_url in list(_routers_pendentes):
+        incluir_router_pendente(prefixo_url)
+
+class RoutersSobDemanda:
+    """Middleware ASGI: inclui o router pesado antes da primeira requisição ao seu
+    prefixo, para o worker ficar pronto sem importá-lo. Sem await entre a verificação
+    e a inclusão, não há corrida entre requisições do mesmo event loop."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if _routers_pendentes and scope["type"] in ("http", "websocket"):
+            for prefixo_url in list(_routers_pendentes):
+                if scope["path"].startswith(prefixo_url):
+                    incluir_router_pendente(prefixo_url)
+        await self.app(scope, receive, send)
+
+def openapi_completo():
+    """/docs e /openapi.json listam também as rotas ainda não carregadas"""
+    incluir_routers_pendentes()
+    return FastAPI.openapi(app)
+
+if ROUTERS_SOB_DEMANDA:
+    app.add_middleware(RoutersSobDemanda)
+    app.openapi = openapi_completo
+else:
+    incluir_routers_pendentes()
 
 # Servir arquivos estáticos
 app.mount("/static", StaticFiles(directory="static"), name="static")
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.mount("/uploads", app_uploads(), name="uploads")
 
 @app.on_event("startup")
 async def startup_event():
-    """Criar usuário admin padrão se não existir"""
-    db = next(get_db())
-    
-    # Verificar se já existe um admin
-    admin_user = db.query(User).filter(User.role == ROLES["admin"]).first()
+    """Inicia as rotinas periódicas; o banco é preparado por bootstrap.py"""
+    if not await run_in_threadpool(banco_preparado):
+        logger.warning("Banco sem tabelas: execute 'python bootstrap.py' e reinicie a aplicação")
+        return
     
-    if not admin_user:
-        # Criar usuário admin padrão
-        admin_user = User(
-            email="admin@erp.com",
-            username="admin",
-            hashed_password=get_password_hash("admin123"),
-            full_name="Administrador",
-            role=ROLES["admin"],
-            is_active=True
-        )
-        db.add(admin_user)
-        db.commit()
-        print("Usuário admin criado: admin@erp.com / admin123")
+    # Rotinas periódicas (contas vencidas...)
+    if AGENDADOR_ATIVO:
+        agendador.iniciar()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await agendador.parar()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 @app.get("/")
 def read_root():
@@ -72,6 +116,18 @@ def read_root():
 def health_check():
     return {"status": "healthy"}
 
+@app.get("/health/cache")
+def cache_stats():
+    """Acertos, falhas e tamanho dos caches de respostas e de usuários autenticados (por processo)"""
+    return {"respostas": cache.estatisticas(), "principais": principais.estatisticas()}
+
+@app.get("/health/agendador")
+def agendador_stats():
+    """Execuções, falhas e tempos das rotinas periódicas (por processo)"""
+    return agendador.estatisticas()
+
 if __name__ == "__main__":
     import uvicorn
+    from bootstrap import preparar
+    preparar()
     uvicorn.run(app, host="0.0.0.0", port=8000)
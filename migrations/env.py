@@ -0,0 +1,60 @@
+"""
+Ambiente do Alembic para o ERP Pessoal
+"""
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import create_engine
+from config import DATABASE_URL
+from database import Base
+import models  # noqa: F401 - registra os modelos no metadata
+
+config = context.config
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    """Gera o SQL das migrações sem conectar ao banco"""
+    context.configure(
+        url=DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=DATABASE_URL.startswith("sqlite"),
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _executar_migracoes(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    """Executa as migrações conectado ao banco"""
+    # Permite que o chamador reutilize uma conexão já aberta
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _executar_migracoes(connection)
+        return
+
+    engine = create_engine(DATABASE_URL)
+    with engine.connect() as connection:
+        _executar_migracoes(connection)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
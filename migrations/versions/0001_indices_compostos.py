@@ -0,0 +1,61 @@
+"""índices compostos para consultas por usuário, status e data
+
+As tabelas continuam sendo criadas por Base.metadata.create_all; esta migração
+adiciona os índices compostos aos bancos que já existiam. Em bancos novos o
+create_all já cria os índices, então os existentes são ignorados.
+
+O índice de metas_mensais é único: antes dele, as metas repetidas para o mesmo
+usuário e mês (criadas por requisições simultâneas) são removidas, mantendo a
+mais antiga, que era a lida pela aplicação.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+INDICES = [
+    ("ix_contas_pagar_user_status_pagamento", "contas_pagar", ["user_id", "status", "data_pagamento"], False),
+    ("ix_contas_pagar_user_status_vencimento", "contas_pagar", ["user_id", "status", "data_vencimento"], False),
+    ("ix_contas_pagar_user_vencimento", "contas_pagar", ["user_id", "data_vencimento"], False),
+    ("ix_contas_receber_user_status_recebimento", "contas_receber", ["user_id", "status", "data_recebimento"], False),
+    ("ix_contas_receber_user_status_vencimento", "contas_receber", ["user_id", "status", "data_vencimento"], False),
+    ("ix_contas_receber_user_vencimento", "contas_receber", ["user_id", "data_vencimento"], False),
+    ("ix_metas_financeiras_user_status_data_meta", "metas_financeiras", ["user_id", "status", "data_meta"], False),
+    ("ix_transacoes_meta_user_data", "transacoes_meta", ["user_id", "data_transacao"], False),
+    ("ix_transacoes_meta_meta_data", "transacoes_meta", ["meta_id", "data_transacao"], False),
+    ("ix_investimentos_user_data", "investimentos", ["user_id", "data_investimento"], False),
+    ("ix_investimentos_user_ativo", "investimentos", ["user_id", "ativo"], False),
+    ("ix_metas_mensais_user_ano_mes", "metas_mensais", ["user_id", "ano", "mes"], True),
+]
+
+
+def _indices_existentes(tabela):
+    return {indice["name"] for indice in sa.inspect(op.get_bind()).get_indexes(tabela)}
+
+
+def _remover_metas_mensais_repetidas():
+    """Mantém só a meta mensal de menor id por (user_id, ano, mes)"""
+    metas = sa.table("metas_mensais", sa.column("id"), sa.column("user_id"), sa.column("ano"), sa.column("mes"))
+    manter = sa.select(sa.func.min(metas.c.id)).group_by(metas.c.user_id, metas.c.ano, metas.c.mes)
+    op.get_bind().execute(sa.delete(metas).where(metas.c.id.not_in(manter.scalar_subquery())))
+
+
+def upgrade():
+    for nome, tabela, colunas, unico in INDICES:
+        if nome not in _indices_existentes(tabela):
+            if nome == "ix_metas_mensais_user_ano_mes":
+                _remover_metas_mensais_repetidas()
+            op.create_index(nome, tabela, colunas, unique=unico)
+
+
+def downgrade():
+    for nome, tabela, _, _ in reversed(INDICES):
+        if nome in _indices_existentes(tabela):
+            op.drop_index(nome, table_name=tabela)
@@ -0,0 +1,84 @@
+"""resumos financeiros mensais materializados
+
+Passa a existir no máximo um resumo por (user_id, ano, mes), garantido por índice
+único, e os resumos são recalculados a partir das transações. Daqui em diante eles
+são mantidos a cada escrita (ver resumos.py).
+
+As tabelas são descritas localmente para que a migração não dependa dos modelos
+atuais da aplicação.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from collections import defaultdict
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+INDICE = "ix_resumos_financeiros_user_ano_mes"
+
+resumos = sa.table(
+    "resumos_financeiros",
+    sa.column("id", sa.Integer), sa.column("user_id", sa.Integer),
+    sa.column("ano", sa.Integer), sa.column("mes", sa.Integer),
+    sa.column("total_receitas", sa.Float), sa.column("total_despesas", sa.Float),
+    sa.column("saldo_mensal", sa.Float), sa.column("total_investido", sa.Float),
+    sa.column("total_metas", sa.Float),
+)
+
+# tabela -> (campo do resumo, coluna de valor, coluna de data, exige status PAGO)
+CONTRIBUICOES = {
+    "contas_receber": ("total_receitas", "valor", "data_recebimento", True),
+    "contas_pagar": ("total_despesas", "valor", "data_pagamento", True),
+    "investimentos": ("total_investido", "valor_investido", "data_investimento", False),
+    "transacoes_meta": ("total_metas", "valor", "data_transacao", False),
+}
+
+
+def _indices_existentes():
+    return {indice["name"] for indice in sa.inspect(op.get_bind()).get_indexes("resumos_financeiros")}
+
+
+def _recalcular(conexao):
+    totais = defaultdict(lambda: dict.fromkeys(("total_receitas", "total_despesas", "total_investido", "total_metas"), 0.0))
+    for nome, (campo, coluna_valor, coluna_data, exige_pago) in CONTRIBUICOES.items():
+        colunas = [sa.column("user_id"), sa.column(coluna_valor), sa.column(coluna_data)]
+        if exige_pago:
+            colunas.append(sa.column("status"))
+        tabela = sa.table(nome, *colunas)
+        data = tabela.c[coluna_data]
+        ano, mes = sa.extract("year", data), sa.extract("month", data)
+        consulta = sa.select(tabela.c.user_id, ano, mes, sa.func.sum(tabela.c[coluna_valor])).where(
+            data.isnot(None)
+        ).group_by(tabela.c.user_id, ano, mes)
+        if exige_pago:
+            # Enums são gravados pelo nome do membro
+            consulta = consulta.where(tabela.c.status == "PAGO")
+        for user_id, l_ano, l_mes, total in conexao.execute(consulta):
+            totais[(user_id, int(l_ano), int(l_mes))][campo] = total or 0
+
+    conexao.execute(resumos.delete())
+    if totais:
+        conexao.execute(resumos.insert(), [
+            dict(user_id=user_id, ano=ano, mes=mes,
+                 saldo_mensal=campos["total_receitas"] - campos["total_despesas"], **campos)
+            for (user_id, ano, mes), campos in sorted(totais.items())
+        ])
+
+
+def upgrade():
+    conexao = op.get_bind()
+    # Resumos antigos podiam ter linhas duplicadas por mês; são todos recalculados
+    _recalcular(conexao)
+    if INDICE not in _indices_existentes():
+        op.create_index(INDICE, "resumos_financeiros", ["user_id", "ano", "mes"], unique=True)
+
+
+def downgrade():
+    if INDICE in _indices_existentes():
+        op.drop_index(INDICE, table_name="resumos_financeiros")
@@ -0,0 +1,46 @@
+"""saldo acumulado nos resumos financeiros mensais
+
+Adiciona resumos_financeiros.saldo_acumulado (soma dos saldos mensais de todo o
+histórico até o mês, inclusive) e o calcula para os resumos existentes.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def _colunas_existentes():
+    return {coluna["name"] for coluna in sa.inspect(op.get_bind()).get_columns("resumos_financeiros")}
+
+
+def upgrade():
+    if "saldo_acumulado" not in _colunas_existentes():
+        op.add_column("resumos_financeiros", sa.Column("saldo_acumulado", sa.Float(), server_default="0"))
+
+    resumos = sa.table(
+        "resumos_financeiros",
+        sa.column("user_id", sa.Integer), sa.column("ano", sa.Integer), sa.column("mes", sa.Integer),
+        sa.column("saldo_mensal", sa.Float), sa.column("saldo_acumulado", sa.Float),
+    )
+    anterior = resumos.alias("anterior")
+    acumulado = sa.select(sa.func.coalesce(sa.func.sum(anterior.c.saldo_mensal), 0)).where(
+        anterior.c.user_id == resumos.c.user_id,
+        sa.or_(
+            anterior.c.ano < resumos.c.ano,
+            sa.and_(anterior.c.ano == resumos.c.ano, anterior.c.mes <= resumos.c.mes)
+        )
+    ).scalar_subquery()
+    op.get_bind().execute(resumos.update().values(saldo_acumulado=acumulado))
+
+
+def downgrade():
+    if "saldo_acumulado" in _colunas_existentes():
+        with op.batch_alter_table("resumos_financeiros") as batch_op:
+            batch_op.drop_column("saldo_acumulado")
@@ -0,0 +1,42 @@
+"""hash de importação de extratos nas contas
+
+Adiciona contas_pagar.hash_importacao e contas_receber.hash_importacao, com índice
+único por usuário, usados para não importar o mesmo lançamento de extrato duas vezes.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+TABELAS = [
+    ("contas_pagar", "ix_contas_pagar_user_hash_importacao"),
+    ("contas_receber", "ix_contas_receber_user_hash_importacao"),
+]
+
+
+def _inspetor():
+    return sa.inspect(op.get_bind())
+
+
+def upgrade():
+    for tabela, indice in TABELAS:
+        if "hash_importacao" not in {coluna["name"] for coluna in _inspetor().get_columns(tabela)}:
+            op.add_column(tabela, sa.Column("hash_importacao", sa.String(64), nullable=True))
+        if indice not in {i["name"] for i in _inspetor().get_indexes(tabela)}:
+            op.create_index(indice, tabela, ["user_id", "hash_importacao"], unique=True)
+
+
+def downgrade():
+    for tabela, indice in TABELAS:
+        if indice in {i["name"] for i in _inspetor().get_indexes(tabela)}:
+            op.drop_index(indice, table_name=tabela)
+        if "hash_importacao" in {coluna["name"] for coluna in _inspetor().get_columns(tabela)}:
+            with op.batch_alter_table(tabela) as batch_op:
+                batch_op.drop_column("hash_importacao")
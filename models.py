@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Float, ForeignKey, Date, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Float, ForeignKey, Date, Enum, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
@@ -29,6 +29,12 @@ class User(Base):
     investimentos = relationship("Investimento", back_populates="user")
     transacoes_meta = relationship("TransacaoMeta", back_populates="user")
     
+    @property
+    def profile_picture_miniaturas(self):
+        """Miniaturas WebP da foto de perfil, por tamanho em px (ver imagens.py)"""
+        from imagens import miniaturas_da_foto
+        return miniaturas_da_foto(self.profile_picture)
+    
     def is_admin(self):
         return self.role == ROLES["admin"]
     
@@ -86,12 +92,21 @@ class ContaPagar(Base):
     total_parcelas = Column(Integer, nullable=True)  # Total de parcelas
     valor_parcela = Column(Float, nullable=True)  # Valor de cada parcela
     parcela_original_id = Column(Integer, ForeignKey("contas_pagar.id"), nullable=True)  # ID da conta original (primeira parcela)
+    hash_importacao = Column(String(64), nullable=True)  # Identifica lançamentos importados de extratos
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     user = relationship("User", back_populates="contas_pagar")
     # Relacionamento para parcelas
     parcelas = relationship("ContaPagar", backref="conta_original", remote_side=[id])
+    
+    # Índices para as consultas por usuário, status e mês
+    __table_args__ = (
+        Index("ix_contas_pagar_user_status_pagamento", "user_id", "status", "data_pagamento"),
+        Index("ix_contas_pagar_user_status_vencimento", "user_id", "status", "data_vencimento"),
+        Index("ix_contas_pagar_user_vencimento", "user_id", "data_vencimento"),
+        Index("ix_contas_pagar_user_hash_importacao", "user_id", "hash_importacao", unique=True),
+    )
 
 # Modelo para Contas a Receber
 class ContaReceber(Base):
@@ -106,10 +121,19 @@ class ContaReceber(Base):
     categoria = Column(Enum(CategoriaConta), nullable=False)
     status = Column(Enum(StatusConta), default=StatusConta.PENDENTE)
     observacoes = Column(Text, nullable=True)
+    hash_importacao = Column(String(64), nullable=True)  # Identifica lançamentos importados de extratos
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     user = relationship("User", back_populates="contas_receber")
+    
+    # Índices para as consultas por usuário, status e mês
+    __table_args__ = (
+        Index("ix_contas_receber_user_status_recebimento", "user_id", "status", "data_recebimento"),
+        Index("ix_contas_receber_user_status_vencimento", "user_id", "status", "data_vencimento"),
+        Index("ix_contas_receber_user_vencimento", "user_id", "data_vencimento"),
+        Index("ix_contas_receber_user_hash_importacao", "user_id", "hash_importacao", unique=True),
+    )
 
 # Modelo para Metas Financeiras
 class MetaFinanceira(Base):
@@ -130,6 +154,10 @@ class MetaFinanceira(Base):
     
     user = relationship("User", back_populates="metas_financeiras")
     transacoes = relationship("TransacaoMeta", back_populates="meta")
+    
+    __table_args__ = (
+        Index("ix_metas_financeiras_user_status_data_meta", "user_id", "status", "data_meta"),
+    )
 
 # Modelo para Histórico de Transações das Metas
 class TransacaoMeta(Base):
@@ -145,6 +173,11 @@ class TransacaoMeta(Base):
     
     user = relationship("User", back_populates="transacoes_meta")
     meta = relationship("MetaFinanceira", back_populates="transacoes")
+    
+    __table_args__ = (
+        Index("ix_transacoes_meta_user_data", "user_id", "data_transacao"),
+        Index("ix_transacoes_meta_meta_data", "meta_id", "data_transacao"),
+    )
 
 # Modelo para Investimentos
 class Investimento(Base):
@@ -165,8 +198,13 @@ class Investimento(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     user = relationship("User", back_populates="investimentos")
+    
+    __table_args__ = (
+        Index("ix_investimentos_user_data", "user_id", "data_investimento"),
+        Index("ix_investimentos_user_ativo", "user_id", "ativo"),
+    )
 
-# Modelo para Resumos Financeiros (para gráficos e relatórios)
+# Modelo para Resumos Financeiros (rollup mensal materializado para gráficos e relatórios)
 class ResumoFinanceiro(Base):
     __tablename__ = "resumos_financeiros"
     
@@ -179,10 +217,16 @@ class ResumoFinanceiro(Base):
     saldo_mensal = Column(Float, default=0.0)
     total_investido = Column(Float, default=0.0)
     total_metas = Column(Float, default=0.0)
+    saldo_acumulado = Column(Float, default=0.0)  # Soma dos saldos mensais até este mês (inclusive)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     user = relationship("User")
+    
+    # Um resumo por usuário e mês (mantido a cada escrita, ver resumos.py)
+    __table_args__ = (
+        Index("ix_resumos_financeiros_user_ano_mes", "user_id", "ano", "mes", unique=True),
+    )
 
 # Modelo para Metas Mensais
 class MetaMensal(Base):
@@ -210,3 +254,8 @@ class MetaMensal(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     user = relationship("User")
+    
+    # Uma meta por usuário e mês
+    __table_args__ = (
+        Index("ix_metas_mensais_user_ano_mes", "user_id", "ano", "mes", unique=True),
+    )
@@ -0,0 +1,127 @@
+"""
+Paginação por cursor (keyset) e projeção de campos das listagens.
+
+As listagens são ordenadas pela chave de ordenação do recurso (data de vencimento,
+data do investimento...) desempatada pelo id. O cursor guarda a chave do último
+item da página, e a próxima página começa com `WHERE (data, id) > (:data, :id)`,
+que usa o índice (user_id, data): o custo de uma página não depende de quantas
+vieram antes, ao contrário de OFFSET.
+
+Parâmetros de consulta:
+    limite   itens por página (padrão PAGINACAO_LIMITE_PADRAO, máximo PAGINACAO_LIMITE_MAXIMO)
+    cursor   valor de X-Proximo-Cursor da página anterior
+    fields   campos separados por vírgula; só essas colunas são lidas do banco
+    contar   true para receber o total (com os filtros) em X-Total-Count
+
+O corpo continua sendo a lista de itens. X-Proximo-Cursor só vem quando há mais
+páginas.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+from fastapi import HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Query as ConsultaORM
+from config import PAGINACAO_LIMITE_PADRAO, PAGINACAO_LIMITE_MAXIMO
+
+CABECALHO_CURSOR = "X-Proximo-Cursor"
+CABECALHO_TOTAL = "X-Total-Count"
+
+
+class ParametrosPagina:
+    """Dependência com os parâmetros de paginação e projeção das listagens"""
+
+    def __init__(
+        self,
+        limite: int = Query(PAGINACAO_LIMITE_PADRAO, ge=1, le=PAGINACAO_LIMITE_MAXIMO, description="Itens por página"),
+        cursor: Optional[str] = Query(None, description=f"Valor de {CABECALHO_CURSOR} da página anterior"),
+        campos: Optional[str] = Query(None, alias="fields", description="Campos retornados, separados por vírgula"),
+        contar: bool = Query(False, description=f"Informar o total em {CABECALHO_TOTAL}"),
+    ):
+        self.limite = limite
+        self.cursor = cursor
+        self.campos = [campo.strip() for campo in campos.split(",") if campo.strip()] if campos else None
+        self.contar = contar
+
+
+def codificar_cursor(valor, item_id: int) -> str:
+    if isinstance(valor, (date, datetime)):
+        valor = valor.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([valor, item_id]).encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str, coluna) -> tuple:
+    """(valor da chave de ordenação, id) do cursor; cursor inválido responde 400"""
+    try:
+        valor, item_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        tipo = coluna.type.python_type
+        if tipo is datetime:
+            valor = datetime.fromisoformat(valor)
+        elif tipo is date:
+            valor = date.fromisoformat(valor)
+        return valor, int(item_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def _colunas_projetadas(modelo, schema, campos: List[str]) -> list:
+    permitidos = [nome for nome in schema.model_fields if nome in modelo.__table__.columns]
+    invalidos = [campo for campo in campos if campo not in permitidos]
+    if invalidos:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Campos inválidos: {', '.join(invalidos)}. Disponíveis: {', '.join(permitidos)}"
+        )
+    return [getattr(modelo, campo) for campo in campos]
+
+
+def paginar(
+    query: ConsultaORM,
+    coluna_ordem,
+    schema,
+    pagina: ParametrosPagina,
+    response: Response,
+    descendente: bool = False
+):
+    """Aplica cursor, ordenação e limite à consulta (já filtrada) de um modelo.
+    Retorna os objetos da página ou, com `fields`, uma JSONResponse só com esses campos."""
+    modelo = coluna_ordem.class_
+    cabecalhos: Dict[str, str] = {}
+
+    if pagina.contar:
+        total = query.with_entities(func.count(modelo.id)).order_by(None).scalar()
+        cabecalhos[CABECALHO_TOTAL] = str(total)
+
+    chave = tuple_(coluna_ordem, modelo.id)
+    if pagina.cursor:
+        anterior = decodificar_cursor(pagina.cursor, coluna_ordem)
+        query = query.filter(chave < anterior if descendente else chave > anterior)
+    if descendente:
+        query = query.order_by(coluna_ordem.desc(), modelo.id.desc())
+    else:
+        query = query.order_by(coluna_ordem, modelo.id)
+
+    if pagina.campos:
+        colunas = _colunas_projetadas(modelo, schema, pagina.campos)
+        # A chave de ordenação vai no fim da linha para montar o cursor
+        linhas = query.with_entities(*colunas, coluna_ordem, modelo.id).limit(pagina.limite + 1).all()
+        itens: List[Any] = [dict(zip(pagina.campos, linha[:len(colunas)])) for linha in linhas[:pagina.limite]]
+        ultima_chave = tuple(linhas[pagina.limite - 1][-2:]) if len(linhas) > pagina.limite else None
+    else:
+        linhas = query.limit(pagina.limite + 1).all()
+        itens = linhas[:pagina.limite]
+        ultima_chave = (
+            (getattr(itens[-1], coluna_ordem.key), itens[-1].id) if len(linhas) > pagina.limite else None
+        )
+
+    if ultima_chave is not None:
+        cabecalhos[CABECALHO_CURSOR] = codificar_cursor(*ultima_chave)
+
+    if pagina.campos:
+        return JSONResponse(content=jsonable_encoder(itens), headers=cabecalhos)
+    response.headers.update(cabecalhos)
+    return itens
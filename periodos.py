@@ -0,0 +1,68 @@
+"""
+Utilitários de período (mês/ano) para filtros de data.
+
+Os filtros são gerados como intervalos semiabertos [primeiro_dia, primeiro_dia_do_proximo_mes)
+sobre a coluna original, sem envolvê-la em funções como extract/strftime. Assim os índices
+das colunas de data podem ser usados, e o SQL gerado é o mesmo no SQLite e no PostgreSQL.
+"""
+import calendar
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import DateTime
+
+
+def primeiro_dia(mes: int, ano: int) -> date:
+    """Primeiro dia do mês informado"""
+    return date(ano, mes, 1)
+
+
+def primeiro_dia_proximo_mes(mes: int, ano: int) -> date:
+    """Primeiro dia do mês seguinte (limite exclusivo do mês informado)"""
+    if mes == 12:
+        return date(ano + 1, 1, 1)
+    return date(ano, mes + 1, 1)
+
+
+def mes_anterior(mes: int, ano: int) -> Tuple[int, int]:
+    """Retorna (mes, ano) do mês anterior"""
+    if mes == 1:
+        return 12, ano - 1
+    return mes - 1, ano
+
+
+def somar_meses(mes: int, ano: int, quantidade: int) -> Tuple[int, int]:
+    """Retorna (mes, ano) deslocado em `quantidade` meses (negativo para voltar)"""
+    ano_extra, indice = divmod(mes - 1 + quantidade, 12)
+    return indice + 1, ano + ano_extra
+
+
+def adicionar_meses(data: date, quantidade: int) -> date:
+    """Mesma data `quantidade` meses depois, limitada ao último dia do mês (31/01 + 1 -> 29/02)"""
+    mes, ano = somar_meses(data.month, data.year, quantidade)
+    return date(ano, mes, min(data.day, calendar.monthrange(ano, mes)[1]))
+
+
+def intervalo_periodo(mes: Optional[int] = None, ano: Optional[int] = None) -> Optional[Tuple[date, date]]:
+    """Intervalo [inicio, fim) do mês (mes e ano) ou do ano inteiro (só ano).
+    Sem ano, não há período a filtrar e retorna None."""
+    if not ano:
+        return None
+    if mes:
+        return primeiro_dia(mes, ano), primeiro_dia_proximo_mes(mes, ano)
+    return date(ano, 1, 1), date(ano + 1, 1, 1)
+
+
+def filtro_intervalo(coluna, inicio: date, fim: date) -> List:
+    """Condições inicio <= coluna < fim, ajustando os limites para colunas DateTime"""
+    if isinstance(coluna.type, DateTime):
+        inicio = datetime.combine(inicio, datetime.min.time())
+        fim = datetime.combine(fim, datetime.min.time())
+    return [coluna >= inicio, coluna < fim]
+
+
+def filtro_periodo(coluna, mes: Optional[int] = None, ano: Optional[int] = None) -> List:
+    """Condições de filtro da coluna para o mês/ano; lista vazia quando não há período"""
+    intervalo = intervalo_periodo(mes, ano)
+    if intervalo is None:
+        return []
+    return filtro_intervalo(coluna, *intervalo)
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Resumos financeiros mensais materializados (ResumoFinanceiro).
+
+Cada linha guarda os totais de um usuário em um mês: receitas recebidas, despesas
+pagas, valor investido e aportes em metas. As linhas são mantidas de forma
+incremental: a cada flush da sessão, a diferença que cada ContaPagar, ContaReceber,
+Investimento ou TransacaoMeta criado, alterado ou removido provoca nos totais é
+somada ao resumo do mês, na mesma transação da escrita.
+
+Cada linha também guarda o saldo acumulado (soma dos saldos mensais de todo o
+histórico até o mês, inclusive). Uma diferença no saldo de um mês é somada ao
+saldo acumulado desse mês e de todos os seguintes com um único UPDATE, e o saldo
+inicial de qualquer mês passa a ser a leitura de uma linha (`saldo_acumulado_ate`).
+
+Operações em lote que não passam pelo flush (query.delete(), insert/update em
+Core) devem informar suas diferenças com `remover_dos_resumos`/`adicionar_aos_resumos`
+ou `aplicar_deltas`.
+
+Para reconstruir todos os resumos a partir das transações (ou só os saldos acumulados):
+    python resumos.py --reconstruir
+    python resumos.py --saldos
+"""
+import argparse
+import importlib
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import event, func, inspect, insert, update, delete, select, bindparam, and_, or_
+from sqlalchemy.orm import Session
+from models import ResumoFinanceiro, StatusConta
+from agregacoes import CONTRIBUICOES_RESUMO, agregar_resumos, extrair_ano_mes
+
+CAMPOS_RESUMO = ("total_receitas", "total_despesas", "total_investido", "total_metas")
+
+Chave = Tuple[int, int, int]  # (user_id, ano, mes)
+
+
+def _campos_monitorados(modelo):
+    _, coluna_valor, coluna_data, exige_pago = CONTRIBUICOES_RESUMO[modelo]
+    campos = ["user_id", coluna_valor, coluna_data]
+    if exige_pago:
+        campos.append("status")
+    return campos
+
+
+def _contribuicao(modelo, valores) -> Optional[Tuple[Chave, str, float]]:
+    """Em qual resumo, campo e valor um registro com estes valores contribui"""
+    campo, coluna_valor, coluna_data, exige_pago = CONTRIBUICOES_RESUMO[modelo]
+    data = valores[coluna_data]
+    if data is None or valores["user_id"] is None:
+        return None
+    if exige_pago and valores["status"] != StatusConta.PAGO:
+        return None
+    return (valores["user_id"], data.year, data.month), campo, valores[coluna_valor] or 0
+
+
+def _valores(obj, campos, antigos: bool):
+    """Valores persistidos (antigos=True) ou pendentes de gravação dos campos"""
+    estado = inspect(obj)
+    valores = {}
+    for campo in campos:
+        historico = estado.attrs[campo].history
+        if not historico.has_changes() and not historico.unchanged:
+            getattr(obj, campo)  # carrega atributo expirado
+            historico = estado.attrs[campo].history
+        if antigos:
+            lista = historico.deleted or historico.unchanged
+        else:
+            lista = historico.added or historico.unchanged
+        valores[campo] = lista[0] if lista else None
+    return valores
+
+
+def _somar(deltas, contribuicao, sinal):
+    if contribuicao is None:
+        return
+    chave, campo, valor = contribuicao
+    deltas[chave][campo] += sinal * valor
+
+
+def novos_deltas():
+    return defaultdict(lambda: dict.fromkeys(CAMPOS_RESUMO, 0.0))
+
+
+def _anteriores(tabela, ano, mes):
+    """Condição (tabela.ano, tabela.mes) < (ano, mes), usável pelo índice (user_id, ano, mes)"""
+    return or_(tabela.c.ano < ano, and_(tabela.c.ano == ano, tabela.c.mes < mes))
+
+
+def insert_ignorando(conexao, tabela, chaves):
+    """INSERT que ignora as linhas cujas `chaves` (índice único) já existem, com
+    ON CONFLICT DO NOTHING; None nos dialetos sem esse recurso"""
+    dialeto = conexao.dialect.name
+    if dialeto not in ("sqlite", "postgresql"):
+        return None
+    modulo = importlib.import_module(f"sqlalchemy.dialects.{dialeto}")  # só o dialeto em uso
+    return modulo.insert(tabela).on_conflict_do_nothing(index_elements=chaves)
+
+
+def _inserir_ignorando(conexao, linhas):
+    """INSERT das linhas de resumo ignorando (user_id, ano, mes) já existentes.
+    Uma linha nova começa com o saldo acumulado do último mês anterior a ela."""
+    tabela = ResumoFinanceiro.__table__
+    anterior = tabela.alias("anterior")
+    saldo_anterior = select(func.coalesce(anterior.c.saldo_acumulado, 0)).where(
+        anterior.c.user_id == bindparam("b_user_id"),
+        _anteriores(anterior, bindparam("b_ano"), bindparam("b_mes"))
+    ).order_by(anterior.c.ano.desc(), anterior.c.mes.desc()).limit(1).scalar_subquery()
+    valores = dict(
+        user_id=bindparam("b_user_id"), ano=bindparam("b_ano"), mes=bindparam("b_mes"),
+        saldo_acumulado=func.coalesce(saldo_anterior, 0)
+    )
+    linhas = [{"b_user_id": l["user_id"], "b_ano": l["ano"], "b_mes": l["mes"]} for l in linhas]
+
+    stmt = insert_ignorando(conexao, tabela, ["user_id", "ano", "mes"])
+    if stmt is not None:
+        conexao.execute(stmt.values(**valores), linhas)
+        return
+
+    existentes = set()
+    for linha in linhas:
+        if conexao.execute(tabela.select().where(
+            tabela.c.user_id == linha["b_user_id"], tabela.c.ano == linha["b_ano"], tabela.c.mes == linha["b_mes"]
+        )).first():
+            existentes.add((linha["b_user_id"], linha["b_ano"], linha["b_mes"]))
+    novas = [linha for linha in linhas if (linha["b_user_id"], linha["b_ano"], linha["b_mes"]) not in existentes]
+    if novas:
+        conexao.execute(insert(tabela).values(**valores), novas)
+
+
+def aplicar_deltas(db: Session, deltas: Dict[Chave, Dict[str, float]]):
+    """Soma as diferenças aos resumos mensais, criando as linhas que faltarem"""
+    deltas = {chave: campos for chave, campos in deltas.items() if any(campos.values())}
+    if not deltas:
+        return
+
+    conexao = db.connection()
+    tabela = ResumoFinanceiro.__table__
+
+    _inserir_ignorando(conexao, [
+        {"user_id": user_id, "ano": ano, "mes": mes} for user_id, ano, mes in deltas
+    ])
+
+    # Incremento atômico: seguro com escritas concorrentes no mesmo mês
+    stmt = update(tabela).where(
+        tabela.c.user_id == bindparam("b_user_id"),
+        tabela.c.ano == bindparam("b_ano"),
+        tabela.c.mes == bindparam("b_mes")
+    ).values(
+        total_receitas=tabela.c.total_receitas + bindparam("d_receitas"),
+        total_despesas=tabela.c.total_despesas + bindparam("d_despesas"),
+        saldo_mensal=tabela.c.saldo_mensal + bindparam("d_saldo"),
+        total_investido=tabela.c.total_investido + bindparam("d_investido"),
+        total_metas=tabela.c.total_metas + bindparam("d_metas"),
+        updated_at=func.now()
+    )
+    conexao.execute(stmt, [
+        {
+            "b_user_id": user_id, "b_ano": ano, "b_mes": mes,
+            "d_receitas": campos["total_receitas"],
+            "d_despesas": campos["total_despesas"],
+            "d_saldo": campos["total_receitas"] - campos["total_despesas"],
+            "d_investido": campos["total_investido"],
+            "d_metas": campos["total_metas"],
+        }
+        for (user_id, ano, mes), campos in deltas.items()
+    ])
+
+    # O saldo do mês muda o saldo acumulado dele e de todos os meses seguintes
+    saldos = [
+        {"b_user_id": user_id, "b_ano": ano, "b_mes": mes,
+         "d_saldo": campos["total_receitas"] - campos["total_despesas"]}
+        for (user_id, ano, mes), campos in deltas.items()
+        if campos["total_receitas"] != campos["total_despesas"]
+    ]
+    if saldos:
+        conexao.execute(update(tabela).where(
+            tabela.c.user_id == bindparam("b_user_id"),
+            ~_anteriores(tabela, bindparam("b_ano"), bindparam("b_mes"))
+        ).values(saldo_acumulado=tabela.c.saldo_acumulado + bindparam("d_saldo")), saldos)
+
+
+def _somar_registros(db: Session, modelo, sinal: int, criterios):
+    campo, coluna_valor, coluna_data, exige_pago = CONTRIBUICOES_RESUMO[modelo]
+    data = getattr(modelo, coluna_data)
+    ano, mes = extrair_ano_mes(data)
+    filtros = [data.isnot(None), *criterios]
+    if exige_pago:
+        filtros.append(modelo.status == StatusConta.PAGO)
+
+    linhas = db.query(modelo.user_id, ano, mes, func.sum(getattr(modelo, coluna_valor))).filter(
+        *filtros
+    ).group_by(modelo.user_id, ano, mes).all()
+
+    deltas = novos_deltas()
+    for user_id, l_ano, l_mes, total in linhas:
+        deltas[(user_id, int(l_ano), int(l_mes))][campo] += sinal * (total or 0)
+    aplicar_deltas(db, deltas)
+
+
+def remover_dos_resumos(db: Session, modelo, *criterios):
+    """Desconta dos resumos os registros do modelo que atendem aos critérios.
+    Deve ser chamado antes de removê-los ou alterá-los em lote (query.delete(), update em Core)."""
+    _somar_registros(db, modelo, -1, criterios)
+
+
+def adicionar_aos_resumos(db: Session, modelo, *criterios):
+    """Soma aos resumos os registros do modelo que atendem aos critérios.
+    Deve ser chamado depois de inseri-los ou alterá-los em lote."""
+    _somar_registros(db, modelo, 1, criterios)
+
+
+def reconstruir_resumos(
+    db: Session,
+    user_ids: Optional[Iterable[int]] = None,
+    inicio: Optional[date] = None,
+    fim: Optional[date] = None
+) -> int:
+    """Recalcula os resumos a partir das transações (todo o histórico ou [inicio, fim)).
+    Retorna a quantidade de meses gravados."""
+    if user_ids is not None:
+        user_ids = list(user_ids)
+    totais = agregar_resumos(db, user_ids, inicio, fim)
+
+    conexao = db.connection()
+    tabela = ResumoFinanceiro.__table__
+    filtros = []
+    if user_ids is not None:
+        filtros.append(tabela.c.user_id.in_(user_ids))
+    if inicio is not None and fim is not None:
+        # (ano, mes) dentro do intervalo, comparando ano * 100 + mes
+        filtros.append(tabela.c.ano * 100 + tabela.c.mes >= inicio.year * 100 + inicio.month)
+        filtros.append(tabela.c.ano * 100 + tabela.c.mes < fim.year * 100 + fim.month)
+    stmt = delete(tabela)
+    if filtros:
+        stmt = stmt.where(*filtros)
+    conexao.execute(stmt)
+
+    if totais:
+        conexao.execute(insert(tabela), [
+            {
+                "user_id": user_id, "ano": ano, "mes": mes,
+                "total_receitas": t.total_receitas,
+                "total_despesas": t.total_despesas,
+                "saldo_mensal": t.saldo_mensal,
+                "total_investido": t.total_investido,
+                "total_metas": t.total_metas,
+            }
+            for (user_id, ano, mes), t in sorted(totais.items())
+        ])
+    recalcular_saldos_acumulados(db, user_ids)
+    return len(totais)
+
+
+def recalcular_saldos_acumulados(db: Session, user_ids: Optional[Iterable[int]] = None):
+    """Recalcula o saldo acumulado de cada resumo como a soma dos saldos mensais até ele"""
+    tabela = ResumoFinanceiro.__table__
+    anterior = tabela.alias("anterior")
+    acumulado = select(func.coalesce(func.sum(anterior.c.saldo_mensal), 0)).where(
+        anterior.c.user_id == tabela.c.user_id,
+        ~_anteriores(tabela, anterior.c.ano, anterior.c.mes)
+    ).scalar_subquery()
+    stmt = update(tabela).values(saldo_acumulado=acumulado)
+    if user_ids is not None:
+        stmt = stmt.where(tabela.c.user_id.in_(list(user_ids)))
+    db.connection().execute(stmt)
+
+
+def saldo_acumulado_ate(db: Session, user_id: int, mes: int, ano: int) -> float:
+    """Saldo acumulado de todo o histórico até o mês anterior ao informado (saldo inicial do mês)"""
+    return db.query(ResumoFinanceiro.saldo_acumulado).filter(
+        ResumoFinanceiro.user_id == user_id,
+        _anteriores(ResumoFinanceiro.__table__, ano, mes)
+    ).order_by(ResumoFinanceiro.ano.desc(), ResumoFinanceiro.mes.desc()).limit(1).scalar() or 0
+
+
+def saldo_acumulado_total(db: Session, user_id: int) -> float:
+    """Saldo de todo o histórico (receitas recebidas menos despesas pagas): o acumulado do último resumo"""
+    return db.query(ResumoFinanceiro.saldo_acumulado).filter(
+        ResumoFinanceiro.user_id == user_id
+    ).order_by(ResumoFinanceiro.ano.desc(), ResumoFinanceiro.mes.desc()).limit(1).scalar() or 0
+
+
+def resumos_do_intervalo(db: Session, user_id: int, inicio: date, fim: date) -> Dict[Tuple[int, int], ResumoFinanceiro]:
+    """Resumos do usuário nos meses de [inicio, fim), por (ano, mes), em uma única consulta"""
+    tabela = ResumoFinanceiro.__table__
+    resumos = db.query(ResumoFinanceiro).filter(
+        ResumoFinanceiro.user_id == user_id,
+        ~_anteriores(tabela, inicio.year, inicio.month),
+        _anteriores(tabela, fim.year, fim.month)
+    ).all()
+    return {(resumo.ano, resumo.mes): resumo for resumo in resumos}
+
+
+# ==================== MANUTENÇÃO AUTOMÁTICA ====================
+
+def _registrar_deltas_do_flush(session, flush_context, instances):
+    """Calcula a diferença que o flush vai provocar nos resumos mensais"""
+    deltas = session.info.setdefault("resumos_deltas", novos_deltas())
+
+    for obj in session.new:
+        modelo = type(obj)
+        if modelo in CONTRIBUICOES_RESUMO:
+            _somar(deltas, _contribuicao(modelo, _valores(obj, _campos_monitorados(modelo), False)), 1)
+
+    for obj in session.deleted:
+        modelo = type(obj)
+        if modelo in CONTRIBUICOES_RESUMO:
+            _somar(deltas, _contribuicao(modelo, _valores(obj, _campos_monitorados(modelo), True)), -1)
+
+    for obj in session.dirty:
+        modelo = type(obj)
+        if modelo not in CONTRIBUICOES_RESUMO or not session.is_modified(obj):
+            continue
+        campos = _campos_monitorados(modelo)
+        antes = _contribuicao(modelo, _valores(obj, campos, True))
+        depois = _contribuicao(modelo, _valores(obj, campos, False))
+        if antes != depois:
+            _somar(deltas, antes, -1)
+            _somar(deltas, depois, 1)
+
+
+def _aplicar_deltas_do_flush(session, flush_context):
+    deltas = session.info.pop("resumos_deltas", None)
+    if deltas:
+        aplicar_deltas(session, deltas)
+
+
+def _descartar_deltas(session, previous_transaction=None):
+    session.info.pop("resumos_deltas", None)
+
+
+def _manter_valor_antigo(target, value, oldvalue, initiator):
+    """Listener vazio: active_history garante o valor antigo no histórico"""
+
+
+event.listen(Session, "before_flush", _registrar_deltas_do_flush)
+event.listen(Session, "after_flush_postexec", _aplicar_deltas_do_flush)
+event.listen(Session, "after_soft_rollback", _descartar_deltas)
+
+for _modelo in CONTRIBUICOES_RESUMO:
+    for _campo in _campos_monitorados(_modelo):
+        event.listen(getattr(_modelo, _campo), "set", _manter_valor_antigo, active_history=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manutenção dos resumos financeiros mensais")
+    parser.add_argument("--reconstruir", action="store_true", help="Recalcula todos os resumos")
+    parser.add_argument("--saldos", action="store_true",
+                        help="Recalcula apenas os saldos acumulados a partir dos resumos existentes")
+    parser.add_argument("--usuario", type=int, action="append", help="Restringe a um usuário (id)")
+    args = parser.parse_args()
+
+    if not (args.reconstruir or args.saldos):
+        parser.print_help()
+        return
+
+    from database import SessionLocal
+    db = SessionLocal()
+    try:
+        if args.reconstruir:
+            meses = reconstruir_resumos(db, args.usuario)
+            print(f"✅ {meses} resumos mensais reconstruídos")
+        else:
+            recalcular_saldos_acumulados(db, args.usuario)
+            print("✅ Saldos acumulados recalculados")
+        db.commit()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,38 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer
 from sqlalchemy.orm import Session
 from database import get_db
 from models import User
 from schemas import UserCreate, UserResponse, UserLogin, Token
-from auth import verify_password, get_password_hash, create_access_token, get_current_user
+from auth import verificar_senha_async, gerar_hash_senha_async, create_access_token, get_current_user
 from config import ACCESS_TOKEN_EXPIRE_MINUTES
 from datetime import timedelta
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
 @router.post("/register", response_model=UserResponse)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate, db: Session = Depends(get_db)):
     """Registra um novo usuário"""
-    # Verificar se email já existe
-    if db.query(User).filter(User.email == user.email).first():
-        raise HTTPException(
-            status_code=400,
-            detail="Email já está em uso"
-        )
+    def verificar_duplicados():
+        # Verificar se email já existe
+        if db.query(User).filter(User.email == user.email).first():
+            raise HTTPException(
+                status_code=400,
+                detail="Email já está em uso"
+            )
+        
+        # Verificar se username já existe
+        if db.query(User).filter(User.username == user.username).first():
+            raise HTTPException(
+                status_code=400,
+                detail="Username já está em uso"
+            )
     
-    # Verificar se username já existe
-    if db.query(User).filter(User.username == user.username).first():
-        raise HTTPException(
-            status_code=400,
-            detail="Username já está em uso"
-        )
+    await run_in_threadpool(verificar_duplicados)
     
-    # Criar novo usuário
-    hashed_password = get_password_hash(user.password)
+    # Criar novo usuário (hash no pool do bcrypt, fora do event loop)
+    hashed_password = await gerar_hash_senha_async(user.password)
     db_user = User(
         email=user.email,
         username=user.username,
@@ -39,18 +43,27 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
         bio=user.bio
     )
     
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    def gravar():
+        db.add(db_user)
+        db.commit()
+        db.refresh(db_user)
+    
+    await run_in_threadpool(gravar)
     
     return db_user
 
 @router.post("/login", response_model=Token)
-def login_user(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login_user(user_credentials: UserLogin, db: Session = Depends(get_db)):
     """Autentica usuário e retorna token"""
-    user = db.query(User).filter(User.username == user_credentials.username).first()
+    user = await run_in_threadpool(
+        lambda: db.query(User).filter(User.username == user_credentials.username).first()
+    )
+    
+    senha_valida, novo_hash = False, None
+    if user:
+        senha_valida, novo_hash = await verificar_senha_async(user_credentials.password, user.hashed_password)
     
-    if not user or not verify_password(user_credentials.password, user.hashed_password):
+    if not senha_valida:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciais incorretas",
@@ -63,9 +76,16 @@ def login_user(user_credentials: UserLogin, db: Session = Depends(get_db)):
             detail="Usuário inativo"
         )
     
+    username = user.username
+    
+    # Hash gerado com outro custo (BCRYPT_ROUNDS mudou): substituir pelo atual
+    if novo_hash:
+        user.hashed_password = novo_hash
+        await run_in_threadpool(db.commit)
+    
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": username}, expires_delta=access_token_expires
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Body, Depends, File, HTTPException, Query, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
-from database import get_db
+from sqlalchemy import func, and_, or_, insert, select, update
+from database import get_db, get_async_db
 from models import (
     User, ContaPagar, ContaReceber, MetaFinanceira, TransacaoMeta, 
     Investimento, ResumoFinanceiro, MetaMensal, CategoriaConta, StatusConta, 
@@ -17,15 +19,135 @@ from schemas import (
     DashboardResponse, GraficoMensalResponse, RelatorioCategoriaResponse,
     RelatorioMensalResponse, FluxoCaixaMensalResponse, ComparativoMensalResponse,
     AlertasMensaisResponse, MetaMensalCreate, MetaMensalUpdate, MetaMensalResponse,
-    DashboardMensalResponse
+    DashboardMensalResponse, ResultadoItemLote, LoteResponse, BaixaLoteRequest
 )
-from auth import get_current_user
-from typing import List, Optional
+from auth import get_current_user, get_current_user_async, get_read_db, get_async_read_db
+from cache import cache_por_usuario, marcar_usuario_alterado
+from agregacoes import AgregadoMensal, agregar_totais_mensais
+from periodos import (
+    primeiro_dia, primeiro_dia_proximo_mes, mes_anterior, somar_meses, adicionar_meses, filtro_periodo,
+    intervalo_periodo
+)
+from paginacao import ParametrosPagina, paginar
+from exportacao import (
+    CONTEUDOS, TIPOS_MIDIA, exportar, partes_csv_transacoes, partes_json_transacoes, verificar_formato
+)
+from tarefas import agendar, gerar_meses, obter_tarefa
+from importacao import FORMATOS, abrir_leitor, detectar_formato, importar_extrato
+from resumos import (
+    reconstruir_resumos, remover_dos_resumos, adicionar_aos_resumos, resumos_do_intervalo, saldo_acumulado_ate,
+    saldo_acumulado_total
+)
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, date, timedelta
 import calendar
+import csv
+import io
+import json
 
 router = APIRouter(prefix="/financeiro", tags=["Financeiro"])
 
+# Limite de itens por requisição nas operações em lote
+LOTE_MAX_ITENS = 1000
+
+# Contas ainda não pagas: a varredura do agendador passa as pendentes com vencimento
+# passado para VENCIDO, então as consultas de contas em aberto consideram os dois
+STATUS_EM_ABERTO = (StatusConta.PENDENTE, StatusConta.VENCIDO)
+
+# ==================== OPERAÇÕES EM LOTE ====================
+
+def _verificar_tamanho_lote(quantidade: int):
+    if quantidade > LOTE_MAX_ITENS:
+        raise HTTPException(status_code=413, detail=f"Máximo de {LOTE_MAX_ITENS} itens por lote")
+
+def _criar_contas_em_lote(modelo, schema, itens: List[Dict[str, Any]], user_id: int, db: Session) -> LoteResponse:
+    """Valida cada item, insere os válidos com um único INSERT em lote e informa o resultado por item"""
+    _verificar_tamanho_lote(len(itens))
+    resultados = []
+    linhas = []
+    for indice, item in enumerate(itens):
+        try:
+            dados = schema.model_validate(item).dict()
+        except ValidationError as erro:
+            mensagens = "; ".join(
+                f"{'.'.join(str(parte) for parte in detalhe['loc'])}: {detalhe['msg']}" for detalhe in erro.errors()
+            )
+            resultados.append(ResultadoItemLote(indice=indice, sucesso=False, erro=mensagens))
+            continue
+        linhas.append((indice, {"user_id": user_id, "status": StatusConta.PENDENTE, **dados}))
+    
+    if linhas:
+        # sort_by_parameter_order: os IDs voltam na ordem das linhas enviadas
+        ids = db.scalars(
+            insert(modelo).returning(modelo.id, sort_by_parameter_order=True), [linha for _, linha in linhas]
+        ).all()
+        resultados.extend(
+            ResultadoItemLote(indice=indice, sucesso=True, id=conta_id)
+            for (indice, _), conta_id in zip(linhas, ids)
+        )
+        # Contas novas ficam pendentes e não entram nos resumos; só o cache muda
+        marcar_usuario_alterado(db, user_id)
+        db.commit()
+    
+    resultados.sort(key=lambda resultado: resultado.indice)
+    return LoteResponse(
+        processados=len(itens),
+        sucesso=len(linhas),
+        falhas=len(itens) - len(linhas),
+        resultados=resultados
+    )
+
+def _baixar_contas_em_lote(
+    modelo, coluna_data, baixa: BaixaLoteRequest, user_id: int, db: Session, erro_baixada: str
+) -> LoteResponse:
+    """Marca as contas como pagas/recebidas com um único UPDATE, mantendo resumos e cache.
+    Só contas em aberto são baixadas: as já baixadas manteriam a data (e o mês nos resumos)
+    e as canceladas não devem virar pagas. IDs repetidos contam uma vez."""
+    _verificar_tamanho_lote(len(baixa.ids))
+    status_por_id = dict(db.execute(
+        select(modelo.id, modelo.status).where(modelo.id.in_(set(baixa.ids)), modelo.user_id == user_id)
+    ).all())
+    pendentes = [conta_id for conta_id, status in status_por_id.items() if status in STATUS_EM_ABERTO]
+    
+    baixados = set()
+    if pendentes:
+        # O filtro de status repetido no UPDATE cobre baixas concorrentes; o RETURNING diz
+        # quais linhas mudaram. Contas não pagas não entram nos resumos: só somar as novas baixas
+        baixados = set(db.scalars(
+            update(modelo)
+            .where(modelo.id.in_(pendentes), modelo.status.in_(STATUS_EM_ABERTO))
+            .values({"status": StatusConta.PAGO, coluna_data: baixa.data or date.today(), "updated_at": func.now()})
+            .returning(modelo.id),
+            execution_options={"synchronize_session": False}
+        ).all())
+        if baixados:
+            adicionar_aos_resumos(db, modelo, modelo.id.in_(baixados))
+            marcar_usuario_alterado(db, user_id)
+        db.commit()
+    
+    resultados = []
+    vistos = set()
+    for indice, conta_id in enumerate(baixa.ids):
+        if conta_id in vistos:
+            erro = "ID repetido no lote"
+        elif conta_id in baixados:
+            erro = None
+        elif conta_id not in status_por_id:
+            erro = "Conta não encontrada"
+        elif status_por_id[conta_id] == StatusConta.CANCELADO:
+            erro = "Conta cancelada"
+        else:
+            erro = erro_baixada
+        vistos.add(conta_id)
+        resultados.append(ResultadoItemLote(indice=indice, sucesso=erro is None, id=conta_id, erro=erro))
+    sucesso = sum(1 for resultado in resultados if resultado.sucesso)
+    return LoteResponse(
+        processados=len(resultados),
+        sucesso=sucesso,
+        falhas=len(resultados) - sucesso,
+        resultados=resultados
+    )
+
 # ==================== CONTAS A PAGAR ====================
 
 @router.post("/contas-pagar", response_model=ContaPagarResponse)
@@ -44,29 +166,49 @@ def criar_conta_pagar(
     db.refresh(db_conta)
     return db_conta
 
+@router.post("/contas-pagar/batch", response_model=LoteResponse)
+def criar_contas_pagar_lote(
+    contas: List[Dict[str, Any]] = Body(..., description="Lista de contas no formato de ContaPagarCreate"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Criar várias contas a pagar em uma transação, com resultado por item"""
+    return _criar_contas_em_lote(ContaPagar, ContaPagarCreate, contas, current_user.id, db)
+
+@router.post("/contas-pagar/batch/pagar", response_model=LoteResponse)
+def pagar_contas_lote(
+    baixa: BaixaLoteRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Marcar várias contas como pagas"""
+    return _baixar_contas_em_lote(ContaPagar, "data_pagamento", baixa, current_user.id, db, "Conta já paga")
+
 @router.get("/contas-pagar", response_model=List[ContaPagarResponse])
-def listar_contas_pagar(
+async def listar_contas_pagar(
+    response: Response,
     status: Optional[StatusConta] = None,
     categoria: Optional[CategoriaConta] = None,
     mes: Optional[int] = None,
     ano: Optional[int] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    pagina: ParametrosPagina = Depends(),
+    current_user: User = Depends(get_current_user_async),
+    db=Depends(get_async_db)
 ):
-    """Listar contas a pagar com filtros"""
-    query = db.query(ContaPagar).filter(ContaPagar.user_id == current_user.id)
-    
-    if status:
-        query = query.filter(ContaPagar.status == status)
-    if categoria:
-        query = query.filter(ContaPagar.categoria == categoria)
-    if mes and ano:
-        query = query.filter(
-            func.extract('month', ContaPagar.data_vencimento) == mes,
-            func.extract('year', ContaPagar.data_vencimento) == ano
-        )
+    """Listar contas a pagar com filtros (paginado por cursor; ver paginacao.py)"""
+    def consultar(db: Session):
+        query = db.query(ContaPagar).filter(ContaPagar.user_id == current_user.id)
+        
+        if status:
+            query = query.filter(ContaPagar.status == status)
+        if categoria:
+            query = query.filter(ContaPagar.categoria == categoria)
+        if mes and ano:
+            query = query.filter(*filtro_periodo(ContaPagar.data_vencimento, mes, ano))
+        
+        return paginar(query, ContaPagar.data_vencimento, ContaPagarResponse, pagina, response)
     
-    return query.order_by(ContaPagar.data_vencimento).all()
+    return await db.run_sync(consultar)
 
 @router.get("/contas-pagar/{conta_id}", response_model=ContaPagarResponse)
 def obter_conta_pagar(
@@ -156,59 +298,49 @@ def criar_conta_parcelada(
     db: Session = Depends(get_db)
 ):
     """Criar conta parcelada com múltiplas parcelas"""
-    from datetime import timedelta
+    if conta.total_parcelas < 1:
+        raise HTTPException(status_code=400, detail="O número de parcelas deve ser maior que zero")
     
     # Calcular valor de cada parcela
     valor_parcela = conta.valor_total / conta.total_parcelas
     
-    # Criar todas as parcelas
-    parcelas = []
-    for i in range(conta.total_parcelas):
-        # Calcular data de vencimento (incrementar mês)
-        if i == 0:
-            data_vencimento = conta.data_vencimento_primeira
-        else:
-            # Adicionar i meses à data inicial
-            data_vencimento = conta.data_vencimento_primeira
-            for _ in range(i):
-                # Adicionar um mês
-                if data_vencimento.month == 12:
-                    data_vencimento = data_vencimento.replace(year=data_vencimento.year + 1, month=1)
-                else:
-                    data_vencimento = data_vencimento.replace(month=data_vencimento.month + 1)
-        
-        parcela = ContaPagar(
-            user_id=current_user.id,
-            descricao=f"{conta.descricao} - Parcela {i+1}/{conta.total_parcelas}",
-            valor=valor_parcela,
-            data_vencimento=data_vencimento,
-            categoria=conta.categoria,
-            observacoes=conta.observacoes,
-            is_parcelada=True,
-            parcela_atual=i+1,
-            total_parcelas=conta.total_parcelas,
-            valor_parcela=valor_parcela,
-            parcela_original_id=None  # Será definido após criar a primeira parcela
-        )
-        db.add(parcela)
-        db.flush()  # Para obter o ID da primeira parcela
-        
-        # Definir o ID da conta original (primeira parcela)
-        if i == 0:
-            parcela_original_id = parcela.id
-            parcela.parcela_original_id = parcela.id
-        else:
-            parcela.parcela_original_id = parcela_original_id
-        
-        parcelas.append(parcela)
+    # Parcelas com vencimentos calculados diretamente a partir da primeira data
+    linhas = [
+        {
+            "user_id": current_user.id,
+            "descricao": f"{conta.descricao} - Parcela {i+1}/{conta.total_parcelas}",
+            "valor": valor_parcela,
+            "data_vencimento": adicionar_meses(conta.data_vencimento_primeira, i),
+            "categoria": conta.categoria,
+            "status": StatusConta.PENDENTE,
+            "observacoes": conta.observacoes,
+            "is_parcelada": True,
+            "parcela_atual": i + 1,
+            "total_parcelas": conta.total_parcelas,
+            "valor_parcela": valor_parcela,
+        }
+        for i in range(conta.total_parcelas)
+    ]
     
-    db.commit()
+    # Todas as parcelas em um único INSERT em lote, na ordem das linhas
+    parcelas = db.scalars(
+        insert(ContaPagar).returning(ContaPagar, sort_by_parameter_order=True), linhas
+    ).all()
     
-    # Refresh todas as parcelas para retornar com IDs
-    for parcela in parcelas:
-        db.refresh(parcela)
+    # A primeira parcela é a conta original: um UPDATE aponta todas para ela
+    ids = [parcela.id for parcela in parcelas]
+    db.execute(
+        update(ContaPagar).where(ContaPagar.id.in_(ids)).values(parcela_original_id=ids[0]),
+        execution_options={"synchronize_session": "evaluate"}
+    )
     
-    return parcelas
+    # Inserções em lote não passam pelo flush; parcelas pendentes não mudam os resumos
+    marcar_usuario_alterado(db, current_user.id)
+    
+    # Resposta montada antes do commit, que expiraria os objetos
+    resposta = [ContaPagarResponse.model_validate(parcela) for parcela in parcelas]
+    db.commit()
+    return resposta
 
 @router.get("/contas-pagar/{conta_id}/parcelas", response_model=List[ContaPagarResponse])
 def listar_parcelas(
@@ -308,29 +440,49 @@ def criar_conta_receber(
     db.refresh(db_conta)
     return db_conta
 
+@router.post("/contas-receber/batch", response_model=LoteResponse)
+def criar_contas_receber_lote(
+    contas: List[Dict[str, Any]] = Body(..., description="Lista de contas no formato de ContaReceberCreate"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Criar várias contas a receber em uma transação, com resultado por item"""
+    return _criar_contas_em_lote(ContaReceber, ContaReceberCreate, contas, current_user.id, db)
+
+@router.post("/contas-receber/batch/receber", response_model=LoteResponse)
+def receber_contas_lote(
+    baixa: BaixaLoteRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Marcar várias contas como recebidas"""
+    return _baixar_contas_em_lote(ContaReceber, "data_recebimento", baixa, current_user.id, db, "Conta já recebida")
+
 @router.get("/contas-receber", response_model=List[ContaReceberResponse])
-def listar_contas_receber(
+async def listar_contas_receber(
+    response: Response,
     status: Optional[StatusConta] = None,
     categoria: Optional[CategoriaConta] = None,
     mes: Optional[int] = None,
     ano: Optional[int] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    pagina: ParametrosPagina = Depends(),
+    current_user: User = Depends(get_current_user_async),
+    db=Depends(get_async_db)
 ):
-    """Listar contas a receber com filtros"""
-    query = db.query(ContaReceber).filter(ContaReceber.user_id == current_user.id)
-    
-    if status:
-        query = query.filter(ContaReceber.status == status)
-    if categoria:
-        query = query.filter(ContaReceber.categoria == categoria)
-    if mes and ano:
-        query = query.filter(
-            func.extract('month', ContaReceber.data_vencimento) == mes,
-            func.extract('year', ContaReceber.data_vencimento) == ano
-        )
+    """Listar contas a receber com filtros (paginado por cursor; ver paginacao.py)"""
+    def consultar(db: Session):
+        query = db.query(ContaReceber).filter(ContaReceber.user_id == current_user.id)
+        
+        if status:
+            query = query.filter(ContaReceber.status == status)
+        if categoria:
+            query = query.filter(ContaReceber.categoria == categoria)
+        if mes and ano:
+            query = query.filter(*filtro_periodo(ContaReceber.data_vencimento, mes, ano))
+        
+        return paginar(query, ContaReceber.data_vencimento, ContaReceberResponse, pagina, response)
     
-    return query.order_by(ContaReceber.data_vencimento).all()
+    return await db.run_sync(consultar)
 
 @router.get("/contas-receber/{conta_id}", response_model=ContaReceberResponse)
 def obter_conta_receber(
@@ -413,6 +565,39 @@ def marcar_como_recebido(
     db.commit()
     return {"message": "Conta marcada como recebida"}
 
+# ==================== IMPORTAÇÃO DE EXTRATOS ====================
+
+@router.post("/importacao")
+def importar_extrato_bancario(
+    arquivo: UploadFile = File(...),
+    formato: Optional[str] = Query(None, description="'ofx' ou 'csv'; padrão: pela extensão do arquivo"),
+    encoding: str = Query("utf-8-sig", description="Codificação do arquivo (ex.: latin-1)"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Importa um extrato OFX/CSV em lotes e transmite o progresso em NDJSON (uma linha por lote)"""
+    if formato is not None and formato not in FORMATOS:
+        raise HTTPException(status_code=400, detail=f"Formato deve ser {' ou '.join(FORMATOS)}")
+    try:
+        formato = formato or detectar_formato(arquivo.filename)
+        texto = io.TextIOWrapper(arquivo.file, encoding=encoding, errors="replace", newline="")
+        # Cabeçalho inválido é recusado antes de começar a transmitir
+        leitor = abrir_leitor(texto, formato)
+    except (ValueError, LookupError) as erro:
+        raise HTTPException(status_code=400, detail=str(erro))
+    
+    user_id = current_user.id
+    
+    def transmitir_progresso():
+        try:
+            for progresso in importar_extrato(db, user_id, leitor):
+                yield json.dumps(progresso.dict(), ensure_ascii=False) + "\n"
+        except Exception as erro:
+            db.rollback()
+            yield json.dumps({"concluido": False, "erro": str(erro)}, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(transmitir_progresso(), media_type="application/x-ndjson")
+
 # ==================== METAS FINANCEIRAS ====================
 
 @router.post("/metas", response_model=MetaFinanceiraResponse)
@@ -432,18 +617,23 @@ def criar_meta_financeira(
     return db_meta
 
 @router.get("/metas", response_model=List[MetaFinanceiraResponse])
-def listar_metas_financeiras(
+async def listar_metas_financeiras(
+    response: Response,
     status: Optional[StatusMeta] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    pagina: ParametrosPagina = Depends(),
+    current_user: User = Depends(get_current_user_async),
+    db=Depends(get_async_db)
 ):
-    """Listar metas financeiras"""
-    query = db.query(MetaFinanceira).filter(MetaFinanceira.user_id == current_user.id)
-    
-    if status:
-        query = query.filter(MetaFinanceira.status == status)
+    """Listar metas financeiras (paginado por cursor; ver paginacao.py)"""
+    def consultar(db: Session):
+        query = db.query(MetaFinanceira).filter(MetaFinanceira.user_id == current_user.id)
+        
+        if status:
+            query = query.filter(MetaFinanceira.status == status)
+        
+        return paginar(query, MetaFinanceira.data_meta, MetaFinanceiraResponse, pagina, response)
     
-    return query.order_by(MetaFinanceira.data_meta).all()
+    return await db.run_sync(consultar)
 
 @router.get("/metas/{meta_id}", response_model=MetaFinanceiraResponse)
 def obter_meta_financeira(
@@ -500,7 +690,8 @@ def deletar_meta_financeira(
     if not meta:
         raise HTTPException(status_code=404, detail="Meta não encontrada")
     
-    # Deletar transações relacionadas
+    # Deletar transações relacionadas (descontando-as antes dos resumos mensais)
+    remover_dos_resumos(db, TransacaoMeta, TransacaoMeta.meta_id == meta_id)
     db.query(TransacaoMeta).filter(TransacaoMeta.meta_id == meta_id).delete()
     
     db.delete(meta)
@@ -546,27 +737,32 @@ def adicionar_transacao_meta(
     return db_transacao
 
 @router.get("/metas/{meta_id}/transacoes", response_model=List[TransacaoMetaResponse])
-def listar_transacoes_meta(
+async def listar_transacoes_meta(
     meta_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    response: Response,
+    pagina: ParametrosPagina = Depends(),
+    current_user: User = Depends(get_current_user_async),
+    db=Depends(get_async_db)
 ):
-    """Listar transações de uma meta"""
-    # Verificar se a meta existe
-    meta = db.query(MetaFinanceira).filter(
-        MetaFinanceira.id == meta_id,
-        MetaFinanceira.user_id == current_user.id
-    ).first()
-    
-    if not meta:
-        raise HTTPException(status_code=404, detail="Meta não encontrada")
-    
-    transacoes = db.query(TransacaoMeta).filter(
-        TransacaoMeta.meta_id == meta_id,
-        TransacaoMeta.user_id == current_user.id
-    ).order_by(TransacaoMeta.data_transacao.desc()).all()
+    """Listar transações de uma meta (paginado por cursor; ver paginacao.py)"""
+    def consultar(db: Session):
+        # Verificar se a meta existe
+        meta = db.query(MetaFinanceira).filter(
+            MetaFinanceira.id == meta_id,
+            MetaFinanceira.user_id == current_user.id
+        ).first()
+        
+        if not meta:
+            raise HTTPException(status_code=404, detail="Meta não encontrada")
+        
+        query = db.query(TransacaoMeta).filter(
+            TransacaoMeta.meta_id == meta_id,
+            TransacaoMeta.user_id == current_user.id
+        )
+        
+        return paginar(query, TransacaoMeta.data_transacao, TransacaoMetaResponse, pagina, response, descendente=True)
     
-    return transacoes
+    return await db.run_sync(consultar)
 
 @router.delete("/transacoes/{transacao_id}")
 def deletar_transacao_meta(
@@ -614,21 +810,26 @@ def criar_investimento(
     return db_investimento
 
 @router.get("/investimentos", response_model=List[InvestimentoResponse])
-def listar_investimentos(
+async def listar_investimentos(
+    response: Response,
     tipo: Optional[TipoInvestimento] = None,
     ativo: Optional[bool] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    pagina: ParametrosPagina = Depends(),
+    current_user: User = Depends(get_current_user_async),
+    db=Depends(get_async_db)
 ):
-    """Listar investimentos"""
-    query = db.query(Investimento).filter(Investimento.user_id == current_user.id)
-    
-    if tipo:
-        query = query.filter(Investimento.tipo == tipo)
-    if ativo is not None:
-        query = query.filter(Investimento.ativo == ativo)
+    """Listar investimentos (paginado por cursor; ver paginacao.py)"""
+    def consultar(db: Session):
+        query = db.query(Investimento).filter(Investimento.user_id == current_user.id)
+        
+        if tipo:
+            query = query.filter(Investimento.tipo == tipo)
+        if ativo is not None:
+            query = query.filter(Investimento.ativo == ativo)
+        
+        return paginar(query, Investimento.data_investimento, InvestimentoResponse, pagina, response, descendente=True)
     
-    return query.order_by(Investimento.data_investimento.desc()).all()
+    return await db.run_sync(consultar)
 
 @router.get("/investimentos/{investimento_id}", response_model=InvestimentoResponse)
 def obter_investimento(
@@ -692,125 +893,113 @@ def deletar_investimento(
 # ==================== DASHBOARD E RELATÓRIOS ====================
 
 @router.get("/dashboard", response_model=DashboardResponse)
-def obter_dashboard(
+@cache_por_usuario("dashboard")
+async def obter_dashboard(
     mes: Optional[int] = None,
     ano: Optional[int] = None,
     tipo: str = Query("mensal", description="Tipo: 'mensal', 'anual' ou 'total'"),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db=Depends(get_async_read_db)
 ):
     """Obter dados do dashboard financeiro"""
-    hoje = date.today()
-    
-    # Definir parâmetros baseados no tipo
-    if tipo == "mensal":
-        mes_ref = mes or hoje.month
-        ano_ref = ano or hoje.year
-        filtro_mes = mes_ref
-        filtro_ano = ano_ref
-    elif tipo == "anual":
-        ano_ref = ano or hoje.year
-        filtro_mes = None
-        filtro_ano = ano_ref
-    else:  # total
-        filtro_mes = None
-        filtro_ano = None
-    
-    # Construir filtros baseados no tipo
-    filtros_receitas = [ContaReceber.user_id == current_user.id, ContaReceber.status == StatusConta.PAGO]
-    filtros_despesas = [ContaPagar.user_id == current_user.id, ContaPagar.status == StatusConta.PAGO]
-    
-    if filtro_mes:
-        # Para receitas: filtrar por data_vencimento (quando vence) - SQLite
-        filtros_receitas.append(func.strftime('%m', ContaReceber.data_vencimento) == f'{filtro_mes:02d}')
-        # Para despesas: filtrar por data_vencimento (quando vence) - SQLite
-        filtros_despesas.append(func.strftime('%m', ContaPagar.data_vencimento) == f'{filtro_mes:02d}')
-    
-    if filtro_ano:
-        # Para receitas: filtrar por data_vencimento (quando vence) - SQLite
-        filtros_receitas.append(func.strftime('%Y', ContaReceber.data_vencimento) == str(filtro_ano))
-        # Para despesas: filtrar por data_vencimento (quando vence) - SQLite
-        filtros_despesas.append(func.strftime('%Y', ContaPagar.data_vencimento) == str(filtro_ano))
-    
-    # Receitas
-    receitas_mes = db.query(func.sum(ContaReceber.valor)).filter(*filtros_receitas).scalar() or 0
-    
-    # Despesas
-    despesas_mes = db.query(func.sum(ContaPagar.valor)).filter(*filtros_despesas).scalar() or 0
-    
-    # Total investido
-    total_investido = db.query(func.sum(Investimento.valor_atual)).filter(
-        Investimento.user_id == current_user.id,
-        Investimento.ativo == True
-    ).scalar() or 0
-    
-    # Metas ativas e concluídas
-    metas_ativas = db.query(func.count(MetaFinanceira.id)).filter(
-        MetaFinanceira.user_id == current_user.id,
-        MetaFinanceira.status == StatusMeta.ATIVA
-    ).scalar() or 0
-    
-    metas_concluidas = db.query(func.count(MetaFinanceira.id)).filter(
-        MetaFinanceira.user_id == current_user.id,
-        MetaFinanceira.status == StatusMeta.CONCLUIDA
-    ).scalar() or 0
-    
-    # Próximas contas (próximos 7 dias)
-    proximas_contas = db.query(ContaPagar).filter(
-        ContaPagar.user_id == current_user.id,
-        ContaPagar.status == StatusConta.PENDENTE,
-        ContaPagar.data_vencimento <= hoje + timedelta(days=7)
-    ).order_by(ContaPagar.data_vencimento).limit(5).all()
+    def consultar(db: Session):
+        hoje = date.today()
+        
+        # Definir parâmetros baseados no tipo
+        if tipo == "mensal":
+            mes_ref = mes or hoje.month
+            ano_ref = ano or hoje.year
+            filtro_mes = mes_ref
+            filtro_ano = ano_ref
+        elif tipo == "anual":
+            ano_ref = ano or hoje.year
+            filtro_mes = None
+            filtro_ano = ano_ref
+        else:  # total
+            filtro_mes = None
+            filtro_ano = None
+        
+        # Construir filtros baseados no tipo
+        filtros_receitas = [ContaReceber.user_id == current_user.id, ContaReceber.status == StatusConta.PAGO]
+        filtros_despesas = [ContaPagar.user_id == current_user.id, ContaPagar.status == StatusConta.PAGO]
+        
+        # Receitas e despesas são filtradas por data_vencimento (quando vence)
+        filtros_receitas.extend(filtro_periodo(ContaReceber.data_vencimento, filtro_mes, filtro_ano))
+        filtros_despesas.extend(filtro_periodo(ContaPagar.data_vencimento, filtro_mes, filtro_ano))
+        
+        # Receitas
+        receitas_mes = db.query(func.sum(ContaReceber.valor)).filter(*filtros_receitas).scalar() or 0
+        
+        # Despesas
+        despesas_mes = db.query(func.sum(ContaPagar.valor)).filter(*filtros_despesas).scalar() or 0
+        
+        # Total investido
+        total_investido = db.query(func.sum(Investimento.valor_atual)).filter(
+            Investimento.user_id == current_user.id,
+            Investimento.ativo == True
+        ).scalar() or 0
+        
+        # Metas ativas e concluídas
+        metas_ativas = db.query(func.count(MetaFinanceira.id)).filter(
+            MetaFinanceira.user_id == current_user.id,
+            MetaFinanceira.status == StatusMeta.ATIVA
+        ).scalar() or 0
+        
+        metas_concluidas = db.query(func.count(MetaFinanceira.id)).filter(
+            MetaFinanceira.user_id == current_user.id,
+            MetaFinanceira.status == StatusMeta.CONCLUIDA
+        ).scalar() or 0
+        
+        # Próximas contas (próximos 7 dias)
+        proximas_contas = db.query(ContaPagar).filter(
+            ContaPagar.user_id == current_user.id,
+            ContaPagar.status.in_(STATUS_EM_ABERTO),
+            ContaPagar.data_vencimento <= hoje + timedelta(days=7)
+        ).order_by(ContaPagar.data_vencimento).limit(5).all()
+        
+        # Metas próximas (próximos 30 dias)
+        metas_proximas = db.query(MetaFinanceira).filter(
+            MetaFinanceira.user_id == current_user.id,
+            MetaFinanceira.status == StatusMeta.ATIVA,
+            MetaFinanceira.data_meta <= hoje + timedelta(days=30)
+        ).order_by(MetaFinanceira.data_meta).limit(5).all()
+        
+        return DashboardResponse(
+            saldo_atual=receitas_mes - despesas_mes,
+            receitas_mes=receitas_mes,
+            despesas_mes=despesas_mes,
+            saldo_mes=receitas_mes - despesas_mes,
+            total_investido=total_investido,
+            metas_ativas=metas_ativas,
+            metas_concluidas=metas_concluidas,
+            proximas_contas=proximas_contas,
+            metas_proximas=metas_proximas
+        )
     
-    # Metas próximas (próximos 30 dias)
-    metas_proximas = db.query(MetaFinanceira).filter(
-        MetaFinanceira.user_id == current_user.id,
-        MetaFinanceira.status == StatusMeta.ATIVA,
-        MetaFinanceira.data_meta <= hoje + timedelta(days=30)
-    ).order_by(MetaFinanceira.data_meta).limit(5).all()
-    
-    return DashboardResponse(
-        saldo_atual=receitas_mes - despesas_mes,
-        receitas_mes=receitas_mes,
-        despesas_mes=despesas_mes,
-        saldo_mes=receitas_mes - despesas_mes,
-        total_investido=total_investido,
-        metas_ativas=metas_ativas,
-        metas_concluidas=metas_concluidas,
-        proximas_contas=proximas_contas,
-        metas_proximas=metas_proximas
-    )
+    return await db.run_sync(consultar)
 
 @router.get("/graficos/mensal", response_model=List[GraficoMensalResponse])
+@cache_por_usuario("graficos/mensal")
 def obter_grafico_mensal(
-    meses: int = Query(12, description="Número de meses para o gráfico"),
+    meses: int = Query(12, ge=1, le=120, description="Número de meses para o gráfico"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """Obter dados para gráfico mensal"""
+    """Obter dados para gráfico mensal (meses de calendário, do mais antigo ao atual)"""
     hoje = date.today()
-    dados = []
+    mes_inicio, ano_inicio = somar_meses(hoje.month, hoje.year, -(meses - 1))
     
+    # Uma única consulta aos resumos mensais; meses sem movimentação ficam zerados
+    resumos = resumos_do_intervalo(
+        db, current_user.id, primeiro_dia(mes_inicio, ano_inicio), primeiro_dia_proximo_mes(hoje.month, hoje.year)
+    )
+    
+    dados = []
     for i in range(meses):
-        data_ref = hoje - timedelta(days=30 * i)
-        mes = data_ref.month
-        ano = data_ref.year
-        
-        # Receitas do mês
-        receitas = db.query(func.sum(ContaReceber.valor)).filter(
-            ContaReceber.user_id == current_user.id,
-            ContaReceber.status == StatusConta.PAGO,
-            func.extract('month', ContaReceber.data_recebimento) == mes,
-            func.extract('year', ContaReceber.data_recebimento) == ano
-        ).scalar() or 0
-        
-        # Despesas do mês
-        despesas = db.query(func.sum(ContaPagar.valor)).filter(
-            ContaPagar.user_id == current_user.id,
-            ContaPagar.status == StatusConta.PAGO,
-            func.extract('month', ContaPagar.data_pagamento) == mes,
-            func.extract('year', ContaPagar.data_pagamento) == ano
-        ).scalar() or 0
+        mes, ano = somar_meses(mes_inicio, ano_inicio, i)
+        resumo = resumos.get((ano, mes))
+        receitas = resumo.total_receitas if resumo else 0
+        despesas = resumo.total_despesas if resumo else 0
         
         dados.append(GraficoMensalResponse(
             mes=f"{mes:02d}/{ano}",
@@ -819,15 +1008,16 @@ def obter_grafico_mensal(
             saldo=receitas - despesas
         ))
     
-    return list(reversed(dados))
+    return dados
 
 @router.get("/relatorios/categorias", response_model=List[RelatorioCategoriaResponse])
+@cache_por_usuario("relatorios/categorias")
 def obter_relatorio_categorias(
     tipo: str = Query("despesas", description="Tipo: 'despesas' ou 'receitas'"),
     mes: Optional[int] = None,
     ano: Optional[int] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Obter relatório por categorias"""
     hoje = date.today()
@@ -842,8 +1032,7 @@ def obter_relatorio_categorias(
         ).filter(
             ContaPagar.user_id == current_user.id,
             ContaPagar.status == StatusConta.PAGO,
-            func.extract('month', ContaPagar.data_pagamento) == mes_ref,
-            func.extract('year', ContaPagar.data_pagamento) == ano_ref
+            *filtro_periodo(ContaPagar.data_pagamento, mes_ref, ano_ref)
         ).group_by(ContaPagar.categoria)
     else:
         query = db.query(
@@ -853,8 +1042,7 @@ def obter_relatorio_categorias(
         ).filter(
             ContaReceber.user_id == current_user.id,
             ContaReceber.status == StatusConta.PAGO,
-            func.extract('month', ContaReceber.data_recebimento) == mes_ref,
-            func.extract('year', ContaReceber.data_recebimento) == ano_ref
+            *filtro_periodo(ContaReceber.data_recebimento, mes_ref, ano_ref)
         ).group_by(ContaReceber.categoria)
     
     resultados = query.all()
@@ -874,153 +1062,55 @@ def obter_relatorio_categorias(
 
 # ==================== RELATÓRIOS MENSALS ====================
 
-@router.get("/relatorios/mensal", response_model=RelatorioMensalResponse)
-def obter_relatorio_mensal(
-    mes: Optional[int] = None,
-    ano: Optional[int] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Obter relatório financeiro completo do mês"""
-    hoje = date.today()
-    mes_ref = mes or hoje.month
-    ano_ref = ano or hoje.year
-    
-    # Calcular totais do mês
-    receitas_mes = db.query(func.sum(ContaReceber.valor)).filter(
-        ContaReceber.user_id == current_user.id,
-        ContaReceber.status == StatusConta.PAGO,
-        func.extract('month', ContaReceber.data_recebimento) == mes_ref,
-        func.extract('year', ContaReceber.data_recebimento) == ano_ref
-    ).scalar() or 0
-    
-    despesas_mes = db.query(func.sum(ContaPagar.valor)).filter(
-        ContaPagar.user_id == current_user.id,
-        ContaPagar.status == StatusConta.PAGO,
-        func.extract('month', ContaPagar.data_pagamento) == mes_ref,
-        func.extract('year', ContaPagar.data_pagamento) == ano_ref
-    ).scalar() or 0
-    
-    saldo_mensal = receitas_mes - despesas_mes
-    
-    # Total investido no mês
-    total_investido = db.query(func.sum(Investimento.valor_investido)).filter(
-        Investimento.user_id == current_user.id,
-        func.extract('month', Investimento.data_investimento) == mes_ref,
-        func.extract('year', Investimento.data_investimento) == ano_ref
-    ).scalar() or 0
-    
-    # Total em metas no mês
-    total_metas = db.query(func.sum(TransacaoMeta.valor)).filter(
-        TransacaoMeta.user_id == current_user.id,
-        func.extract('month', TransacaoMeta.data_transacao) == mes_ref,
-        func.extract('year', TransacaoMeta.data_transacao) == ano_ref
-    ).scalar() or 0
-    
-    # Contas pagas e vencidas
-    contas_pagas = db.query(func.count(ContaPagar.id)).filter(
-        ContaPagar.user_id == current_user.id,
-        ContaPagar.status == StatusConta.PAGO,
-        func.extract('month', ContaPagar.data_pagamento) == mes_ref,
-        func.extract('year', ContaPagar.data_pagamento) == ano_ref
-    ).scalar() or 0
+def _relatorio_por_categoria(por_categoria: Dict[CategoriaConta, Tuple[float, int]]) -> List[RelatorioCategoriaResponse]:
+    """Monta o relatório por categoria a partir dos totais agregados"""
+    total_geral = sum(total for total, _ in por_categoria.values())
     
-    contas_vencidas = db.query(func.count(ContaPagar.id)).filter(
-        ContaPagar.user_id == current_user.id,
-        ContaPagar.status == StatusConta.VENCIDO,
-        func.extract('month', ContaPagar.data_vencimento) == mes_ref,
-        func.extract('year', ContaPagar.data_vencimento) == ano_ref
-    ).scalar() or 0
-    
-    # Metas concluídas e ativas
-    metas_concluidas = db.query(func.count(MetaFinanceira.id)).filter(
-        MetaFinanceira.user_id == current_user.id,
-        MetaFinanceira.status == StatusMeta.CONCLUIDA,
-        func.extract('month', MetaFinanceira.updated_at) == mes_ref,
-        func.extract('year', MetaFinanceira.updated_at) == ano_ref
-    ).scalar() or 0
-    
-    metas_ativas = db.query(func.count(MetaFinanceira.id)).filter(
-        MetaFinanceira.user_id == current_user.id,
-        MetaFinanceira.status == StatusMeta.ATIVA
-    ).scalar() or 0
+    relatorio = []
+    for categoria, (total, quantidade) in por_categoria.items():
+        percentual = (total / total_geral * 100) if total_geral > 0 else 0
+        relatorio.append(RelatorioCategoriaResponse(
+            categoria=categoria.value,
+            total=total,
+            percentual=round(percentual, 2),
+            quantidade=quantidade
+        ))
     
-    # Relatórios por categoria
-    receitas_por_categoria = obter_relatorio_categorias("receitas", mes_ref, ano_ref, current_user, db)
-    despesas_por_categoria = obter_relatorio_categorias("despesas", mes_ref, ano_ref, current_user, db)
+    return sorted(relatorio, key=lambda x: x.total, reverse=True)
+
+def _montar_relatorio_mensal(agregado: AgregadoMensal, mes: int, ano: int) -> RelatorioMensalResponse:
+    """Monta o relatório mensal a partir de um resultado agregado"""
+    totais = agregado.mes(mes, ano)
     
     return RelatorioMensalResponse(
-        mes=mes_ref,
-        ano=ano_ref,
-        total_receitas=receitas_mes,
-        total_despesas=despesas_mes,
-        saldo_mensal=saldo_mensal,
-        total_investido=total_investido,
-        total_metas=total_metas,
-        receitas_por_categoria=receitas_por_categoria,
-        despesas_por_categoria=despesas_por_categoria,
-        contas_pagas=contas_pagas,
-        contas_vencidas=contas_vencidas,
-        metas_concluidas=metas_concluidas,
-        metas_ativas=metas_ativas
+        mes=mes,
+        ano=ano,
+        total_receitas=totais.total_receitas,
+        total_despesas=totais.total_despesas,
+        saldo_mensal=totais.saldo_mensal,
+        total_investido=totais.total_investido,
+        total_metas=totais.total_metas,
+        receitas_por_categoria=_relatorio_por_categoria(totais.receitas_por_categoria),
+        despesas_por_categoria=_relatorio_por_categoria(totais.despesas_por_categoria),
+        contas_pagas=totais.contas_pagas,
+        contas_vencidas=totais.contas_vencidas,
+        metas_concluidas=totais.metas_concluidas,
+        metas_ativas=agregado.metas_ativas
     )
 
-@router.get("/relatorios/fluxo-caixa-mensal", response_model=FluxoCaixaMensalResponse)
-def obter_fluxo_caixa_mensal(
-    mes: Optional[int] = None,
-    ano: Optional[int] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Obter fluxo de caixa mensal detalhado"""
-    hoje = date.today()
-    mes_ref = mes or hoje.month
-    ano_ref = ano or hoje.year
-    
-    # Saldo inicial (soma de todos os saldos até o mês anterior)
-    saldo_inicial = 0
-    if mes_ref > 1:
-        # Calcular saldo acumulado até o mês anterior
-        for m in range(1, mes_ref):
-            receitas_ant = db.query(func.sum(ContaReceber.valor)).filter(
-                ContaReceber.user_id == current_user.id,
-                ContaReceber.status == StatusConta.PAGO,
-                func.extract('month', ContaReceber.data_recebimento) == m,
-                func.extract('year', ContaReceber.data_recebimento) == ano_ref
-            ).scalar() or 0
-            
-            despesas_ant = db.query(func.sum(ContaPagar.valor)).filter(
-                ContaPagar.user_id == current_user.id,
-                ContaPagar.status == StatusConta.PAGO,
-                func.extract('month', ContaPagar.data_pagamento) == m,
-                func.extract('year', ContaPagar.data_pagamento) == ano_ref
-            ).scalar() or 0
-            
-            saldo_inicial += (receitas_ant - despesas_ant)
-    
-    # Entradas do mês
-    entradas = db.query(func.sum(ContaReceber.valor)).filter(
-        ContaReceber.user_id == current_user.id,
-        ContaReceber.status == StatusConta.PAGO,
-        func.extract('month', ContaReceber.data_recebimento) == mes_ref,
-        func.extract('year', ContaReceber.data_recebimento) == ano_ref
-    ).scalar() or 0
-    
-    # Saídas do mês
-    saidas = db.query(func.sum(ContaPagar.valor)).filter(
-        ContaPagar.user_id == current_user.id,
-        ContaPagar.status == StatusConta.PAGO,
-        func.extract('month', ContaPagar.data_pagamento) == mes_ref,
-        func.extract('year', ContaPagar.data_pagamento) == ano_ref
-    ).scalar() or 0
+def _montar_fluxo_caixa(agregado: AgregadoMensal, mes: int, ano: int, saldo_inicial: float) -> FluxoCaixaMensalResponse:
+    """Monta o fluxo de caixa; saldo_inicial vem dos resumos mensais (saldo_acumulado_ate)"""
+    totais = agregado.mes(mes, ano)
+    entradas = totais.total_receitas
+    saidas = totais.total_despesas
     
     saldo_final = saldo_inicial + entradas - saidas
     variacao_mensal = entradas - saidas
     percentual_variacao = (variacao_mensal / saldo_inicial * 100) if saldo_inicial > 0 else 0
     
     return FluxoCaixaMensalResponse(
-        mes=mes_ref,
-        ano=ano_ref,
+        mes=mes,
+        ano=ano,
         saldo_inicial=saldo_inicial,
         entradas=entradas,
         saidas=saidas,
@@ -1029,29 +1119,12 @@ def obter_fluxo_caixa_mensal(
         percentual_variacao=round(percentual_variacao, 2)
     )
 
-@router.get("/relatorios/comparativo-mensal", response_model=ComparativoMensalResponse)
-def obter_comparativo_mensal(
-    mes: Optional[int] = None,
-    ano: Optional[int] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Comparar mês atual com mês anterior"""
-    hoje = date.today()
-    mes_atual = mes or hoje.month
-    ano_atual = ano or hoje.year
+def _montar_comparativo(agregado: AgregadoMensal, mes: int, ano: int) -> ComparativoMensalResponse:
+    """Monta o comparativo; o agregado deve cobrir o mês anterior"""
+    mes_ant, ano_ant = mes_anterior(mes, ano)
     
-    # Calcular mês anterior
-    if mes_atual == 1:
-        mes_anterior = 12
-        ano_anterior = ano_atual - 1
-    else:
-        mes_anterior = mes_atual - 1
-        ano_anterior = ano_atual
-    
-    # Obter relatórios
-    relatorio_atual = obter_relatorio_mensal(mes_atual, ano_atual, current_user, db)
-    relatorio_anterior = obter_relatorio_mensal(mes_anterior, ano_anterior, current_user, db)
+    relatorio_atual = _montar_relatorio_mensal(agregado, mes, ano)
+    relatorio_anterior = _montar_relatorio_mensal(agregado, mes_ant, ano_ant)
     
     # Calcular variações
     variacao_receitas = relatorio_atual.total_receitas - relatorio_anterior.total_receitas
@@ -1075,10 +1148,72 @@ def obter_comparativo_mensal(
         tendencia=tendencia
     )
 
+def _agregar_painel_mensal(mes: int, ano: int, user_id: int, db: Session) -> AgregadoMensal:
+    """Agrega de uma vez tudo o que o dashboard mensal precisa: o mês anterior e o de referência"""
+    mes_ant, ano_ant = mes_anterior(mes, ano)
+    return agregar_totais_mensais(db, user_id, primeiro_dia(mes_ant, ano_ant), primeiro_dia_proximo_mes(mes, ano))
+
+@router.get("/relatorios/mensal", response_model=RelatorioMensalResponse)
+@cache_por_usuario("relatorios/mensal")
+def obter_relatorio_mensal(
+    mes: Optional[int] = None,
+    ano: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Obter relatório financeiro completo do mês"""
+    hoje = date.today()
+    mes_ref = mes or hoje.month
+    ano_ref = ano or hoje.year
+    
+    agregado = agregar_totais_mensais(
+        db, current_user.id, primeiro_dia(mes_ref, ano_ref), primeiro_dia_proximo_mes(mes_ref, ano_ref)
+    )
+    return _montar_relatorio_mensal(agregado, mes_ref, ano_ref)
+
+@router.get("/relatorios/fluxo-caixa-mensal", response_model=FluxoCaixaMensalResponse)
+@cache_por_usuario("relatorios/fluxo-caixa-mensal")
+def obter_fluxo_caixa_mensal(
+    mes: Optional[int] = None,
+    ano: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Obter fluxo de caixa mensal detalhado"""
+    hoje = date.today()
+    mes_ref = mes or hoje.month
+    ano_ref = ano or hoje.year
+    
+    agregado = agregar_totais_mensais(
+        db, current_user.id, primeiro_dia(mes_ref, ano_ref), primeiro_dia_proximo_mes(mes_ref, ano_ref)
+    )
+    saldo_inicial = saldo_acumulado_ate(db, current_user.id, mes_ref, ano_ref)
+    return _montar_fluxo_caixa(agregado, mes_ref, ano_ref, saldo_inicial)
+
+@router.get("/relatorios/comparativo-mensal", response_model=ComparativoMensalResponse)
+@cache_por_usuario("relatorios/comparativo-mensal")
+def obter_comparativo_mensal(
+    mes: Optional[int] = None,
+    ano: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Comparar mês atual com mês anterior"""
+    hoje = date.today()
+    mes_atual = mes or hoje.month
+    ano_atual = ano or hoje.year
+    mes_ant, ano_ant = mes_anterior(mes_atual, ano_atual)
+    
+    agregado = agregar_totais_mensais(
+        db, current_user.id, primeiro_dia(mes_ant, ano_ant), primeiro_dia_proximo_mes(mes_atual, ano_atual)
+    )
+    return _montar_comparativo(agregado, mes_atual, ano_atual)
+
 @router.get("/relatorios/alertas-mensais", response_model=AlertasMensaisResponse)
+@cache_por_usuario("relatorios/alertas-mensais")
 def obter_alertas_mensais(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Obter alertas e notificações financeiras"""
     hoje = date.today()
@@ -1086,7 +1221,7 @@ def obter_alertas_mensais(
     # Contas vencidas
     contas_vencidas = db.query(ContaPagar).filter(
         ContaPagar.user_id == current_user.id,
-        ContaPagar.status == StatusConta.VENCIDO,
+        ContaPagar.status.in_(STATUS_EM_ABERTO),  # inclui as que a varredura ainda não marcou
         ContaPagar.data_vencimento < hoje
     ).all()
     
@@ -1108,18 +1243,8 @@ def obter_alertas_mensais(
     saldo_negativo = False
     alertas_criticos = []
     
-    # Calcular saldo atual
-    receitas_totais = db.query(func.sum(ContaReceber.valor)).filter(
-        ContaReceber.user_id == current_user.id,
-        ContaReceber.status == StatusConta.PAGO
-    ).scalar() or 0
-    
-    despesas_totais = db.query(func.sum(ContaPagar.valor)).filter(
-        ContaPagar.user_id == current_user.id,
-        ContaPagar.status == StatusConta.PAGO
-    ).scalar() or 0
-    
-    saldo_atual = receitas_totais - despesas_totais
+    # Saldo atual: uma linha dos resumos mensais, sem somar as duas tabelas de contas
+    saldo_atual = saldo_acumulado_total(db, current_user.id)
     
     if saldo_atual < 0:
         saldo_negativo = True
@@ -1151,59 +1276,11 @@ def gerar_resumo_mensal_automatico(
     mes_ref = mes or hoje.month
     ano_ref = ano or hoje.year
     
-    # Verificar se já existe resumo para o mês
-    resumo_existente = db.query(ResumoFinanceiro).filter(
-        ResumoFinanceiro.user_id == current_user.id,
-        ResumoFinanceiro.mes == mes_ref,
-        ResumoFinanceiro.ano == ano_ref
-    ).first()
-    
-    if resumo_existente:
-        # Atualizar resumo existente
-        resumo = resumo_existente
-    else:
-        # Criar novo resumo
-        resumo = ResumoFinanceiro(
-            user_id=current_user.id,
-            mes=mes_ref,
-            ano=ano_ref
-        )
-        db.add(resumo)
-    
-    # Calcular totais
-    receitas_mes = db.query(func.sum(ContaReceber.valor)).filter(
-        ContaReceber.user_id == current_user.id,
-        ContaReceber.status == StatusConta.PAGO,
-        func.extract('month', ContaReceber.data_recebimento) == mes_ref,
-        func.extract('year', ContaReceber.data_recebimento) == ano_ref
-    ).scalar() or 0
-    
-    despesas_mes = db.query(func.sum(ContaPagar.valor)).filter(
-        ContaPagar.user_id == current_user.id,
-        ContaPagar.status == StatusConta.PAGO,
-        func.extract('month', ContaPagar.data_pagamento) == mes_ref,
-        func.extract('year', ContaPagar.data_pagamento) == ano_ref
-    ).scalar() or 0
-    
-    total_investido = db.query(func.sum(Investimento.valor_investido)).filter(
-        Investimento.user_id == current_user.id,
-        func.extract('month', Investimento.data_investimento) == mes_ref,
-        func.extract('year', Investimento.data_investimento) == ano_ref
-    ).scalar() or 0
-    
-    total_metas = db.query(func.sum(TransacaoMeta.valor)).filter(
-        TransacaoMeta.user_id == current_user.id,
-        func.extract('month', TransacaoMeta.data_transacao) == mes_ref,
-        func.extract('year', TransacaoMeta.data_transacao) == ano_ref
-    ).scalar() or 0
-    
-    # Atualizar resumo
-    resumo.total_receitas = receitas_mes
-    resumo.total_despesas = despesas_mes
-    resumo.saldo_mensal = receitas_mes - despesas_mes
-    resumo.total_investido = total_investido
-    resumo.total_metas = total_metas
-    
+    # Os resumos já são mantidos a cada escrita; aqui o mês é recalculado do zero
+    reconstruir_resumos(
+        db, [current_user.id], primeiro_dia(mes_ref, ano_ref), primeiro_dia_proximo_mes(mes_ref, ano_ref)
+    )
+    marcar_usuario_alterado(db, current_user.id)
     db.commit()
     
     return {"message": f"Resumo mensal gerado com sucesso para {mes_ref}/{ano_ref}"}
@@ -1231,14 +1308,13 @@ def criar_meta_mensal(
         user_id=current_user.id,
         **meta.dict()
     )
+    # Gravar os valores realizados até agora junto com a meta
+    _gravar_realizado_meta_mensal(db_meta, db)
     db.add(db_meta)
     db.commit()
     db.refresh(db_meta)
     
-    # Atualizar valores realizados
-    atualizar_meta_mensal(db_meta.id, current_user, db)
-    
-    return db_meta
+    return _metas_mensais_com_realizado([db_meta], db)[0]
 
 @router.get("/metas-mensais", response_model=List[MetaMensalResponse])
 def listar_metas_mensais(
@@ -1257,11 +1333,8 @@ def listar_metas_mensais(
     
     metas = query.order_by(MetaMensal.ano.desc(), MetaMensal.mes.desc()).all()
     
-    # Atualizar valores realizados para cada meta
-    for meta in metas:
-        atualizar_meta_mensal(meta.id, current_user, db)
-    
-    return metas
+    # Valores realizados calculados na leitura, a partir dos resumos mensais
+    return _metas_mensais_com_realizado(metas, db)
 
 @router.get("/metas-mensais/{meta_id}", response_model=MetaMensalResponse)
 def obter_meta_mensal(
@@ -1278,10 +1351,7 @@ def obter_meta_mensal(
     if not meta:
         raise HTTPException(status_code=404, detail="Meta mensal não encontrada")
     
-    # Atualizar valores realizados
-    atualizar_meta_mensal(meta.id, current_user, db)
-    
-    return meta
+    return _metas_mensais_com_realizado([meta], db)[0]
 
 @router.put("/metas-mensais/{meta_id}", response_model=MetaMensalResponse)
 def atualizar_meta_mensal_endpoint(
@@ -1301,14 +1371,12 @@ def atualizar_meta_mensal_endpoint(
     
     for field, value in meta_update.dict(exclude_unset=True).items():
         setattr(meta, field, value)
+    _gravar_realizado_meta_mensal(meta, db)
     
     db.commit()
     db.refresh(meta)
     
-    # Atualizar valores realizados
-    atualizar_meta_mensal(meta.id, current_user, db)
-    
-    return meta
+    return _metas_mensais_com_realizado([meta], db)[0]
 
 @router.delete("/metas-mensais/{meta_id}")
 def deletar_meta_mensal(
@@ -1330,99 +1398,77 @@ def deletar_meta_mensal(
     return {"message": "Meta mensal deletada com sucesso"}
 
 @router.get("/dashboard-mensal", response_model=DashboardMensalResponse)
-def obter_dashboard_mensal(
+@cache_por_usuario("dashboard-mensal")
+async def obter_dashboard_mensal(
     mes: Optional[int] = None,
     ano: Optional[int] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db=Depends(get_async_read_db)
 ):
     """Obter dashboard mensal completo"""
-    hoje = date.today()
-    mes_ref = mes or hoje.month
-    ano_ref = ano or hoje.year
-    
-    # Obter todos os dados do mês
-    resumo_mensal = obter_relatorio_mensal(mes_ref, ano_ref, current_user, db)
-    fluxo_caixa = obter_fluxo_caixa_mensal(mes_ref, ano_ref, current_user, db)
-    comparativo = obter_comparativo_mensal(mes_ref, ano_ref, current_user, db)
-    alertas = obter_alertas_mensais(current_user, db)
-    
-    # Buscar meta mensal
-    meta_mensal = db.query(MetaMensal).filter(
-        MetaMensal.user_id == current_user.id,
-        MetaMensal.mes == mes_ref,
-        MetaMensal.ano == ano_ref
-    ).first()
-    
-    if meta_mensal:
-        atualizar_meta_mensal(meta_mensal.id, current_user, db)
+    def consultar(db: Session):
+        hoje = date.today()
+        mes_ref = mes or hoje.month
+        ano_ref = ano or hoje.year
+        
+        # Obter todos os dados do mês a partir de uma única agregação
+        agregado = _agregar_painel_mensal(mes_ref, ano_ref, current_user.id, db)
+        resumo_mensal = _montar_relatorio_mensal(agregado, mes_ref, ano_ref)
+        fluxo_caixa = _montar_fluxo_caixa(
+            agregado, mes_ref, ano_ref, saldo_acumulado_ate(db, current_user.id, mes_ref, ano_ref)
+        )
+        comparativo = _montar_comparativo(agregado, mes_ref, ano_ref)
+        alertas = obter_alertas_mensais(current_user, db)
+        
+        # Buscar meta mensal
+        meta_mensal = db.query(MetaMensal).filter(
+            MetaMensal.user_id == current_user.id,
+            MetaMensal.mes == mes_ref,
+            MetaMensal.ano == ano_ref
+        ).first()
+        
+        if meta_mensal:
+            meta_mensal = _meta_mensal_com_realizado(meta_mensal, agregado.mes(mes_ref, ano_ref))
+        
+        # Próximos vencimentos (próximos 7 dias)
+        data_limite = hoje + timedelta(days=7)
+        proximos_vencimentos = db.query(ContaPagar).filter(
+            ContaPagar.user_id == current_user.id,
+            ContaPagar.status.in_(STATUS_EM_ABERTO),
+            ContaPagar.data_vencimento <= data_limite,
+            ContaPagar.data_vencimento >= hoje
+        ).order_by(ContaPagar.data_vencimento).limit(10).all()
+        
+        # Metas próximas (próximos 30 dias)
+        data_limite_metas = hoje + timedelta(days=30)
+        metas_proximas = db.query(MetaFinanceira).filter(
+            MetaFinanceira.user_id == current_user.id,
+            MetaFinanceira.status == StatusMeta.ATIVA,
+            MetaFinanceira.data_meta <= data_limite_metas,
+            MetaFinanceira.data_meta >= hoje
+        ).order_by(MetaFinanceira.data_meta).limit(5).all()
+        
+        return DashboardMensalResponse(
+            mes=mes_ref,
+            ano=ano_ref,
+            resumo_mensal=resumo_mensal,
+            fluxo_caixa=fluxo_caixa,
+            comparativo=comparativo,
+            alertas=alertas,
+            metas_mensais=meta_mensal,
+            proximos_vencimentos=proximos_vencimentos,
+            metas_proximas=metas_proximas
+        )
     
-    # Próximos vencimentos (próximos 7 dias)
-    data_limite = hoje + timedelta(days=7)
-    proximos_vencimentos = db.query(ContaPagar).filter(
-        ContaPagar.user_id == current_user.id,
-        ContaPagar.status == StatusConta.PENDENTE,
-        ContaPagar.data_vencimento <= data_limite,
-        ContaPagar.data_vencimento >= hoje
-    ).order_by(ContaPagar.data_vencimento).limit(10).all()
-    
-    # Metas próximas (próximos 30 dias)
-    data_limite_metas = hoje + timedelta(days=30)
-    metas_proximas = db.query(MetaFinanceira).filter(
-        MetaFinanceira.user_id == current_user.id,
-        MetaFinanceira.status == StatusMeta.ATIVA,
-        MetaFinanceira.data_meta <= data_limite_metas,
-        MetaFinanceira.data_meta >= hoje
-    ).order_by(MetaFinanceira.data_meta).limit(5).all()
-    
-    return DashboardMensalResponse(
-        mes=mes_ref,
-        ano=ano_ref,
-        resumo_mensal=resumo_mensal,
-        fluxo_caixa=fluxo_caixa,
-        comparativo=comparativo,
-        alertas=alertas,
-        metas_mensais=meta_mensal,
-        proximos_vencimentos=proximos_vencimentos,
-        metas_proximas=metas_proximas
-    )
+    return await db.run_sync(consultar)
 
-def atualizar_meta_mensal(meta_id: int, current_user: User, db: Session):
-    """Função auxiliar para atualizar valores realizados de uma meta mensal"""
-    meta = db.query(MetaMensal).filter(
-        MetaMensal.id == meta_id,
-        MetaMensal.user_id == current_user.id
-    ).first()
-    
-    if not meta:
-        return
-    
-    # Calcular valores realizados
-    receita_realizada = db.query(func.sum(ContaReceber.valor)).filter(
-        ContaReceber.user_id == current_user.id,
-        ContaReceber.status == StatusConta.PAGO,
-        func.extract('month', ContaReceber.data_recebimento) == meta.mes,
-        func.extract('year', ContaReceber.data_recebimento) == meta.ano
-    ).scalar() or 0
-    
-    despesa_realizada = db.query(func.sum(ContaPagar.valor)).filter(
-        ContaPagar.user_id == current_user.id,
-        ContaPagar.status == StatusConta.PAGO,
-        func.extract('month', ContaPagar.data_pagamento) == meta.mes,
-        func.extract('year', ContaPagar.data_pagamento) == meta.ano
-    ).scalar() or 0
-    
-    investimento_realizado = db.query(func.sum(Investimento.valor_investido)).filter(
-        Investimento.user_id == current_user.id,
-        func.extract('month', Investimento.data_investimento) == meta.mes,
-        func.extract('year', Investimento.data_investimento) == meta.ano
-    ).scalar() or 0
-    
-    poupanca_realizada = db.query(func.sum(TransacaoMeta.valor)).filter(
-        TransacaoMeta.user_id == current_user.id,
-        func.extract('month', TransacaoMeta.data_transacao) == meta.mes,
-        func.extract('year', TransacaoMeta.data_transacao) == meta.ano
-    ).scalar() or 0
+def _realizado_meta_mensal(meta: MetaMensal, totais) -> dict:
+    """Valores realizados, percentuais e status da meta a partir dos totais do mês
+    (TotaisMes ou ResumoFinanceiro; None quando o mês não tem movimentação)"""
+    receita_realizada = totais.total_receitas if totais else 0.0
+    despesa_realizada = totais.total_despesas if totais else 0.0
+    investimento_realizado = totais.total_investido if totais else 0.0
+    poupanca_realizada = totais.total_metas if totais else 0.0
     
     # Calcular percentuais
     percentual_receita = (receita_realizada / meta.meta_receita * 100) if meta.meta_receita > 0 else 0
@@ -1442,18 +1488,40 @@ def atualizar_meta_mensal(meta_id: int, current_user: User, db: Session):
     else:
         status_geral = "ruim"
     
-    # Atualizar meta
-    meta.receita_realizada = receita_realizada
-    meta.despesa_realizada = despesa_realizada
-    meta.investimento_realizado = investimento_realizado
-    meta.poupanca_realizada = poupanca_realizada
-    meta.percentual_receita = round(percentual_receita, 2)
-    meta.percentual_despesa = round(percentual_despesa, 2)
-    meta.percentual_investimento = round(percentual_investimento, 2)
-    meta.percentual_poupanca = round(percentual_poupanca, 2)
-    meta.status_geral = status_geral
-    
-    db.commit()
+    return {
+        "receita_realizada": receita_realizada,
+        "despesa_realizada": despesa_realizada,
+        "investimento_realizado": investimento_realizado,
+        "poupanca_realizada": poupanca_realizada,
+        "percentual_receita": round(percentual_receita, 2),
+        "percentual_despesa": round(percentual_despesa, 2),
+        "percentual_investimento": round(percentual_investimento, 2),
+        "percentual_poupanca": round(percentual_poupanca, 2),
+        "status_geral": status_geral,
+    }
+
+def _meta_mensal_com_realizado(meta: MetaMensal, totais) -> MetaMensalResponse:
+    """Resposta da meta com os valores realizados atuais, sem alterar a linha no banco"""
+    return MetaMensalResponse.model_validate(meta).model_copy(update=_realizado_meta_mensal(meta, totais))
+
+def _metas_mensais_com_realizado(metas: List[MetaMensal], db: Session) -> List[MetaMensalResponse]:
+    """Respostas das metas com os realizados lidos dos resumos mensais em uma única consulta"""
+    if not metas:
+        return []
+    meses = [primeiro_dia(meta.mes, meta.ano) for meta in metas]
+    ultimo = max(meses)
+    resumos = resumos_do_intervalo(
+        db, metas[0].user_id, min(meses), primeiro_dia_proximo_mes(ultimo.month, ultimo.year)
+    )
+    return [_meta_mensal_com_realizado(meta, resumos.get((meta.ano, meta.mes))) for meta in metas]
+
+def _gravar_realizado_meta_mensal(meta: MetaMensal, db: Session):
+    """Grava na meta os valores realizados do mês (usado apenas ao criar/atualizar a meta)"""
+    resumos = resumos_do_intervalo(
+        db, meta.user_id, primeiro_dia(meta.mes, meta.ano), primeiro_dia_proximo_mes(meta.mes, meta.ano)
+    )
+    for campo, valor in _realizado_meta_mensal(meta, resumos.get((meta.ano, meta.mes))).items():
+        setattr(meta, campo, valor)
 
 # ==================== EXPORTAÇÃO DE RELATÓRIOS ====================
 
@@ -1462,18 +1530,22 @@ def exportar_relatorio_mensal(
     mes: Optional[int] = None,
     ano: Optional[int] = None,
     formato: str = Query("json", description="Formato: 'json' ou 'csv'"),
+    transacoes: bool = Query(False, description="Incluir as transações do mês"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """Exportar relatório mensal em JSON ou CSV"""
+    """Exportar relatório mensal em JSON ou CSV, transmitido à medida que é gerado"""
     hoje = date.today()
     mes_ref = mes or hoje.month
     ano_ref = ano or hoje.year
     
-    # Obter dados do relatório
-    relatorio = obter_relatorio_mensal(mes_ref, ano_ref, current_user, db)
-    fluxo_caixa = obter_fluxo_caixa_mensal(mes_ref, ano_ref, current_user, db)
-    comparativo = obter_comparativo_mensal(mes_ref, ano_ref, current_user, db)
+    # Obter dados do relatório a partir de uma única agregação
+    agregado = _agregar_painel_mensal(mes_ref, ano_ref, current_user.id, db)
+    relatorio = _montar_relatorio_mensal(agregado, mes_ref, ano_ref)
+    fluxo_caixa = _montar_fluxo_caixa(
+        agregado, mes_ref, ano_ref, saldo_acumulado_ate(db, current_user.id, mes_ref, ano_ref)
+    )
+    comparativo = _montar_comparativo(agregado, mes_ref, ano_ref)
     alertas = obter_alertas_mensais(current_user, db)
     
     # Buscar meta mensal
@@ -1484,7 +1556,7 @@ def exportar_relatorio_mensal(
     ).first()
     
     if meta_mensal:
-        atualizar_meta_mensal(meta_mensal.id, current_user, db)
+        meta_mensal = _meta_mensal_com_realizado(meta_mensal, agregado.mes(mes_ref, ano_ref))
     
     # Montar dados para exportação
     dados_exportacao = {
@@ -1559,114 +1631,158 @@ def exportar_relatorio_mensal(
             "status_geral": meta_mensal.status_geral
         }
     
+    user_id = current_user.id
+    inicio, fim = primeiro_dia(mes_ref, ano_ref), primeiro_dia_proximo_mes(mes_ref, ano_ref)
+    
     if formato == "csv":
-        # Gerar CSV
-        import csv
-        import io
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Cabeçalho
-        writer.writerow(["Relatório Financeiro Mensal"])
-        writer.writerow([f"Usuário: {current_user.full_name}"])
-        writer.writerow([f"Mês/Ano: {mes_ref}/{ano_ref}"])
-        writer.writerow([f"Data Exportação: {datetime.now().strftime('%d/%m/%Y %H:%M')}"])
-        writer.writerow([])
-        
-        # Resumo
-        writer.writerow(["RESUMO MENSAL"])
-        writer.writerow(["Total Receitas", f"R$ {relatorio.total_receitas:.2f}"])
-        writer.writerow(["Total Despesas", f"R$ {relatorio.total_despesas:.2f}"])
-        writer.writerow(["Saldo Mensal", f"R$ {relatorio.saldo_mensal:.2f}"])
-        writer.writerow(["Total Investido", f"R$ {relatorio.total_investido:.2f}"])
-        writer.writerow(["Total Metas", f"R$ {relatorio.total_metas:.2f}"])
-        writer.writerow([])
-        
-        # Fluxo de Caixa
-        writer.writerow(["FLUXO DE CAIXA"])
-        writer.writerow(["Saldo Inicial", f"R$ {fluxo_caixa.saldo_inicial:.2f}"])
-        writer.writerow(["Entradas", f"R$ {fluxo_caixa.entradas:.2f}"])
-        writer.writerow(["Saídas", f"R$ {fluxo_caixa.saidas:.2f}"])
-        writer.writerow(["Saldo Final", f"R$ {fluxo_caixa.saldo_final:.2f}"])
-        writer.writerow(["Variação Mensal", f"R$ {fluxo_caixa.variacao_mensal:.2f}"])
-        writer.writerow(["% Variação", f"{fluxo_caixa.percentual_variacao:.2f}%"])
-        writer.writerow([])
-        
-        # Receitas por Categoria
-        writer.writerow(["RECEITAS POR CATEGORIA"])
-        writer.writerow(["Categoria", "Total", "Percentual", "Quantidade"])
-        for item in relatorio.receitas_por_categoria:
-            writer.writerow([item.categoria, f"R$ {item.total:.2f}", f"{item.percentual:.2f}%", item.quantidade])
-        writer.writerow([])
-        
-        # Despesas por Categoria
-        writer.writerow(["DESPESAS POR CATEGORIA"])
-        writer.writerow(["Categoria", "Total", "Percentual", "Quantidade"])
-        for item in relatorio.despesas_por_categoria:
-            writer.writerow([item.categoria, f"R$ {item.total:.2f}", f"{item.percentual:.2f}%", item.quantidade])
-        
-        csv_content = output.getvalue()
-        output.close()
+        def gerar_csv():
+            output = io.StringIO()
+            writer = csv.writer(output)
+            
+            # Cabeçalho
+            writer.writerow(["Relatório Financeiro Mensal"])
+            writer.writerow([f"Usuário: {current_user.full_name}"])
+            writer.writerow([f"Mês/Ano: {mes_ref}/{ano_ref}"])
+            writer.writerow([f"Data Exportação: {datetime.now().strftime('%d/%m/%Y %H:%M')}"])
+            writer.writerow([])
+            
+            # Resumo
+            writer.writerow(["RESUMO MENSAL"])
+            writer.writerow(["Total Receitas", f"R$ {relatorio.total_receitas:.2f}"])
+            writer.writerow(["Total Despesas", f"R$ {relatorio.total_despesas:.2f}"])
+            writer.writerow(["Saldo Mensal", f"R$ {relatorio.saldo_mensal:.2f}"])
+            writer.writerow(["Total Investido", f"R$ {relatorio.total_investido:.2f}"])
+            writer.writerow(["Total Metas", f"R$ {relatorio.total_metas:.2f}"])
+            writer.writerow([])
+            
+            # Fluxo de Caixa
+            writer.writerow(["FLUXO DE CAIXA"])
+            writer.writerow(["Saldo Inicial", f"R$ {fluxo_caixa.saldo_inicial:.2f}"])
+            writer.writerow(["Entradas", f"R$ {fluxo_caixa.entradas:.2f}"])
+            writer.writerow(["Saídas", f"R$ {fluxo_caixa.saidas:.2f}"])
+            writer.writerow(["Saldo Final", f"R$ {fluxo_caixa.saldo_final:.2f}"])
+            writer.writerow(["Variação Mensal", f"R$ {fluxo_caixa.variacao_mensal:.2f}"])
+            writer.writerow(["% Variação", f"{fluxo_caixa.percentual_variacao:.2f}%"])
+            writer.writerow([])
+            
+            # Receitas por Categoria
+            writer.writerow(["RECEITAS POR CATEGORIA"])
+            writer.writerow(["Categoria", "Total", "Percentual", "Quantidade"])
+            for item in relatorio.receitas_por_categoria:
+                writer.writerow([item.categoria, f"R$ {item.total:.2f}", f"{item.percentual:.2f}%", item.quantidade])
+            writer.writerow([])
+            
+            # Despesas por Categoria
+            writer.writerow(["DESPESAS POR CATEGORIA"])
+            writer.writerow(["Categoria", "Total", "Percentual", "Quantidade"])
+            for item in relatorio.despesas_por_categoria:
+                writer.writerow([item.categoria, f"R$ {item.total:.2f}", f"{item.percentual:.2f}%", item.quantidade])
+            
+            yield output.getvalue().encode()
+            
+            # Transações, lidas e enviadas em blocos
+            if transacoes:
+                yield "\r\nTRANSAÇÕES\r\n".encode()
+                for parte in partes_csv_transacoes(db, user_id, inicio, fim):
+                    yield parte.encode()
         
-        from fastapi.responses import Response
-        return Response(
-            content=csv_content,
+        return StreamingResponse(
+            gerar_csv(),
             media_type="text/csv",
             headers={"Content-Disposition": f"attachment; filename=relatorio_mensal_{mes_ref}_{ano_ref}.csv"}
         )
     
     else:  # JSON
-        from fastapi.responses import JSONResponse
-        return JSONResponse(
-            content=dados_exportacao,
+        def gerar_json():
+            corpo = json.dumps(dados_exportacao, ensure_ascii=False, separators=(",", ":"))
+            if not transacoes:
+                yield corpo.encode()
+                return
+            # Abre o objeto, anexa a lista de transações em blocos e o fecha
+            yield (corpo[:-1] + ',"transacoes":').encode()
+            for parte in partes_json_transacoes(db, user_id, inicio, fim):
+                yield parte.encode()
+            yield b"}"
+        
+        return StreamingResponse(
+            gerar_json(),
+            media_type="application/json",
             headers={"Content-Disposition": f"attachment; filename=relatorio_mensal_{mes_ref}_{ano_ref}.json"}
         )
 
-@router.post("/relatorios/gerar-todos-meses")
-def gerar_relatorios_todos_meses(
-    ano: int = Query(..., description="Ano para gerar relatórios"),
+@router.get("/relatorios/exportar")
+def exportar_periodo(
+    formato: str = Query("csv", description="Formato: 'csv', 'json', 'ndjson' ou 'parquet'"),
+    conteudo: str = Query("transacoes", description="'transacoes' ou 'resumos' mensais"),
+    mes: Optional[int] = Query(None, ge=1, le=12),
+    ano: Optional[int] = None,
+    inicio: Optional[date] = Query(None, description="Data inicial (inclusive); substitui mes/ano"),
+    fim: Optional[date] = Query(None, description="Data final (inclusive)"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """Gerar relatórios para todos os meses de um ano"""
-    meses_gerados = []
+    """Exportar transações ou resumos de um mês, de um ano, de um intervalo ou de todo o histórico,
+    transmitidos à medida que são lidos do banco"""
+    try:
+        verificar_formato(formato)
+    except ValueError as erro:
+        raise HTTPException(status_code=400, detail=str(erro))
+    if conteudo not in CONTEUDOS:
+        raise HTTPException(status_code=400, detail=f"Conteúdo deve ser um de: {', '.join(CONTEUDOS)}")
+    if mes and not ano:
+        raise HTTPException(status_code=400, detail="Informe o ano junto com o mês")
+    
+    if inicio or fim:
+        # Intervalo fechado informado pelo usuário -> [inicio, fim + 1 dia)
+        intervalo = (inicio or date.min, (fim or date.max - timedelta(days=1)) + timedelta(days=1))
+        if intervalo[0] >= intervalo[1]:
+            raise HTTPException(status_code=400, detail="Data inicial posterior à final")
+        sufixo = f"{intervalo[0]}_{intervalo[1] - timedelta(days=1)}"
+    else:
+        intervalo = intervalo_periodo(mes, ano)
+        sufixo = (f"{ano}_{mes:02d}" if mes else str(ano)) if intervalo else "completo"
     
-    for mes in range(1, 13):
-        try:
-            # Gerar resumo mensal
-            gerar_resumo_mensal_automatico(mes, ano, current_user, db)
-            
-            # Criar meta mensal se não existir
-            meta_existente = db.query(MetaMensal).filter(
-                MetaMensal.user_id == current_user.id,
-                MetaMensal.mes == mes,
-                MetaMensal.ano == ano
-            ).first()
-            
-            if not meta_existente:
-                # Criar meta mensal padrão
-                meta_mensal = MetaMensal(
-                    user_id=current_user.id,
-                    mes=mes,
-                    ano=ano,
-                    meta_receita=0.0,
-                    meta_despesa=0.0,
-                    meta_investimento=0.0,
-                    meta_poupanca=0.0,
-                    observacoes=f"Meta mensal gerada automaticamente para {mes}/{ano}"
-                )
-                db.add(meta_mensal)
-                db.commit()
-            
-            meses_gerados.append(f"{mes:02d}/{ano}")
-            
-        except Exception as e:
-            print(f"Erro ao gerar relatório para {mes}/{ano}: {e}")
-            continue
+    return StreamingResponse(
+        exportar(db, current_user.id, conteudo, formato, *(intervalo or (None, None))),
+        media_type=TIPOS_MIDIA[formato],
+        headers={"Content-Disposition": f"attachment; filename={conteudo}_{sufixo}.{formato}"}
+    )
+
+@router.post("/relatorios/gerar-todos-meses", status_code=202)
+def gerar_relatorios_todos_meses(
+    ano: int = Query(..., description="Ano para gerar relatórios"),
+    ano_final: Optional[int] = Query(None, description="Último ano (inclusive), para gerar vários anos"),
+    todos_usuarios: bool = Query(False, description="Gerar para todos os usuários (somente admin)"),
+    current_user: User = Depends(get_current_user)
+):
+    """Agendar a geração dos resumos e metas mensais de todos os meses do(s) ano(s).
+    Responde na hora com o id da tarefa; o andamento fica em /tarefas/{tarefa_id}."""
+    ano_final = ano_final or ano
+    if ano_final < ano:
+        raise HTTPException(status_code=400, detail="ano_final deve ser maior ou igual a ano")
+    if todos_usuarios and not current_user.is_admin():
+        raise HTTPException(status_code=403, detail="Somente administradores podem gerar para todos os usuários")
+    
+    escopo = "todos" if todos_usuarios else current_user.id
+    tarefa = agendar(
+        "gerar-todos-meses", current_user.id, f"gerar-todos-meses:{escopo}:{ano}:{ano_final}",
+        gerar_meses, None if todos_usuarios else [current_user.id], ano, ano_final
+    )
     
     return {
-        "message": f"Relatórios gerados para {len(meses_gerados)} meses",
-        "meses_gerados": meses_gerados,
-        "total_meses": len(meses_gerados)
+        "message": f"Geração dos meses de {ano} a {ano_final} agendada",
+        "tarefa_id": tarefa.id,
+        "status": tarefa.status,
+        "url": f"/api/financeiro/tarefas/{tarefa.id}"
     }
+
+@router.get("/tarefas/{tarefa_id}")
+def obter_status_tarefa(
+    tarefa_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Consultar o status e o resultado de uma tarefa em segundo plano"""
+    tarefa = obter_tarefa(tarefa_id)
+    if tarefa is None or (tarefa.user_id != current_user.id and not current_user.is_admin()):
+        raise HTTPException(status_code=404, detail="Tarefa não encontrada")
+    return tarefa.dict()
@@ -1,20 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List
 from database import get_db
 from models import User
-from schemas import UserResponse, UserUpdate, UserRoleUpdate, UserStatusUpdate, UserPasswordUpdate
+from schemas import UserResponse, UserUpdate, UserRoleUpdate, UserStatusUpdate, UserPasswordUpdate, FotoUploadDireto
 from auth import get_current_active_user, require_admin
-from config import ROLES, UPLOAD_DIR, MAX_FILE_SIZE, ALLOWED_EXTENSIONS
-import os
-import aiofiles
-from pathlib import Path
+from config import ROLES, MAX_FILE_SIZE
+from armazenamento import UploadDiretoIndisponivel, armazenamento
+from imagens import (
+    ArquivoMuitoGrande, chave_upload_direto, confirmar_upload_direto, gravar_foto_perfil, liberar_foto,
+    miniaturas_da_foto,
+)
 
 router = APIRouter(prefix="/users", tags=["users"])
 
-# Criar diretório de uploads se não existir
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
 @router.get("/", response_model=List[UserResponse])
 def get_all_users(
     current_user: User = Depends(require_admin),
@@ -112,14 +112,8 @@ def update_user_status(
     db.refresh(user)
     return user
 
-@router.post("/{user_id}/profile-picture")
-async def upload_profile_picture(
-    user_id: int,
-    file: UploadFile = File(...),
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
-):
-    """Upload de foto de perfil"""
+def _usuario_da_foto(db: Session, user_id: int, current_user: User) -> User:
+    """Usuário cuja foto será alterada, conferindo a permissão"""
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
@@ -127,32 +121,98 @@ async def upload_profile_picture(
     # Usuários só podem alterar sua própria foto, exceto admins
     if not current_user.is_admin() and current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Sem permissão para alterar esta foto")
-    
-    # Verificar tamanho do arquivo
-    if file.size > MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail="Arquivo muito grande")
-    
-    # Verificar extensão
-    file_extension = Path(file.filename).suffix.lower()
-    if file_extension not in ALLOWED_EXTENSIONS:
-        raise HTTPException(status_code=400, detail="Tipo de arquivo não permitido")
-    
-    # Gerar nome único para o arquivo
-    import uuid
-    file_id = str(uuid.uuid4())
-    filename = f"{file_id}{file_extension}"
-    file_path = os.path.join(UPLOAD_DIR, filename)
-    
-    # Salvar arquivo
-    async with aiofiles.open(file_path, 'wb') as f:
-        content = await file.read()
-        await f.write(content)
-    
-    # Atualizar banco de dados
+    return user
+
+def _trocar_foto(db: Session, user: User, filename: str) -> dict:
+    """Grava a nova foto no usuário e remove a anterior, se ninguém mais a usa"""
+    foto_anterior = user.profile_picture
     user.profile_picture = filename
-    db.commit()
-    
-    return {"message": "Foto de perfil atualizada com sucesso", "filename": filename}
+    try:
+        db.commit()
+    except Exception:
+        db.rollback()
+        liberar_foto(db, filename)
+        raise
+    # Com a referência já gravada, a foto não é mais removida; se uma remoção concorrente
+    # (fora da carência de imagens.liberar_foto) a apagou antes do commit, desfaz a troca
+    if not armazenamento.existe(filename):
+        user.profile_picture = foto_anterior
+        db.commit()
+        raise HTTPException(status_code=409, detail="A foto foi removida durante o envio; envie novamente")
+    if foto_anterior != filename:
+        liberar_foto(db, foto_anterior)
+    
+    return {
+        "message": "Foto de perfil atualizada com sucesso",
+        "filename": filename,
+        "miniaturas": miniaturas_da_foto(filename),
+    }
+
+# O corpo é lido pela própria rota (imagens.salvar_upload_limitado), com o limite de
+# tamanho aplicado durante a leitura; o esquema abaixo só documenta o campo no OpenAPI
+_CORPO_FOTO = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object", "required": ["file"],
+            "properties": {"file": {"type": "string", "format": "binary"}},
+        }}},
+    }
+}
+
+@router.post("/{user_id}/profile-picture", openapi_extra=_CORPO_FOTO)
+async def upload_profile_picture(
+    user_id: int,
+    request: Request,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Upload de foto de perfil (multipart, campo "file")"""
+    # Só a leitura do corpo é aguardada no event loop; banco e armazenamento vão ao threadpool
+    user = await run_in_threadpool(_usuario_da_foto, db, user_id, current_user)
+    
+    try:
+        filename = await gravar_foto_perfil(request)
+    except ArquivoMuitoGrande as erro:
+        raise HTTPException(status_code=413, detail=str(erro))
+    except ValueError as erro:
+        raise HTTPException(status_code=400, detail=str(erro))
+    
+    return await run_in_threadpool(_trocar_foto, db, user, filename)
+
+@router.post("/{user_id}/profile-picture/upload-url")
+def criar_upload_direto(
+    user_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """URL pré-assinada para enviar a foto direto ao armazenamento (ARMAZENAMENTO=s3).
+    Depois do envio, confirme com POST /users/{id}/profile-picture/confirmar."""
+    _usuario_da_foto(db, user_id, current_user)
+    chave = chave_upload_direto(user_id)
+    try:
+        assinatura = armazenamento.url_upload_direto(chave, MAX_FILE_SIZE)
+    except UploadDiretoIndisponivel as erro:
+        raise HTTPException(status_code=501, detail=str(erro))
+    return {"chave": chave, **assinatura}
+
+@router.post("/{user_id}/profile-picture/confirmar")
+async def confirmar_foto_upload_direto(
+    user_id: int,
+    dados: FotoUploadDireto,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Processa a foto enviada direto ao armazenamento e a define como foto de perfil"""
+    user = await run_in_threadpool(_usuario_da_foto, db, user_id, current_user)
+    try:
+        filename = await confirmar_upload_direto(dados.chave, user_id)
+    except ArquivoMuitoGrande as erro:
+        raise HTTPException(status_code=413, detail=str(erro))
+    except ValueError as erro:
+        raise HTTPException(status_code=400, detail=str(erro))
+    
+    return await run_in_threadpool(_trocar_foto, db, user, filename)
 
 @router.delete("/{user_id}/profile-picture")
 def delete_profile_picture(
@@ -161,23 +221,13 @@ def delete_profile_picture(
     db: Session = Depends(get_db)
 ):
     """Remove foto de perfil"""
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="Usuário não encontrado")
-    
-    # Usuários só podem alterar sua própria foto, exceto admins
-    if not current_user.is_admin() and current_user.id != user_id:
-        raise HTTPException(status_code=403, detail="Sem permissão para alterar esta foto")
-    
-    # Remover arquivo se existir
-    if user.profile_picture:
-        file_path = os.path.join(UPLOAD_DIR, user.profile_picture)
-        if os.path.exists(file_path):
-            os.remove(file_path)
+    user = _usuario_da_foto(db, user_id, current_user)
     
-    # Atualizar banco de dados
+    # Atualizar banco de dados e remover a foto, se ninguém mais a usa
+    foto_anterior = user.profile_picture
     user.profile_picture = None
     db.commit()
+    liberar_foto(db, foto_anterior)
     
     return {"message": "Foto de perfil removida com sucesso"}
 
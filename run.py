@@ -1,13 +1,146 @@
 #!/usr/bin/env python3
 """
 Script de inicialização do ERP Pessoal
+
+Modos:
+    dev       um processo com --reload (padrão, SERVIDOR_MODO=dev)
+    producao  SERVIDOR_WORKERS workers, com uvicorn --workers ou gunicorn com
+              workers do uvicorn (SERVIDOR=gunicorn, requer pip install gunicorn);
+              mais de um worker requer CACHE_BACKEND=redis
+
+Em todos os modos o banco é preparado (bootstrap.py) uma única vez, no processo
+principal, antes de iniciar os workers: eles só importam a aplicação, sem criar
+tabelas nem o admin, e não disputam o arquivo do SQLite na inicialização.
+
+Uso:
+    python run.py
+    CACHE_BACKEND=redis python run.py --producao --workers 4
+    python run.py --producao --servidor gunicorn --loop uvloop --http httptools
 """
-import uvicorn
+import argparse
+import importlib.util
 import os
 import sys
+import uvicorn
+from config import (
+    SERVIDOR_MODO, SERVIDOR_HOST, SERVIDOR_PORTA, SERVIDOR, SERVIDOR_WORKERS, SERVIDOR_LOOP, SERVIDOR_HTTP,
+    SERVIDOR_TIMEOUT_ENCERRAMENTO, SERVIDOR_PRELOAD, CACHE_BACKEND,
+)
+
+try:
+    from uvicorn.workers import UvicornWorker
+
+    class WorkerERP(UvicornWorker):
+        """Worker do uvicorn para o gunicorn, com o loop e o http escolhidos em run.py"""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.config.loop = os.environ.get("SERVIDOR_LOOP", "auto")
+            self.config.http = os.environ.get("SERVIDOR_HTTP", "auto")
+except ImportError:  # gunicorn não instalado: só uvicorn --workers
+    WorkerERP = None
+
+LOOPS = {"auto": None, "uvloop": "uvloop", "asyncio": None}
+HTTPS = {"auto": None, "httptools": "httptools", "h11": "h11"}
+
+
+def argumentos(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    modo = parser.add_mutually_exclusive_group()
+    modo.add_argument("--producao", dest="modo", action="store_const", const="producao", help="Vários workers, sem reload")
+    modo.add_argument("--dev", dest="modo", action="store_const", const="dev", help="Um processo com reload")
+    parser.add_argument("--servidor", choices=["uvicorn", "gunicorn"], default=SERVIDOR)
+    parser.add_argument("--workers", type=int, default=SERVIDOR_WORKERS)
+    parser.add_argument("--loop", choices=list(LOOPS), default=SERVIDOR_LOOP)
+    parser.add_argument("--http", choices=list(HTTPS), default=SERVIDOR_HTTP)
+    parser.add_argument("--host", default=SERVIDOR_HOST)
+    parser.add_argument("--porta", type=int, default=SERVIDOR_PORTA)
+    parser.add_argument("--timeout-encerramento", type=int, default=SERVIDOR_TIMEOUT_ENCERRAMENTO,
+                        help="Segundos para concluir as requisições em andamento ao encerrar")
+    parser.add_argument("--sem-preload", dest="preload", action="store_false", default=SERVIDOR_PRELOAD,
+                        help="gunicorn: cada worker importa a aplicação")
+    args = parser.parse_args(argv)
+    args.modo = args.modo or SERVIDOR_MODO
+    if args.modo not in ("dev", "producao"):
+        parser.error(f"SERVIDOR_MODO='{args.modo}' inválido; use dev ou producao")
+    if args.workers < 1:
+        parser.error("--workers deve ser pelo menos 1")
+    if args.modo == "producao" and args.workers > 1 and CACHE_BACKEND != "redis":
+        # Cache de respostas e do usuário, status das tarefas e marcas de escrita da
+        # réplica ficam na memória de cada worker: sem Redis, divergem entre eles
+        parser.error(f"--workers {args.workers} requer CACHE_BACKEND=redis (atual: {CACHE_BACKEND}); use --workers 1")
+    for escolha, opcoes in ((args.loop, LOOPS), (args.http, HTTPS)):
+        modulo = opcoes[escolha]
+        if modulo and importlib.util.find_spec(modulo) is None:
+            parser.error(f"'{escolha}' requer o pacote '{modulo}' (pip install {modulo})")
+    return args
+
+
+def opcoes_uvicorn(args) -> dict:
+    """Argumentos de uvicorn.run para o modo escolhido"""
+    opcoes = {"host": args.host, "port": args.porta, "loop": args.loop, "http": args.http, "log_level": "info"}
+    if args.modo == "dev":
+        return {**opcoes, "reload": True}
+    # SIGTERM/SIGINT: para de aceitar conexões e espera as requisições em andamento
+    return {**opcoes, "workers": args.workers, "timeout_graceful_shutdown": args.timeout_encerramento}
+
+
+def post_fork(server, worker):
+    """Hook do gunicorn: o worker não reutiliza as conexões abertas pelo processo mestre"""
+    from database import descartar_conexoes_herdadas
+
+    descartar_conexoes_herdadas()
+
+
+def opcoes_gunicorn(args) -> dict:
+    """Configuração do gunicorn com workers do uvicorn (WorkerERP)"""
+    if WorkerERP is None:
+        raise RuntimeError("SERVIDOR=gunicorn requer o pacote 'gunicorn' (pip install gunicorn)")
+    # O worker é carregado pelo nome e lê o loop e o http do ambiente herdado do mestre
+    os.environ.update(SERVIDOR_LOOP=args.loop, SERVIDOR_HTTP=args.http)
+    return {
+        "bind": f"{args.host}:{args.porta}",
+        "workers": args.workers,
+        "worker_class": "run.WorkerERP",
+        "preload_app": args.preload,
+        "graceful_timeout": args.timeout_encerramento,
+        "post_fork": post_fork,
+        "accesslog": "-",
+        "loglevel": "info",
+    }
+
+
+def carregar_aplicacao():
+    """Importa a aplicação com todos os routers (no mestre, com preload, antes do fork)"""
+    import main
+
+    main.incluir_routers_pendentes()
+    return main.app
+
+
+def rodar_gunicorn(args):
+    opcoes = opcoes_gunicorn(args)
+    from gunicorn.app.base import BaseApplication
+
+    class AplicacaoGunicorn(BaseApplication):
+        def __init__(self, opcoes):
+            self.opcoes = opcoes
+            super().__init__()
+
+        def load_config(self):
+            for chave, valor in self.opcoes.items():
+                self.cfg.set(chave, valor)
+
+        def load(self):
+            return carregar_aplicacao()
+
+    AplicacaoGunicorn(opcoes).run()
+
 
 def main():
     """Inicializa o servidor do ERP"""
+    args = argumentos()
+    endereco = f"http://{'localhost' if args.host == '0.0.0.0' else args.host}:{args.porta}"
     print("🚀 Iniciando ERP Pessoal...")
     print("📋 Funcionalidades disponíveis:")
     print("   ✅ Autenticação JWT")
@@ -16,24 +149,31 @@ def main():
     print("   ✅ Painel administrativo")
     print("   ✅ Interface web responsiva")
     print()
-    print("🌐 Servidor será iniciado em: http://localhost:8000")
-    print("📚 Documentação da API: http://localhost:8000/docs")
+    print(f"🌐 Servidor será iniciado em: {endereco}")
+    print(f"📚 Documentação da API: {endereco}/docs")
     print("👤 Usuário admin padrão: admin@erp.com / admin123")
+    if args.modo == "producao":
+        print(f"⚙️  Produção: {args.servidor} com {args.workers} workers (loop {args.loop}, http {args.http})")
     print()
-    
+
     # Criar diretórios necessários
     os.makedirs("uploads", exist_ok=True)
     os.makedirs("static", exist_ok=True)
-    
+
+    # Preparar o banco uma vez, antes do servidor (os workers e os restarts do
+    # --reload só importam a aplicação); as conexões usadas aqui não vão para os workers
+    from bootstrap import preparar
+    from database import engine, engine_leitura
+    preparar()
+    engine.dispose()
+    engine_leitura.dispose()
+
     # Iniciar servidor
     try:
-        uvicorn.run(
-            "main:app",
-            host="0.0.0.0",
-            port=8000,
-            reload=True,
-            log_level="info"
-        )
+        if args.modo == "producao" and args.servidor == "gunicorn":
+            rodar_gunicorn(args)
+        else:
+            uvicorn.run("main:app", **opcoes_uvicorn(args))
     except KeyboardInterrupt:
         print("\n👋 Servidor encerrado pelo usuário")
     except Exception as e:
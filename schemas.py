@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime, date
 from models import CategoriaConta, StatusConta, TipoInvestimento, StatusMeta
 
@@ -40,6 +40,7 @@ class UserResponse(UserBase):
     role: str
     is_active: bool
     profile_picture: Optional[str] = None
+    profile_picture_miniaturas: Optional[Dict[str, str]] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
     
@@ -55,6 +56,9 @@ class UserStatusUpdate(BaseModel):
 class UserPasswordUpdate(BaseModel):
     password: str
 
+class FotoUploadDireto(BaseModel):
+    chave: str
+
 # Schemas para Contas a Pagar
 class ContaPagarBase(BaseModel):
     descricao: str
@@ -140,6 +144,23 @@ class ContaReceberResponse(ContaReceberBase):
     class Config:
         from_attributes = True
 
+# Schemas para operações em lote (contas a pagar/receber)
+class ResultadoItemLote(BaseModel):
+    indice: int  # posição do item na requisição
+    sucesso: bool
+    id: Optional[int] = None
+    erro: Optional[str] = None
+
+class LoteResponse(BaseModel):
+    processados: int
+    sucesso: int
+    falhas: int
+    resultados: List[ResultadoItemLote]
+
+class BaixaLoteRequest(BaseModel):
+    ids: List[int]
+    data: Optional[date] = None  # data do pagamento/recebimento; padrão: hoje
+
 # Schemas para Metas Financeiras
 class MetaFinanceiraBase(BaseModel):
     titulo: str
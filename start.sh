@@ -28,8 +28,8 @@ fi
 # Criar diretórios necessários
 mkdir -p uploads static
 
-# Iniciar servidor
+# Iniciar servidor (um worker; vários com CACHE_BACKEND=redis e SERVIDOR_WORKERS; ver env.example)
 echo "🌐 Iniciando servidor em http://localhost:8000"
 echo "👤 Usuário admin: admin@erp.com / admin123"
 echo
-python3 run.py
+python3 run.py --producao
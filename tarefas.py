@@ -0,0 +1,161 @@
+"""
+Tarefas em segundo plano com status consultável.
+
+Uma tarefa é uma função executada no pool de threads próprio das tarefas
+(TAREFAS_WORKERS), com uma sessão de banco própria. O endpoint que a agenda
+responde 202 com o id; o status (pendente, executando, concluida, erro), o
+resultado e os tempos ficam disponíveis por TAREFAS_RETENCAO segundos.
+
+Agendar uma tarefa com a mesma chave de outra ainda pendente ou em execução
+devolve a existente em vez de executá-la de novo.
+
+O status é guardado no backend do cache (cache.py): com CACHE_BACKEND=redis ele é
+visível a todos os workers; em memória, só ao processo que executa a tarefa.
+"""
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from datetime import date, datetime
+from typing import Callable, List, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from config import TAREFAS_WORKERS, TAREFAS_RETENCAO, CACHE_MAX_ITENS
+from database import SessionLocal
+from models import User, MetaMensal
+from cache import cache, BackendDesativado, BackendMemoria, marcar_usuario_alterado
+from resumos import insert_ignorando, reconstruir_resumos
+
+PENDENTE = "pendente"
+EXECUTANDO = "executando"
+CONCLUIDA = "concluida"
+ERRO = "erro"
+
+logger = logging.getLogger(__name__)
+
+_pool_tarefas = ThreadPoolExecutor(max_workers=TAREFAS_WORKERS, thread_name_prefix="tarefas")
+_lock = threading.Lock()
+# Sem cache configurado, o status fica em memória mesmo assim
+_backend = BackendMemoria(CACHE_MAX_ITENS) if isinstance(cache.backend, BackendDesativado) else cache.backend
+
+
+@dataclass
+class Tarefa:
+    id: str
+    tipo: str
+    user_id: int  # quem agendou
+    chave: str
+    status: str = PENDENTE
+    criada_em: Optional[datetime] = None
+    iniciada_em: Optional[datetime] = None
+    concluida_em: Optional[datetime] = None
+    resultado: Optional[dict] = None
+    erro: Optional[str] = None
+
+    def dict(self) -> dict:
+        dados = asdict(self)
+        dados["duracao_segundos"] = (
+            round((self.concluida_em - self.iniciada_em).total_seconds(), 3)
+            if self.iniciada_em and self.concluida_em else None
+        )
+        return dados
+
+
+def _salvar(tarefa: Tarefa):
+    _backend.gravar(f"tarefa:{tarefa.id}", tarefa, TAREFAS_RETENCAO)
+
+
+def obter_tarefa(tarefa_id: str) -> Optional[Tarefa]:
+    tarefa = _backend.obter(f"tarefa:{tarefa_id}")
+    return tarefa if isinstance(tarefa, Tarefa) else None
+
+
+def agendar(tipo: str, user_id: int, chave: str, funcao: Callable[..., dict], *args) -> Tarefa:
+    """Agenda funcao(db, *args) no pool de tarefas, ou devolve a tarefa ativa com a mesma chave"""
+    with _lock:
+        tarefa_id = _backend.obter(f"tarefa-chave:{chave}")
+        existente = obter_tarefa(tarefa_id) if isinstance(tarefa_id, str) else None
+        if existente is not None and existente.status in (PENDENTE, EXECUTANDO):
+            return existente
+
+        tarefa = Tarefa(id=uuid.uuid4().hex, tipo=tipo, user_id=user_id, chave=chave, criada_em=datetime.now())
+        _salvar(tarefa)
+        _backend.gravar(f"tarefa-chave:{chave}", tarefa.id, TAREFAS_RETENCAO)
+
+    _pool_tarefas.submit(_executar, tarefa, funcao, args)
+    return tarefa
+
+
+def _executar(tarefa: Tarefa, funcao: Callable[..., dict], args: tuple):
+    tarefa.status = EXECUTANDO
+    tarefa.iniciada_em = datetime.now()
+    _salvar(tarefa)
+
+    db = SessionLocal()
+    try:
+        tarefa.resultado = funcao(db, *args)
+        tarefa.status = CONCLUIDA
+    except Exception as erro:
+        db.rollback()
+        logger.exception("Tarefa %s (%s) falhou", tarefa.id, tarefa.tipo)
+        tarefa.status = ERRO
+        tarefa.erro = str(erro)
+    finally:
+        db.close()
+        tarefa.concluida_em = datetime.now()
+        _salvar(tarefa)
+
+
+# ==================== TAREFAS ====================
+
+def _criar_metas_mensais_padrao(db: Session, user_ids: List[int], ano_inicial: int, ano_final: int) -> int:
+    """Cria com um único INSERT as metas mensais zeradas que ainda não existem no período.
+    Metas criadas ao mesmo tempo por outra tarefa ou pela API são ignoradas, não falham."""
+    existentes = set()
+    for inicio in range(0, len(user_ids), 500):
+        existentes.update(db.execute(select(MetaMensal.user_id, MetaMensal.ano, MetaMensal.mes).where(
+            MetaMensal.user_id.in_(user_ids[inicio:inicio + 500]), MetaMensal.ano.between(ano_inicial, ano_final)
+        )).all())
+
+    novas = [
+        {
+            "user_id": user_id, "mes": mes, "ano": ano,
+            "meta_receita": 0.0, "meta_despesa": 0.0, "meta_investimento": 0.0, "meta_poupanca": 0.0,
+            "observacoes": f"Meta mensal gerada automaticamente para {mes}/{ano}",
+        }
+        for user_id in user_ids
+        for ano in range(ano_inicial, ano_final + 1)
+        for mes in range(1, 13)
+        if (user_id, ano, mes) not in existentes
+    ]
+    if not novas:
+        return 0
+    conexao = db.connection()
+    stmt = insert_ignorando(conexao, MetaMensal.__table__, ["user_id", "ano", "mes"])
+    if stmt is None:
+        conexao.execute(MetaMensal.__table__.insert(), novas)
+        return len(novas)
+    # Conta só as linhas de fato inseridas (RETURNING omite as ignoradas)
+    return len(conexao.execute(stmt.returning(MetaMensal.id), novas).all())
+
+
+def gerar_meses(db: Session, user_ids: Optional[List[int]], ano_inicial: int, ano_final: int) -> dict:
+    """Recalcula os resumos de todos os meses dos anos e cria as metas mensais que faltam.
+    Sem user_ids, processa todos os usuários ativos."""
+    todos = user_ids is None
+    if todos:
+        user_ids = list(db.scalars(select(User.id).where(User.is_active.is_(True))))
+
+    meses = reconstruir_resumos(db, None if todos else user_ids, date(ano_inicial, 1, 1), date(ano_final + 1, 1, 1))
+    metas = _criar_metas_mensais_padrao(db, user_ids, ano_inicial, ano_final)
+    for user_id in user_ids:
+        marcar_usuario_alterado(db, user_id)
+    db.commit()
+
+    return {
+        "usuarios": len(user_ids),
+        "anos": list(range(ano_inicial, ano_final + 1)),
+        "meses_com_movimento": meses,
+        "metas_criadas": metas,
+    }
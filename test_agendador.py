@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Script para testar a varredura de contas vencidas
+"""
+import asyncio
+import os
+import tempfile
+from datetime import date
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from database import Base
+from models import User, ContaPagar, ContaReceber, CategoriaConta, StatusConta
+from agendador import Agendador, marcar_contas_vencidas
+from routers.financeiro import obter_dashboard, obter_alertas_mensais
+
+
+def criar_sessao():
+    """Cria um banco SQLite em memória com contas antes, no dia e depois do vencimento"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    user = User(email="teste@erp.com", username="teste", hashed_password="x", full_name="Teste")
+    db.add(user)
+    db.commit()
+
+    db.add_all([
+        ContaPagar(user_id=user.id, descricao="Luz", valor=200, data_vencimento=date(2024, 3, 9),
+                   categoria=CategoriaConta.MORADIA, status=StatusConta.PENDENTE),
+        ContaPagar(user_id=user.id, descricao="Água", valor=80, data_vencimento=date(2024, 3, 10),
+                   categoria=CategoriaConta.MORADIA, status=StatusConta.PENDENTE),
+        ContaPagar(user_id=user.id, descricao="Aluguel", valor=1500, data_vencimento=date(2024, 3, 1),
+                   data_pagamento=date(2024, 3, 1), categoria=CategoriaConta.MORADIA, status=StatusConta.PAGO),
+        ContaReceber(user_id=user.id, descricao="Freela", valor=900, data_vencimento=date(2024, 3, 5),
+                     categoria=CategoriaConta.OUTROS, status=StatusConta.PENDENTE),
+    ])
+    db.commit()
+    return db, user
+
+
+def test_marcar_contas_vencidas():
+    """Testa que só as pendentes com vencimento passado viram VENCIDO e que repetir não muda nada"""
+    print("🔄 Testando varredura de contas vencidas...")
+    db, user = criar_sessao()
+
+    resultado = marcar_contas_vencidas(db, date(2024, 3, 10))
+    assert resultado == {
+        "contas_pagar_vencidas": 1, "contas_pagar_reabertas": 0,
+        "contas_receber_vencidas": 1, "contas_receber_reabertas": 0,
+    }
+    db.expire_all()
+    status = {conta.descricao: conta.status for conta in db.query(ContaPagar)}
+    assert status == {"Luz": StatusConta.VENCIDO, "Água": StatusConta.PENDENTE, "Aluguel": StatusConta.PAGO}
+    assert db.query(ContaReceber).one().status == StatusConta.VENCIDO
+
+    assert set(marcar_contas_vencidas(db, date(2024, 3, 10)).values()) == {0}
+    print("✅ Varredura correta!")
+
+
+def test_reabrir_vencimento_adiado():
+    """Testa que uma conta vencida com vencimento adiado volta a PENDENTE"""
+    print("🔄 Testando vencimento adiado...")
+    db, user = criar_sessao()
+    marcar_contas_vencidas(db, date(2024, 3, 10))
+
+    luz = db.query(ContaPagar).filter_by(descricao="Luz").one()
+    luz.data_vencimento = date(2024, 3, 20)
+    db.commit()
+
+    assert marcar_contas_vencidas(db, date(2024, 3, 10))["contas_pagar_reabertas"] == 1
+    db.expire_all()
+    assert db.query(ContaPagar).filter_by(descricao="Luz").one().status == StatusConta.PENDENTE
+    print("✅ Vencimento adiado reabre a conta!")
+
+
+class SessaoAsync:
+    """Sessão assíncrona mínima para os endpoints que usam db.run_sync"""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def run_sync(self, funcao, *args):
+        return funcao(self.db, *args)
+
+
+def test_vencidas_continuam_em_aberto():
+    """Testa que as contas marcadas como VENCIDO seguem no dashboard e nos alertas"""
+    print("🔄 Testando contas vencidas no dashboard...")
+    db, user = criar_sessao()
+    marcar_contas_vencidas(db, date.today())
+
+    dashboard = asyncio.run(obter_dashboard(tipo="mensal", current_user=user, db=SessaoAsync(db)))
+    assert [conta.descricao for conta in dashboard.proximas_contas] == ["Luz", "Água"]
+    assert {conta.status for conta in dashboard.proximas_contas} == {StatusConta.VENCIDO}
+
+    alertas = obter_alertas_mensais(current_user=user, db=db)
+    assert [conta.descricao for conta in alertas.contas_vencidas] == ["Luz", "Água"]
+    print("✅ Contas vencidas seguem em aberto!")
+
+
+def test_estatisticas_rotina():
+    """Testa que execuções, falhas e tempos são registrados"""
+    print("🔄 Testando estatísticas do agendador...")
+    agendador = Agendador()
+    agendador.registrar("ok", 60, lambda db: {"ok": True})
+    agendador.registrar("falha", 60, lambda db: 1 / 0)
+
+    agendador.executar(agendador.rotinas["ok"])
+    agendador.executar(agendador.rotinas["falha"])
+
+    estatisticas = agendador.estatisticas()["rotinas"]
+    assert estatisticas["ok"]["execucoes"] == 1 and estatisticas["ok"]["ultimo_resultado"] == {"ok": True}
+    assert estatisticas["ok"]["ultima_duracao_ms"] is not None
+    assert estatisticas["falha"]["falhas"] == 1 and "division" in estatisticas["falha"]["ultimo_erro"]
+    print("✅ Estatísticas registradas!")
+
+
+def test_trava_um_processo():
+    """Testa que só o dono da trava executa as rotinas e que outro assume quando ele para"""
+    print("🔄 Testando trava do agendador entre processos...")
+    execucoes = {"a": 0, "b": 0}
+
+    def criar(nome, trava):
+        agendador = Agendador(trava=trava, intervalo_trava=0.05)
+        agendador.registrar("rotina", 3600, lambda db: execucoes.__setitem__(nome, execucoes[nome] + 1))
+        return agendador
+
+    async def cenario(trava):
+        a, b = criar("a", trava), criar("b", trava)
+        a.iniciar()
+        b.iniciar()
+        await asyncio.sleep(0.2)
+        assert execucoes == {"a": 1, "b": 0}
+        assert a.estatisticas()["ativo"] and not b.estatisticas()["ativo"]
+
+        await a.parar()
+        await asyncio.sleep(0.2)
+        assert execucoes == {"a": 1, "b": 1} and b.estatisticas()["ativo"]
+        await b.parar()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        asyncio.run(cenario(os.path.join(pasta, "agendador.lock")))
+    print("✅ Rotinas executadas por um único processo!")
+
+
+def main():
+    """Executa todos os testes"""
+    print("🧪 Testando agendador...")
+    print("=" * 50)
+    test_marcar_contas_vencidas()
+    test_reabrir_vencimento_adiado()
+    test_vencidas_continuam_em_aberto()
+    test_estatisticas_rotina()
+    test_trava_um_processo()
+    print("=" * 50)
+    print("🎉 Todos os testes passaram!")
+
+
+if __name__ == "__main__":
+    main()
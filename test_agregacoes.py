@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Script para testar o motor de agregação mensal
+"""
+from datetime import date
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from database import Base
+from models import (
+    User, ContaPagar, ContaReceber, Investimento, MetaFinanceira, TransacaoMeta,
+    CategoriaConta, StatusConta, TipoInvestimento
+)
+from agregacoes import agregar_totais_mensais
+from periodos import primeiro_dia, primeiro_dia_proximo_mes
+
+
+def criar_sessao():
+    """Cria um banco SQLite em memória com dados de exemplo"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    user = User(email="teste@erp.com", username="teste", hashed_password="x", full_name="Teste")
+    db.add(user)
+    db.commit()
+
+    db.add_all([
+        ContaReceber(user_id=user.id, descricao="Salário", valor=5000, data_vencimento=date(2024, 3, 5),
+                     data_recebimento=date(2024, 3, 5), categoria=CategoriaConta.OUTROS, status=StatusConta.PAGO),
+        ContaReceber(user_id=user.id, descricao="Freela", valor=800, data_vencimento=date(2024, 2, 20),
+                     data_recebimento=date(2024, 2, 28), categoria=CategoriaConta.OUTROS, status=StatusConta.PAGO),
+        ContaReceber(user_id=user.id, descricao="Pendente", valor=999, data_vencimento=date(2024, 3, 10),
+                     categoria=CategoriaConta.OUTROS, status=StatusConta.PENDENTE),
+        ContaPagar(user_id=user.id, descricao="Aluguel", valor=1500, data_vencimento=date(2024, 3, 10),
+                   data_pagamento=date(2024, 3, 9), categoria=CategoriaConta.MORADIA, status=StatusConta.PAGO),
+        ContaPagar(user_id=user.id, descricao="Mercado", valor=500, data_vencimento=date(2024, 3, 15),
+                   data_pagamento=date(2024, 3, 15), categoria=CategoriaConta.ALIMENTACAO, status=StatusConta.PAGO),
+        ContaPagar(user_id=user.id, descricao="Luz", valor=200, data_vencimento=date(2024, 3, 20),
+                   categoria=CategoriaConta.MORADIA, status=StatusConta.VENCIDO),
+        Investimento(user_id=user.id, nome="CDB", tipo=TipoInvestimento.CDB, valor_investido=1000,
+                     valor_atual=1010, data_investimento=date(2024, 3, 1)),
+    ])
+    meta = MetaFinanceira(user_id=user.id, titulo="Viagem", valor_meta=3000,
+                          data_inicio=date(2024, 1, 1), data_meta=date(2024, 12, 31))
+    db.add(meta)
+    db.flush()
+    db.add(TransacaoMeta(user_id=user.id, meta_id=meta.id, valor=300, data_transacao=date(2024, 3, 12)))
+    db.commit()
+    return db, user
+
+
+def test_totais_do_mes():
+    """Testa os totais de um mês agregados em uma única passada"""
+    print("🔄 Testando totais mensais...")
+    db, user = criar_sessao()
+
+    agregado = agregar_totais_mensais(db, user.id, primeiro_dia(3, 2024), primeiro_dia_proximo_mes(3, 2024))
+    totais = agregado.mes(3, 2024)
+
+    assert totais.total_receitas == 5000
+    assert totais.total_despesas == 2000
+    assert totais.saldo_mensal == 3000
+    assert totais.total_investido == 1000
+    assert totais.total_metas == 300
+    assert totais.contas_pagas == 2
+    assert totais.contas_vencidas == 1
+    assert totais.despesas_por_categoria[CategoriaConta.MORADIA] == (1500, 1)
+    assert agregado.metas_ativas == 1
+    print("✅ Totais mensais corretos!")
+
+
+def test_intervalo_de_meses():
+    """Testa a agregação de vários meses e o saldo acumulado"""
+    print("🔄 Testando intervalo de meses...")
+    db, user = criar_sessao()
+
+    agregado = agregar_totais_mensais(db, user.id, primeiro_dia(1, 2024), primeiro_dia_proximo_mes(3, 2024))
+
+    assert agregado.mes(1, 2024).total_receitas == 0
+    assert agregado.mes(2, 2024).total_receitas == 800
+    assert agregado.saldo_entre(primeiro_dia(1, 2024), primeiro_dia(3, 2024)) == 800
+    print("✅ Intervalo de meses correto!")
+
+
+def main():
+    """Executa todos os testes"""
+    print("🧪 Testando motor de agregação...")
+    print("=" * 50)
+    test_totais_do_mes()
+    test_intervalo_de_meses()
+    print("=" * 50)
+    print("🎉 Todos os testes passaram!")
+
+
+if __name__ == "__main__":
+    main()
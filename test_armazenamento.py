@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Script para testar os backends de armazenamento dos uploads
+
+O backend S3 é testado contra um S3 local (moto_server, no lugar de um MinIO);
+sem os pacotes boto3 e moto[server], esse teste é pulado.
+"""
+import asyncio
+import io
+import logging
+import os
+import tempfile
+from PIL import Image
+from armazenamento import ArmazenamentoLocal, UploadDiretoIndisponivel
+from imagens import app_uploads, chave_upload_direto, confirmar_upload_direto, miniaturas_da_foto
+
+
+def png(largura=300, altura=200) -> bytes:
+    saida = io.BytesIO()
+    Image.new("RGB", (largura, altura), (10, 120, 200)).save(saida, "PNG")
+    return saida.getvalue()
+
+
+def test_armazenamento_local():
+    """Testa gravação, listagem e remoção (com as subpastas vazias) no disco"""
+    print("🔄 Testando armazenamento local...")
+    with tempfile.TemporaryDirectory() as pasta:
+        armazenamento = ArmazenamentoLocal(pasta)
+        armazenamento.gravar("ab/cd/foto.webp", b"conteudo")
+        assert armazenamento.existe("ab/cd/foto.webp") and armazenamento.tamanho("ab/cd/foto.webp") == 8
+        assert [nome for nome, _ in armazenamento.listar()] == ["ab/cd/foto.webp"]
+        assert armazenamento.tocar("ab/cd/foto.webp") and not armazenamento.tocar("ab/cd/outra.webp")
+        assert armazenamento.modificado_em("ab/cd/outra.webp") is None
+
+        armazenamento.remover("ab/cd/foto.webp")
+        assert os.listdir(pasta) == []
+
+        for nome in ("../fora.webp", "/etc/passwd", "ab//foto.webp"):
+            try:
+                armazenamento.existe(nome)
+                assert False, f"deveria recusar {nome}"
+            except ValueError:
+                pass
+        try:
+            armazenamento.url_upload_direto("entrada/1/x", 1024)
+            assert False, "local não tem upload direto"
+        except UploadDiretoIndisponivel:
+            pass
+    print("✅ Armazenamento local funciona!")
+
+
+def servidor_s3():
+    """S3 local (moto_server) com um bucket vazio; None sem boto3/moto"""
+    try:
+        import boto3  # noqa: F401
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        return None, None
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    servidor = ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    servidor.start()
+    host, porta = servidor.get_host_and_port()
+    return servidor, f"http://{host}:{porta}"
+
+
+def test_armazenamento_s3():
+    """Testa o backend S3 e o upload direto por POST pré-assinado"""
+    print("🔄 Testando armazenamento S3 (moto_server)...")
+    servidor, endpoint = servidor_s3()
+    if servidor is None:
+        print("⚠️  boto3/moto não instalados, teste pulado")
+        return
+
+    import requests
+    from armazenamento import ArmazenamentoS3
+
+    try:
+        armazenamento = ArmazenamentoS3(
+            bucket="erp-teste", endpoint=endpoint, access_key="teste", secret_key="teste", url_publica=None,
+        )
+        armazenamento.cliente.create_bucket(Bucket="erp-teste")
+
+        armazenamento.gravar("ab/cd/foto.webp", b"conteudo", "image/webp", "public, max-age=60")
+        assert armazenamento.existe("ab/cd/foto.webp") and not armazenamento.existe("ab/cd/outra.webp")
+        assert armazenamento.tocar("ab/cd/foto.webp", "image/webp", "public, max-age=60")
+        assert not armazenamento.tocar("ab/cd/outra.webp") and armazenamento.modificado_em("ab/cd/outra.webp") is None
+        resposta = requests.get(armazenamento.url("ab/cd/foto.webp"))
+        assert resposta.content == b"conteudo" and resposta.headers["cache-control"] == "public, max-age=60"
+        armazenamento.remover("ab/cd/foto.webp")
+        assert list(armazenamento.listar()) == []
+
+        # Upload direto: o arquivo vai ao bucket e a API só processa a chave
+        chave = chave_upload_direto(7)
+        assinatura = armazenamento.url_upload_direto(chave, 1024 * 1024)
+        envio = requests.post(assinatura["url"], data=assinatura["campos"], files={"file": ("foto.png", png())})
+        assert envio.status_code in (200, 204), envio.text
+
+        try:
+            asyncio.run(confirmar_upload_direto(chave, 8, armazenamento))
+            assert False, "chave de outro usuário"
+        except ValueError:
+            pass
+
+        nome = asyncio.run(confirmar_upload_direto(chave, 7, armazenamento))
+        nomes = sorted(nome for nome, _ in armazenamento.listar())
+        assert nomes == sorted([nome] + list(miniaturas_da_foto(nome).values()))  # entrada removida
+        with Image.open(io.BytesIO(requests.get(armazenamento.url(nome)).content)) as foto:
+            assert foto.format == "WEBP" and foto.size == (300, 200)
+
+        # /uploads redireciona para a URL do objeto
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        app = FastAPI()
+        app.mount("/uploads", app_uploads(armazenamento), name="uploads")
+        resposta = TestClient(app).get(f"/uploads/{nome}", follow_redirects=False)
+        assert resposta.status_code == 307 and resposta.headers["location"].startswith(endpoint)
+    finally:
+        servidor.stop()
+    print("✅ Armazenamento S3 funciona!")
+
+
+def main():
+    """Executa todos os testes"""
+    print("🧪 Testando armazenamento...")
+    print("=" * 50)
+    test_armazenamento_local()
+    test_armazenamento_s3()
+    print("=" * 50)
+    print("🎉 Todos os testes passaram!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Script para testar a preparação do banco e a inicialização sob demanda
+"""
+import os
+import tempfile
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import sessionmaker
+from database import criar_engine
+from database import Base
+from models import User, MetaMensal
+from bootstrap import banco_preparado, criar_admin_padrao, preparar_banco
+
+
+def test_preparar_banco_novo():
+    """Testa que um banco novo é criado e marcado na última migração, e depois só migrado"""
+    print("🔄 Testando preparação de banco novo...")
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = criar_engine(f"sqlite:///{os.path.join(pasta, 'novo.db')}")
+        assert not banco_preparado(engine)
+
+        assert preparar_banco(engine) == "criado"
+        assert banco_preparado(engine)
+        with engine.connect() as conexao:
+            versao = conexao.execute(text("SELECT version_num FROM alembic_version")).scalar()
+        assert versao and "resumos_financeiros" in inspect(engine).get_table_names()
+
+        assert preparar_banco(engine) == "migrado"
+        engine.dispose()
+    print("✅ Banco novo preparado!")
+
+
+def test_migrar_metas_mensais_repetidas():
+    """Testa que a migração remove metas mensais repetidas antes do índice único"""
+    print("🔄 Testando migração com metas mensais repetidas...")
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = criar_engine(f"sqlite:///{os.path.join(pasta, 'antigo.db')}")
+        Base.metadata.create_all(bind=engine)  # banco anterior às migrações, sem o índice único
+        with engine.begin() as conexao:
+            conexao.execute(text("DROP INDEX ix_metas_mensais_user_ano_mes"))
+        db = sessionmaker(bind=engine)()
+        user = User(email="teste@erp.com", username="teste", hashed_password="x", full_name="Teste")
+        db.add(user)
+        db.flush()
+        valores = dict(meta_receita=1, meta_despesa=1, meta_investimento=1, meta_poupanca=1)
+        db.add_all([
+            MetaMensal(user_id=user.id, mes=3, ano=2024, **valores),
+            MetaMensal(user_id=user.id, mes=3, ano=2024, **valores),
+            MetaMensal(user_id=user.id, mes=4, ano=2024, **valores),
+        ])
+        db.commit()
+        db.close()
+
+        assert preparar_banco(engine) == "migrado"
+        with engine.connect() as conexao:
+            restantes = conexao.execute(text("SELECT id, mes FROM metas_mensais ORDER BY id")).all()
+        assert [tuple(linha) for linha in restantes] == [(1, 3), (3, 4)]
+        indices = {indice["name"]: indice for indice in inspect(engine).get_indexes("metas_mensais")}
+        assert indices["ix_metas_mensais_user_ano_mes"]["unique"]
+        engine.dispose()
+    print("✅ Metas repetidas removidas antes do índice único!")
+
+
+def test_admin_padrao():
+    """Testa que o admin padrão é criado uma única vez"""
+    print("🔄 Testando admin padrão...")
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = criar_engine(f"sqlite:///{os.path.join(pasta, 'admin.db')}")
+        preparar_banco(engine)
+        db = sessionmaker(bind=engine)()
+        assert criar_admin_padrao(db)
+        assert not criar_admin_padrao(db)
+        assert db.query(User).filter(User.username == "admin").count() == 1
+        db.close()
+        engine.dispose()
+    print("✅ Admin padrão criado uma vez!")
+
+
+def test_router_sob_demanda():
+    """Testa que o router financeiro só é incluído na primeira requisição ao prefixo"""
+    print("🔄 Testando router sob demanda...")
+    from fastapi.testclient import TestClient
+    import main
+
+    def rotas_financeiro():
+        return [rota for rota in main.app.routes if getattr(rota, "path", "").startswith("/api/financeiro")]
+
+    if "/api/financeiro" in main._routers_pendentes:
+        assert rotas_financeiro() == []
+    cliente = TestClient(main.app)
+    assert cliente.get("/api/financeiro/dashboard").status_code == 403  # sem token, mas a rota existe
+    assert rotas_financeiro() and not main._routers_pendentes
+    assert "/api/financeiro/dashboard" in cliente.get("/openapi.json").json()["paths"]
+    print("✅ Router incluído sob demanda!")
+
+
+def main():
+    """Executa todos os testes"""
+    print("🧪 Testando bootstrap...")
+    print("=" * 50)
+    test_preparar_banco_novo()
+    test_migrar_metas_mensais_repetidas()
+    test_admin_padrao()
+    test_router_sob_demanda()
+    print("=" * 50)
+    print("🎉 Todos os testes passaram!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Script para testar o cache de respostas por usuário (cache.py)
+"""
+import threading
+from datetime import date
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from database import Base
+from models import User, ContaPagar, CategoriaConta, ROLES
+from schemas import UserRoleUpdate, UserStatusUpdate
+from auth import create_access_token, get_current_user, get_current_active_user
+from routers.users import update_user_role, update_user_status
+import cache
+from cache import BackendMemoria, CachePorUsuario, cache_por_usuario, _AUSENTE
+
+
+def criar_sessao():
+    """Cria um banco SQLite em memória com dois usuários"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    user = User(email="teste@erp.com", username="teste", hashed_password="x", full_name="Teste")
+    outro = User(email="outro@erp.com", username="outro", hashed_password="x", full_name="Outro")
+    db.add_all([user, outro])
+    db.commit()
+    return db, user, outro
+
+
+def nova_conta(user):
+    return ContaPagar(user_id=user.id, descricao="Luz", valor=200, data_vencimento=date(2024, 3, 10),
+                      categoria=CategoriaConta.MORADIA)
+
+
+def test_invalidacao_no_commit():
+    """Testa que a versão do usuário só muda no commit, e só a dele"""
+    print("🔄 Testando invalidação no commit...")
+    db, user, outro = criar_sessao()
+    versao, versao_outro = cache.cache.versao_usuario(user.id), cache.cache.versao_usuario(outro.id)
+
+    db.add(nova_conta(user))
+    db.flush()
+    assert cache.cache.versao_usuario(user.id) == versao
+    db.commit()
+    assert cache.cache.versao_usuario(user.id) == versao + 1
+    assert cache.cache.versao_usuario(outro.id) == versao_outro
+    print("✅ Invalidação no commit correta!")
+
+
+def test_rollback_descarta_marcas():
+    """Testa que o rollback descarta as marcas e não invalida nada"""
+    print("🔄 Testando rollback...")
+    db, user, _ = criar_sessao()
+    versao = cache.cache.versao_usuario(user.id)
+
+    db.add(nova_conta(user))
+    db.flush()
+    assert ("dados", user.id) in db.info["cache_usuarios_alterados"]
+    db.rollback()
+    assert "cache_usuarios_alterados" not in db.info
+
+    db.commit()  # transação seguinte, sem escritas
+    assert cache.cache.versao_usuario(user.id) == versao
+    print("✅ Rollback descarta as marcas!")
+
+
+def test_expiracao_ttl():
+    """Testa que a entrada expira depois do TTL"""
+    print("🔄 Testando TTL...")
+    agora = [1000.0]
+    monotonic_original, cache.time.monotonic = cache.time.monotonic, lambda: agora[0]
+    try:
+        backend = BackendMemoria(10)
+        backend.gravar("a", 1, 30)
+        agora[0] += 29
+        assert backend.obter("a") == 1
+        agora[0] += 2
+        assert backend.obter("a") is _AUSENTE
+        assert backend.tamanho() == 0
+    finally:
+        cache.time.monotonic = monotonic_original
+    print("✅ TTL correto!")
+
+
+def test_remocao_lru():
+    """Testa que, cheio, o backend descarta o item usado há mais tempo"""
+    print("🔄 Testando LRU...")
+    backend = BackendMemoria(2)
+    backend.gravar("a", 1, 60)
+    backend.gravar("b", 2, 60)
+    assert backend.obter("a") == 1  # "a" passa a ser o mais recente
+    backend.gravar("c", 3, 60)
+    assert backend.obter("b") is _AUSENTE
+    assert backend.obter("a") == 1 and backend.obter("c") == 3
+    assert backend.tamanho() == 2
+    print("✅ LRU correto!")
+
+
+def test_versao_por_usuario():
+    """Testa que o decorator guarda por usuário e só recalcula quem foi invalidado"""
+    print("🔄 Testando versão por usuário...")
+    chamadas = []
+
+    @cache_por_usuario("teste_versao")
+    def endpoint(mes: int, current_user=None, db=None):
+        chamadas.append((current_user.id, mes))
+        return {"user": current_user.id, "mes": mes}
+
+    user, outro = User(id=9001), User(id=9002)
+    assert endpoint(3, current_user=user, db=object()) == {"user": 9001, "mes": 3}
+    endpoint(3, current_user=user, db=object())
+    endpoint(3, current_user=outro)
+    endpoint(4, current_user=user)
+    assert chamadas == [(9001, 3), (9002, 3), (9001, 4)]
+
+    cache.cache.invalidar_usuario(outro.id)
+    endpoint(3, current_user=user)
+    endpoint(3, current_user=outro)
+    assert chamadas[3:] == [(9002, 3)]
+    print("✅ Versão por usuário correta!")
+
+
+def test_contadores_entre_threads():
+    """Testa que acertos e falhas não se perdem com várias threads"""
+    print("🔄 Testando contadores...")
+    cache_teste = CachePorUsuario(BackendMemoria(10), 60)
+    cache_teste.gravar("existe", 1)
+
+    def consultar():
+        for i in range(2000):
+            cache_teste.obter("existe" if i % 2 else "falta")
+
+    threads = [threading.Thread(target=consultar) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    estatisticas = cache_teste.estatisticas()
+    assert estatisticas["acertos"] == 8000 and estatisticas["falhas"] == 8000
+    assert estatisticas["taxa_acerto"] == 0.5
+    print("✅ Contadores corretos!")
+
+
+def autenticar(token, engine):
+    """Autentica como numa requisição nova, com a própria sessão"""
+    db = sessionmaker(bind=engine)()
+    try:
+        return get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token), db)
+    finally:
+        db.close()
+
+
+def test_principal_em_cache():
+    """Testa que, sem alterações, o usuário autenticado vem do cache (sem sessão)"""
+    print("🔄 Testando principal em cache...")
+    db, user, _ = criar_sessao()
+    token = create_access_token({"sub": user.username})
+
+    autenticar(token, db.get_bind())
+    acertos = cache.principais.acertos
+    assert get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token), None).id == user.id
+    assert cache.principais.acertos == acertos + 1
+    print("✅ Principal em cache correto!")
+
+
+def test_desativacao_invalida_principal():
+    """Testa que a desativação vale já na requisição seguinte"""
+    print("🔄 Testando desativação...")
+    db, user, admin = criar_sessao()
+    token = create_access_token({"sub": user.username})
+    assert get_current_active_user(autenticar(token, db.get_bind())).is_active
+
+    update_user_status(user.id, UserStatusUpdate(is_active=False), admin, db)
+
+    try:
+        get_current_active_user(autenticar(token, db.get_bind()))
+        assert False, "usuário desativado ainda autenticado pelo cache"
+    except HTTPException as erro:
+        assert erro.status_code == 400
+    print("✅ Desativação imediata!")
+
+
+def test_troca_de_role_invalida_principal():
+    """Testa que a troca de role vale já na requisição seguinte"""
+    print("🔄 Testando troca de role...")
+    db, user, admin = criar_sessao()
+    token = create_access_token({"sub": user.username})
+    assert not autenticar(token, db.get_bind()).is_admin()
+
+    update_user_role(user.id, UserRoleUpdate(role=ROLES["admin"]), admin, db)
+    assert autenticar(token, db.get_bind()).is_admin()
+
+    update_user_role(user.id, UserRoleUpdate(role=ROLES["membro"]), admin, db)
+    assert not autenticar(token, db.get_bind()).is_admin()
+    print("✅ Troca de role imediata!")
+
+
+def main():
+    """Executa todos os testes"""
+    print("🧪 Testando cache...")
+    print("=" * 50)
+    test_invalidacao_no_commit()
+    test_rollback_descarta_marcas()
+    test_expiracao_ttl()
+    test_remocao_lru()
+    test_versao_por_usuario()
+    test_contadores_entre_threads()
+    test_principal_em_cache()
+    test_desativacao_invalida_principal()
+    test_troca_de_role_invalida_principal()
+    print("=" * 50)
+    print("🎉 Todos os testes passaram!")
+
+
+if __name__ == "__main__":
+    main()
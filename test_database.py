@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Script para testar o perfil de ajuste do engine do banco
+"""
+import asyncio
+import os
+import tempfile
+from sqlalchemy import text
+from database import SessaoEmThread, criar_engine, url_assincrona, sessao_de_leitura, engine, engine_leitura
+from cache import registrar_escrita, escrita_recente
+
+
+def pragmas(engine):
+    with engine.connect() as conexao:
+        return {
+            nome: conexao.execute(text(f"PRAGMA {nome}")).scalar()
+            for nome in ("journal_mode", "synchronous", "busy_timeout", "cache_size", "mmap_size")
+        }
+
+
+def test_perfil_otimizado_sqlite():
+    """Testa que o perfil otimizado aplica WAL, busy_timeout, cache e mmap em cada conexão"""
+    print("🔄 Testando perfil otimizado no SQLite...")
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = criar_engine(f"sqlite:///{os.path.join(pasta, 'teste.db')}", "otimizado")
+        valores = pragmas(engine)
+        engine.dispose()
+
+    assert valores["journal_mode"] == "wal"
+    assert valores["synchronous"] == 1  # NORMAL
+    assert valores["busy_timeout"] == 5000
+    assert valores["cache_size"] < 0 and valores["mmap_size"] > 0
+    assert engine.pool.size() == 10
+    print("✅ PRAGMAs aplicados!")
+
+
+def test_perfil_padrao_sqlite():
+    """Testa que o perfil padrão mantém os padrões do SQLite"""
+    print("🔄 Testando perfil padrão no SQLite...")
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = criar_engine(f"sqlite:///{os.path.join(pasta, 'teste.db')}", "padrao")
+        valores = pragmas(engine)
+        engine.dispose()
+
+    assert valores["journal_mode"] == "delete"
+    assert valores["mmap_size"] == 0
+    print("✅ Padrões mantidos!")
+
+
+def test_sqlite_em_memoria():
+    """Testa que o banco em memória também funciona com o perfil otimizado"""
+    print("🔄 Testando SQLite em memória...")
+    engine = criar_engine("sqlite://", "otimizado")
+    assert pragmas(engine)["journal_mode"] == "memory"
+    print("✅ SQLite em memória funciona!")
+
+
+def test_url_assincrona():
+    """Testa a troca do driver para o engine assíncrono"""
+    print("🔄 Testando URL assíncrona...")
+    assert url_assincrona("sqlite:///./erp.db") == "sqlite+aiosqlite:///./erp.db"
+    assert url_assincrona("postgresql://u:s@localhost/erp") == "postgresql+asyncpg://u:s@localhost/erp"
+    assert url_assincrona("postgresql+psycopg2://u:s@localhost/erp") == "postgresql+asyncpg://u:s@localhost/erp"
+    print("✅ URL assíncrona correta!")
+
+
+def test_sessao_em_thread():
+    """Testa que, sem DB_ASYNC, run_sync executa a função com uma sessão síncrona"""
+    print("🔄 Testando sessão em thread...")
+
+    async def consultar():
+        db = SessaoEmThread()
+        try:
+            return await db.run_sync(lambda sessao, valor: sessao.execute(text(f"SELECT {valor}")).scalar(), 42)
+        finally:
+            await db.close()
+
+    assert asyncio.run(consultar()) == 42
+    print("✅ Sessão em thread funciona!")
+
+
+def test_sessao_de_leitura():
+    """Testa que a sessão de leitura usa a réplica e, logo após uma escrita, o primário"""
+    print("🔄 Testando roteamento de leitura...")
+    replica = next(sessao_de_leitura(True))
+    primario = next(sessao_de_leitura(False))
+    assert replica.get_bind() is engine_leitura and primario.get_bind() is engine
+    replica.close()
+    primario.close()
+
+    assert not escrita_recente(987654)
+    registrar_escrita(987654)
+    assert escrita_recente(987654)
+    print("✅ Roteamento de leitura correto!")
+
+
+def main():
+    """Executa todos os testes"""
+    print("🧪 Testando engine do banco...")
+    print("=" * 50)
+    test_perfil_otimizado_sqlite()
+    test_perfil_padrao_sqlite()
+    test_sqlite_em_memoria()
+    test_url_assincrona()
+    test_sessao_em_thread()
+    test_sessao_de_leitura()
+    print("=" * 50)
+    print("🎉 Todos os testes passaram!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Script para testar a exportação em streaming
+"""
+import csv
+import io
+import json
+from datetime import date
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from database import Base
+from models import User, ContaPagar, ContaReceber, Investimento, CategoriaConta, StatusConta, TipoInvestimento
+from exportacao import exportar
+
+
+def criar_sessao():
+    """Cria um banco SQLite em memória com transações em dois meses"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    user = User(email="teste@erp.com", username="teste", hashed_password="x", full_name="Teste")
+    db.add(user)
+    db.commit()
+
+    db.add_all([
+        ContaReceber(user_id=user.id, descricao="Salário", valor=5000, data_vencimento=date(2024, 3, 5),
+                     data_recebimento=date(2024, 3, 5), categoria=CategoriaConta.OUTROS, status=StatusConta.PAGO),
+        ContaPagar(user_id=user.id, descricao="Aluguel, março", valor=1500, data_vencimento=date(2024, 3, 10),
+                   data_pagamento=date(2024, 3, 9), categoria=CategoriaConta.MORADIA, status=StatusConta.PAGO),
+        ContaPagar(user_id=user.id, descricao="Aluguel, abril", valor=1500, data_vencimento=date(2024, 4, 10),
+                   categoria=CategoriaConta.MORADIA, status=StatusConta.PENDENTE),
+        Investimento(user_id=user.id, nome="CDB", tipo=TipoInvestimento.CDB, valor_investido=1000,
+                     valor_atual=1010, data_investimento=date(2024, 3, 1)),
+    ])
+    db.commit()
+    return db, user
+
+
+def baixar(db, user, conteudo, formato, inicio=None, fim=None):
+    return b"".join(exportar(db, user.id, conteudo, formato, inicio, fim)).decode()
+
+
+def test_exportar_transacoes_csv():
+    """Testa o CSV de transações de um mês"""
+    print("🔄 Testando exportação CSV...")
+    db, user = criar_sessao()
+
+    linhas = list(csv.DictReader(io.StringIO(baixar(db, user, "transacoes", "csv", date(2024, 3, 1), date(2024, 4, 1)))))
+    assert [linha["tipo"] for linha in linhas] == ["conta_pagar", "conta_receber", "investimento"]
+    assert linhas[0]["descricao"] == "Aluguel, março" and linhas[0]["categoria"] == "moradia"
+    assert linhas[2]["categoria"] == "cdb" and linhas[2]["valor"] == "1000.0"
+    print("✅ CSV correto!")
+
+
+def test_exportar_json_e_ndjson():
+    """Testa que JSON e NDJSON trazem o mesmo conteúdo de todo o histórico"""
+    print("🔄 Testando exportação JSON/NDJSON...")
+    db, user = criar_sessao()
+
+    lista = json.loads(baixar(db, user, "transacoes", "json"))
+    linhas = [json.loads(linha) for linha in baixar(db, user, "transacoes", "ndjson").splitlines()]
+    assert len(lista) == 4 and lista == linhas
+
+    resumos = json.loads(baixar(db, user, "resumos", "json"))
+    assert [(r["ano"], r["mes"]) for r in resumos] == [(2024, 3)]
+    assert resumos[0]["saldo_mensal"] == 3500
+    print("✅ JSON e NDJSON corretos!")
+
+
+def main():
+    """Executa todos os testes"""
+    print("🧪 Testando exportação...")
+    print("=" * 50)
+    test_exportar_transacoes_csv()
+    test_exportar_json_e_ndjson()
+    print("=" * 50)
+    print("🎉 Todos os testes passaram!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Script para testar o pipeline das fotos de perfil
+"""
+import asyncio
+import io
+import os
+import tempfile
+import time
+from PIL import Image
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.requests import Request
+from database import Base
+from armazenamento import ArmazenamentoLocal
+from models import User
+from imagens import (
+    ArquivoMuitoGrande, ArquivosImutaveis, ENDERECADO_POR_CONTEUDO, gravar_foto_perfil, liberar_foto,
+    limpar_orfaos, miniaturas_da_foto,
+)
+
+
+def criar_sessao():
+    """Cria um banco SQLite em memória com um usuário"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    user = User(email="teste@erp.com", username="teste", hashed_password="x", full_name="Teste")
+    db.add(user)
+    db.commit()
+    return db, user
+
+
+def jpeg_com_exif(largura=1600, altura=1200) -> bytes:
+    """JPEG com EXIF (câmera e orientação), como o de um celular"""
+    imagem = Image.new("RGB", (largura, altura), (200, 30, 30))
+    exif = Image.Exif()
+    exif[0x010F] = "Camera Teste"  # Make
+    exif[0x0112] = 6  # Orientation: girar 90°
+    saida = io.BytesIO()
+    imagem.save(saida, "JPEG", exif=exif.tobytes())
+    return saida.getvalue()
+
+
+def arquivos(pasta):
+    """Arquivos de pasta e subpastas, relativos a pasta"""
+    return sorted(
+        os.path.relpath(os.path.join(raiz, nome), pasta) for raiz, _, nomes in os.walk(pasta) for nome in nomes
+    )
+
+
+class Envio:
+    """Requisição multipart entregue em blocos de 64 KB, como chega do uvicorn; conta os
+    blocos lidos para conferir que a leitura para no limite"""
+
+    def __init__(self, conteudo: bytes, nome="foto.jpg", chunked=True):
+        corpo = (
+            b'--limite\r\nContent-Disposition: form-data; name="descricao"\r\n\r\nminha foto\r\n'
+            b'--limite\r\nContent-Disposition: form-data; name="file"; filename="' + nome.encode() + b'"\r\n'
+            b"Content-Type: application/octet-stream\r\n\r\n" + conteudo + b"\r\n--limite--\r\n"
+        )
+        self.blocos = [corpo[inicio:inicio + 64 * 1024] for inicio in range(0, len(corpo), 64 * 1024)]
+        self.lidos = 0
+        cabecalhos = [(b"content-type", b"multipart/form-data; boundary=limite")]
+        if not chunked:
+            cabecalhos.append((b"content-length", str(len(corpo)).encode()))
+        self.request = Request({"type": "http", "method": "POST", "path": "/", "headers": cabecalhos}, self._receber)
+
+    async def _receber(self):
+        bloco = self.blocos[self.lidos]
+        self.lidos += 1
+        return {"type": "http.request", "body": bloco, "more_body": self.lidos < len(self.blocos)}
+
+
+def upload(conteudo: bytes, nome="foto.jpg") -> Request:
+    """Upload chunked (sem Content-Length)"""
+    return Envio(conteudo, nome).request
+
+
+def test_foto_e_miniaturas():
+    """Testa a conversão para WebP sem metadados, com orientação aplicada e miniaturas"""
+    print("🔄 Testando conversão da foto...")
+    with tempfile.TemporaryDirectory() as pasta:
+        nome = asyncio.run(gravar_foto_perfil(upload(jpeg_com_exif()), ArmazenamentoLocal(pasta)))
+        assert ENDERECADO_POR_CONTEUDO.match(nome)
+
+        with Image.open(os.path.join(pasta, nome)) as foto:
+            assert foto.format == "WEBP"
+            assert foto.size == (768, 1024)  # girada e limitada a 1024 px
+            assert not foto.getexif() and "exif" not in foto.info
+
+        for tamanho, miniatura in miniaturas_da_foto(nome).items():
+            with Image.open(os.path.join(pasta, miniatura)) as imagem:
+                assert imagem.size == (int(tamanho), int(tamanho))
+        assert len(arquivos(pasta)) == 3
+    print("✅ Foto convertida!")
+
+
+def test_limite_de_tamanho():
+    """Testa que o limite para a leitura do corpo (chunked ou pelo Content-Length) e que nada fica gravado"""
+    print("🔄 Testando limite de tamanho...")
+    with tempfile.TemporaryDirectory() as pasta:
+        for chunked, blocos_lidos in ((True, 4), (False, 0)):
+            envio = Envio(b"x" * 1_000_000, chunked=chunked)
+            try:
+                asyncio.run(gravar_foto_perfil(envio.request, ArmazenamentoLocal(pasta), limite=200_000))
+                assert False, "deveria recusar o arquivo"
+            except ArquivoMuitoGrande:
+                pass
+            # 16 blocos no corpo: chunked, para no 4º (> 200 KB); com Content-Length, nem começa
+            assert envio.lidos == blocos_lidos, envio.lidos
+        assert arquivos(pasta) == []
+    print("✅ Limite aplicado!")
+
+
+def test_arquivo_invalido():
+    """Testa que um arquivo que não é imagem é recusado"""
+    print("🔄 Testando arquivo inválido...")
+    with tempfile.TemporaryDirectory() as pasta:
+        try:
+            asyncio.run(gravar_foto_perfil(upload(b"<?php echo 1; ?>", "foto.png"), ArmazenamentoLocal(pasta)))
+            assert False, "deveria recusar o arquivo"
+        except ValueError as erro:
+            assert "imagem válida" in str(erro)
+        for conteudo, nome, mensagem in ((jpeg_com_exif(), "foto.exe", "não permitido"), (b"", None, "ausente")):
+            envio = Envio(conteudo, nome or "foto.jpg")
+            if nome is None:  # sem o campo "file"
+                envio.blocos = [b'--limite\r\nContent-Disposition: form-data; name="outro"\r\n\r\nx\r\n--limite--\r\n']
+            try:
+                asyncio.run(gravar_foto_perfil(envio.request, ArmazenamentoLocal(pasta)))
+                assert False, "deveria recusar o envio"
+            except ValueError as erro:
+                assert mensagem in str(erro), erro
+        assert arquivos(pasta) == []
+    print("✅ Arquivo inválido recusado!")
+
+
+def test_deduplicacao_e_referencias():
+    """Testa que fotos iguais compartilham o arquivo, removido só sem referências"""
+    print("🔄 Testando deduplicação e contagem de referências...")
+    db, user = criar_sessao()
+    outro = User(email="outro@erp.com", username="outro", hashed_password="x", full_name="Outro")
+    db.add(outro)
+    with tempfile.TemporaryDirectory() as pasta:
+        armazenamento = ArmazenamentoLocal(pasta)
+        nome = asyncio.run(gravar_foto_perfil(upload(jpeg_com_exif(200, 200)), armazenamento))
+        assert asyncio.run(gravar_foto_perfil(upload(jpeg_com_exif(200, 200)), armazenamento)) == nome
+        assert len(arquivos(pasta)) == 3
+
+        user.profile_picture = outro.profile_picture = nome
+        db.commit()
+        user.profile_picture = None
+        db.commit()
+        assert not liberar_foto(db, nome, armazenamento) and len(arquivos(pasta)) == 3
+
+        outro.profile_picture = None
+        db.commit()
+        assert liberar_foto(db, nome, armazenamento, carencia=0) and arquivos(pasta) == []
+    print("✅ Arquivo compartilhado até a última referência!")
+
+
+def test_remocao_concorrente():
+    """Testa que reaproveitar uma foto a protege de um liberar_foto antes do commit do novo dono"""
+    print("🔄 Testando remoção concorrente da mesma foto...")
+    db, user = criar_sessao()
+    with tempfile.TemporaryDirectory() as pasta:
+        armazenamento = ArmazenamentoLocal(pasta)
+        nome = asyncio.run(gravar_foto_perfil(upload(jpeg_com_exif(200, 200)), armazenamento))
+        user.profile_picture = nome
+        db.commit()
+        uma_hora_atras = time.time() - 3600
+        for arquivo in arquivos(pasta):
+            os.utime(os.path.join(pasta, arquivo), (uma_hora_atras, uma_hora_atras))
+
+        # Outro usuário envia a mesma foto (arquivos já existem) e ainda não fez o commit...
+        assert asyncio.run(gravar_foto_perfil(upload(jpeg_com_exif(200, 200)), armazenamento)) == nome
+        # ...enquanto o dono atual troca de foto: sem referências, mas dentro da carência
+        user.profile_picture = None
+        db.commit()
+        assert not liberar_foto(db, nome, armazenamento) and len(arquivos(pasta)) == 3
+        assert limpar_orfaos(db, armazenamento) == []
+    print("✅ Foto reaproveitada mantida!")
+
+
+def test_limpar_orfaos():
+    """Testa a limpeza de arquivos sem usuário, inclusive subpastas vazias"""
+    print("🔄 Testando limpeza de órfãos...")
+    db, user = criar_sessao()
+    with tempfile.TemporaryDirectory() as pasta:
+        armazenamento = ArmazenamentoLocal(pasta)
+        antiga = asyncio.run(gravar_foto_perfil(upload(jpeg_com_exif(100, 100)), armazenamento))
+        atual = asyncio.run(gravar_foto_perfil(upload(jpeg_com_exif(200, 200)), armazenamento))
+        user.profile_picture = atual
+        db.commit()
+        open(os.path.join(pasta, "legado.jpeg"), "wb").close()
+
+        removidos = limpar_orfaos(db, armazenamento, carencia=0)
+        assert "legado.jpeg" in removidos and antiga in removidos and len(removidos) == 4
+        assert arquivos(pasta) == sorted([atual] + list(miniaturas_da_foto(atual).values()))
+        assert not os.path.exists(os.path.join(pasta, os.path.dirname(antiga)))
+    print("✅ Órfãos removidos!")
+
+
+def test_cabecalhos_de_cache():
+    """Testa cache imutável, ETag forte e 304 nas fotos endereçadas por conteúdo"""
+    print("🔄 Testando cabeçalhos de cache...")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    with tempfile.TemporaryDirectory() as pasta:
+        nome = asyncio.run(gravar_foto_perfil(upload(jpeg_com_exif(200, 200)), ArmazenamentoLocal(pasta)))
+        open(os.path.join(pasta, "legado.jpeg"), "wb").close()
+        app = FastAPI()
+        app.mount("/uploads", ArquivosImutaveis(directory=pasta), name="uploads")
+        cliente = TestClient(app)
+
+        resposta = cliente.get(f"/uploads/{nome}")
+        etag = f'"{os.path.basename(nome)[:-5]}"'
+        assert resposta.status_code == 200 and resposta.headers["etag"] == etag
+        assert resposta.headers["cache-control"] == "public, max-age=31536000, immutable"
+
+        resposta = cliente.get(f"/uploads/{nome}", headers={"If-None-Match": f'"outro", W/{etag}'})
+        assert resposta.status_code == 304 and resposta.headers["etag"] == etag
+        assert cliente.get(f"/uploads/{nome}", headers={"If-None-Match": '"outro"'}).status_code == 200
+
+        assert cliente.get("/uploads/legado.jpeg").headers["cache-control"] == "no-cache"
+    print("✅ Cabeçalhos de cache corretos!")
+
+
+def main():
+    """Executa todos os testes"""
+    print("🧪 Testando fotos de perfil...")
+    print("=" * 50)
+    test_foto_e_miniaturas()
+    test_limite_de_tamanho()
+    test_arquivo_invalido()
+    test_deduplicacao_e_referencias()
+    test_remocao_concorrente()
+    test_limpar_orfaos()
+    test_cabecalhos_de_cache()
+    print("=" * 50)
+    print("🎉 Todos os testes passaram!")
+
+
+if __name__ == "__main__":
+    main()
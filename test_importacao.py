@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Script para testar a importação de extratos OFX e CSV
+"""
+import io
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from database import Base
+from models import User, ContaPagar, ContaReceber, ResumoFinanceiro, CategoriaConta
+from importacao import abrir_leitor, importar_extrato, converter_valor
+
+OFX = """OFXHEADER:100
+DATA:OFXSGML
+
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240305120000[-3:BRT]<TRNAMT>-150.00<FITID>A1<MEMO>SUPERMERCADO BOM PRECO</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240306<TRNAMT>5000.00<FITID>A2<MEMO>SALARIO</STMTTRN>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240307<TRNAMT>-42.90<FITID>A3<NAME>Uber *Trip</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>"""
+
+CSV = """Data;Histórico;Valor
+05/03/2024;Farmácia Central;-30,00
+05/03/2024;Farmácia Central;-30,00
+06/03/2024;PIX recebido;1.200,50
+31/02/2024;Data inválida;-1,00
+"""
+
+
+def criar_sessao():
+    """Cria um banco SQLite em memória com um usuário"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    user = User(email="teste@erp.com", username="teste", hashed_password="x", full_name="Teste")
+    db.add(user)
+    db.commit()
+    return db, user
+
+
+def importar(db, user, conteudo, formato):
+    return list(importar_extrato(db, user.id, abrir_leitor(io.StringIO(conteudo), formato), tamanho_lote=2))[-1]
+
+
+def test_importar_ofx():
+    """Testa a importação do OFX, as categorias e os resumos"""
+    print("🔄 Testando importação de OFX...")
+    db, user = criar_sessao()
+
+    progresso = importar(db, user, OFX, "ofx")
+    assert progresso.concluido and progresso.lotes == 2
+    assert (progresso.lidos, progresso.importados, progresso.erros) == (3, 3, 0)
+
+    mercado = db.query(ContaPagar).filter(ContaPagar.descricao == "SUPERMERCADO BOM PRECO").one()
+    assert mercado.categoria == CategoriaConta.ALIMENTACAO and mercado.valor == 150
+    uber = db.query(ContaPagar).filter(ContaPagar.descricao == "Uber *Trip").one()
+    assert uber.categoria == CategoriaConta.TRANSPORTE
+    assert db.query(ContaReceber).one().valor == 5000
+
+    resumo = db.query(ResumoFinanceiro).filter_by(user_id=user.id, ano=2024, mes=3).one()
+    assert resumo.total_despesas == 192.9 and resumo.total_receitas == 5000
+    print("✅ OFX importado corretamente!")
+
+
+def test_reimportar_nao_duplica():
+    """Testa que lançamentos repetidos no dia são mantidos e que reimportar não duplica"""
+    print("🔄 Testando deduplicação...")
+    db, user = criar_sessao()
+
+    progresso = importar(db, user, CSV, "csv")
+    assert (progresso.importados, progresso.duplicados, progresso.erros) == (3, 0, 1)
+    assert db.query(ContaPagar).count() == 2
+
+    progresso = importar(db, user, CSV, "csv")
+    assert (progresso.importados, progresso.duplicados) == (0, 3)
+    assert db.query(ContaPagar).count() + db.query(ContaReceber).count() == 3
+    print("✅ Deduplicação correta!")
+
+
+def test_converter_valor():
+    assert converter_valor("1.234,56") == 1234.56
+    assert converter_valor("-1,234.56") == -1234.56
+    assert converter_valor("R$ 10,5") == 10.5
+    assert converter_valor("-42.90") == -42.9
+
+
+def main():
+    """Executa todos os testes"""
+    print("🧪 Testando importação de extratos...")
+    print("=" * 50)
+    test_importar_ofx()
+    test_reimportar_nao_duplica()
+    test_converter_valor()
+    print("=" * 50)
+    print("🎉 Todos os testes passaram!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Script para testar a criação e a baixa de contas em lote
+"""
+from datetime import date
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from database import Base
+from models import User, ContaPagar, ContaReceber, ResumoFinanceiro, CategoriaConta, StatusConta
+from schemas import BaixaLoteRequest
+from routers.financeiro import criar_contas_pagar_lote, pagar_contas_lote, receber_contas_lote
+
+
+def criar_sessao():
+    """Cria um banco SQLite em memória com dois usuários"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    user = User(email="teste@erp.com", username="teste", hashed_password="x", full_name="Teste")
+    outro = User(email="outro@erp.com", username="outro", hashed_password="x", full_name="Outro")
+    db.add_all([user, outro])
+    db.commit()
+    return db, user, outro
+
+
+def conta(descricao, valor, vencimento="2024-03-10"):
+    return {"descricao": descricao, "valor": valor, "data_vencimento": vencimento, "categoria": "moradia"}
+
+
+def test_criar_em_lote():
+    """Testa que cada item válido recebe o ID da própria linha e os inválidos são reportados"""
+    print("🔄 Testando criação em lote...")
+    db, user, _ = criar_sessao()
+
+    itens = [conta(f"Conta {i}", 100 + i) for i in range(5)]
+    itens.insert(2, {"descricao": "Sem valor", "data_vencimento": "2024-03-10", "categoria": "moradia"})
+    resposta = criar_contas_pagar_lote(itens, user, db)
+
+    assert (resposta.processados, resposta.sucesso, resposta.falhas) == (6, 5, 1)
+    assert [resultado.indice for resultado in resposta.resultados] == list(range(6))
+    assert not resposta.resultados[2].sucesso and "valor" in resposta.resultados[2].erro
+    for indice, resultado in enumerate(resposta.resultados):
+        if resultado.sucesso:
+            assert db.get(ContaPagar, resultado.id).descricao == itens[indice]["descricao"]
+            assert db.get(ContaPagar, resultado.id).status == StatusConta.PENDENTE
+    print("✅ Criação em lote correta!")
+
+
+def test_pagar_em_lote():
+    """Testa a baixa em lote: contas de outro usuário e já pagas são recusadas sem alteração"""
+    print("🔄 Testando baixa em lote...")
+    db, user, outro = criar_sessao()
+
+    ids = [resultado.id for resultado in criar_contas_pagar_lote(
+        [conta("Luz", 200), conta("Água", 80), conta("Aluguel", 1500)], user, db
+    ).resultados]
+    alheia = criar_contas_pagar_lote([conta("Alheia", 50)], outro, db).resultados[0].id
+
+    primeira = pagar_contas_lote(BaixaLoteRequest(ids=ids[:1], data=date(2024, 3, 5)), user, db)
+    assert primeira.sucesso == 1
+
+    resposta = pagar_contas_lote(BaixaLoteRequest(ids=ids + [alheia, 999], data=date(2024, 4, 2)), user, db)
+    assert (resposta.processados, resposta.sucesso, resposta.falhas) == (5, 2, 3)
+    erros = [resultado.erro for resultado in resposta.resultados]
+    assert erros == ["Conta já paga", None, None, "Conta não encontrada", "Conta não encontrada"]
+
+    # A conta já paga mantém a data original e continua no resumo de março
+    db.expire_all()
+    assert db.get(ContaPagar, ids[0]).data_pagamento == date(2024, 3, 5)
+    assert db.get(ContaPagar, alheia).status == StatusConta.PENDENTE
+    despesas = {(resumo.mes, resumo.ano): resumo.total_despesas for resumo in db.query(ResumoFinanceiro)}
+    assert despesas == {(3, 2024): 200, (4, 2024): 1580}
+    print("✅ Baixa em lote correta!")
+
+
+def test_pagar_canceladas_e_repetidas():
+    """Testa que canceladas não viram pagas e que um ID repetido só conta uma vez"""
+    print("🔄 Testando canceladas e IDs repetidos...")
+    db, user, _ = criar_sessao()
+    luz, agua = [resultado.id for resultado in criar_contas_pagar_lote(
+        [conta("Luz", 200), conta("Água", 80)], user, db
+    ).resultados]
+    db.get(ContaPagar, agua).status = StatusConta.CANCELADO
+    db.commit()
+
+    resposta = pagar_contas_lote(BaixaLoteRequest(ids=[luz, agua, luz], data=date(2024, 3, 5)), user, db)
+    assert (resposta.processados, resposta.sucesso, resposta.falhas) == (3, 1, 2)
+    assert [resultado.erro for resultado in resposta.resultados] == [None, "Conta cancelada", "ID repetido no lote"]
+
+    db.expire_all()
+    assert db.get(ContaPagar, agua).status == StatusConta.CANCELADO
+    assert [(resumo.mes, resumo.total_despesas) for resumo in db.query(ResumoFinanceiro)] == [(3, 200)]
+    print("✅ Canceladas e repetidas recusadas!")
+
+
+def test_receber_em_lote():
+    """Testa a mensagem de conta já recebida"""
+    print("🔄 Testando recebimento em lote...")
+    db, user, _ = criar_sessao()
+    recebida = ContaReceber(user_id=user.id, descricao="Freela", valor=900, data_vencimento=date(2024, 3, 5),
+                            data_recebimento=date(2024, 3, 5), categoria=CategoriaConta.OUTROS,
+                            status=StatusConta.PAGO)
+    db.add(recebida)
+    db.commit()
+
+    resposta = receber_contas_lote(BaixaLoteRequest(ids=[recebida.id]), user, db)
+    assert resposta.falhas == 1 and resposta.resultados[0].erro == "Conta já recebida"
+    db.expire_all()
+    assert db.get(ContaReceber, recebida.id).data_recebimento == date(2024, 3, 5)
+    print("✅ Recebimento em lote correto!")
+
+
+def main():
+    """Executa todos os testes"""
+    print("🧪 Testando operações em lote...")
+    print("=" * 50)
+    test_criar_em_lote()
+    test_pagar_em_lote()
+    test_pagar_canceladas_e_repetidas()
+    test_receber_em_lote()
+    print("=" * 50)
+    print("🎉 Todos os testes passaram!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Script para testar a paginação por cursor e a projeção de campos
+"""
+import json
+from datetime import date, timedelta
+from fastapi import Response
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from database import Base
+from models import User, ContaPagar, CategoriaConta
+from schemas import ContaPagarResponse
+from paginacao import ParametrosPagina, paginar, CABECALHO_CURSOR, CABECALHO_TOTAL
+
+
+def criar_sessao():
+    """Cria um banco SQLite em memória com 25 contas, várias no mesmo dia"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    user = User(email="teste@erp.com", username="teste", hashed_password="x", full_name="Teste")
+    db.add(user)
+    db.commit()
+
+    db.add_all([
+        ContaPagar(user_id=user.id, descricao=f"Conta {i}", valor=10 + i,
+                   data_vencimento=date(2024, 1, 1) + timedelta(days=i // 3), categoria=CategoriaConta.OUTROS)
+        for i in range(25)
+    ])
+    db.commit()
+    return db, user
+
+
+def pagina(limite, cursor=None, campos=None, contar=False):
+    return ParametrosPagina(limite=limite, cursor=cursor, campos=campos, contar=contar)
+
+
+def test_percorrer_paginas():
+    """Testa que as páginas cobrem todas as contas, em ordem e sem repetição"""
+    print("🔄 Testando paginação por cursor...")
+    db, user = criar_sessao()
+    query = db.query(ContaPagar).filter(ContaPagar.user_id == user.id)
+
+    vistos, cursor, paginas = [], None, 0
+    while True:
+        response = Response()
+        itens = paginar(query, ContaPagar.data_vencimento, ContaPagarResponse, pagina(10, cursor, contar=True), response)
+        assert response.headers[CABECALHO_TOTAL] == "25"
+        vistos.extend((conta.data_vencimento, conta.id) for conta in itens)
+        paginas += 1
+        cursor = response.headers.get(CABECALHO_CURSOR)
+        if cursor is None:
+            break
+
+    assert paginas == 3
+    assert vistos == sorted(vistos) and len(set(vistos)) == 25
+    print("✅ Paginação correta!")
+
+
+def test_projecao_de_campos():
+    """Testa que fields devolve só os campos pedidos e continua paginando"""
+    print("🔄 Testando projeção de campos...")
+    db, user = criar_sessao()
+    query = db.query(ContaPagar).filter(ContaPagar.user_id == user.id)
+
+    resposta = paginar(query, ContaPagar.data_vencimento, ContaPagarResponse,
+                       pagina(20, campos="descricao,valor"), Response(), descendente=True)
+    itens = json.loads(resposta.body)
+    assert len(itens) == 20
+    assert itens[0] == {"descricao": "Conta 24", "valor": 34}
+    assert CABECALHO_CURSOR.lower() in resposta.headers
+    print("✅ Projeção correta!")
+
+
+def main():
+    """Executa todos os testes"""
+    print("🧪 Testando paginação...")
+    print("=" * 50)
+    test_percorrer_paginas()
+    test_projecao_de_campos()
+    print("=" * 50)
+    print("🎉 Todos os testes passaram!")
+
+
+if __name__ == "__main__":
+    main()
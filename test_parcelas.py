@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Script para testar o cálculo dos vencimentos e a criação de contas parceladas
+"""
+from datetime import date
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from database import Base
+from models import User, ContaPagar, CategoriaConta
+from periodos import adicionar_meses
+from schemas import ContaPagarParceladaCreate
+from routers.financeiro import criar_conta_parcelada
+
+
+def criar_sessao():
+    """Cria um banco SQLite em memória com um usuário"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    user = User(email="teste@erp.com", username="teste", hashed_password="x", full_name="Teste")
+    db.add(user)
+    db.commit()
+    return db, user
+
+
+def test_adicionar_meses():
+    """Testa o limite ao último dia do mês, sem acumular o ajuste nas parcelas seguintes"""
+    print("🔄 Testando adição de meses...")
+    assert adicionar_meses(date(2024, 1, 31), 1) == date(2024, 2, 29)  # ano bissexto
+    assert adicionar_meses(date(2023, 1, 31), 1) == date(2023, 2, 28)
+    assert adicionar_meses(date(2024, 1, 31), 2) == date(2024, 3, 31)  # não fica preso no dia 29
+    assert adicionar_meses(date(2024, 1, 31), 3) == date(2024, 4, 30)
+    assert adicionar_meses(date(2024, 11, 15), 3) == date(2025, 2, 15)  # virada do ano
+    assert adicionar_meses(date(2024, 3, 31), -1) == date(2024, 2, 29)
+    assert adicionar_meses(date(2024, 5, 10), 0) == date(2024, 5, 10)
+    print("✅ Adição de meses correta!")
+
+
+def test_criar_conta_parcelada():
+    """Testa que as parcelas saem em ordem, com vencimentos mensais e apontando para a primeira"""
+    print("🔄 Testando conta parcelada...")
+    db, user = criar_sessao()
+
+    conta = ContaPagarParceladaCreate(
+        descricao="Notebook", valor_total=1200, data_vencimento_primeira=date(2024, 1, 31),
+        categoria=CategoriaConta.OUTROS, total_parcelas=12,
+    )
+    parcelas = criar_conta_parcelada(conta, user, db)
+
+    assert [parcela.parcela_atual for parcela in parcelas] == list(range(1, 13))
+    assert parcelas[1].descricao == "Notebook - Parcela 2/12"
+    assert [parcela.data_vencimento for parcela in parcelas[:4]] == [
+        date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)
+    ]
+    assert {parcela.parcela_original_id for parcela in parcelas} == {parcelas[0].id}
+    assert all(parcela.valor == 100 for parcela in parcelas)
+
+    db.expire_all()
+    gravadas = db.query(ContaPagar).order_by(ContaPagar.parcela_atual).all()
+    assert [parcela.id for parcela in gravadas] == [parcela.id for parcela in parcelas]
+    assert {parcela.parcela_original_id for parcela in gravadas} == {parcelas[0].id}
+    print("✅ Conta parcelada correta!")
+
+
+def main():
+    """Executa todos os testes"""
+    print("🧪 Testando parcelas...")
+    print("=" * 50)
+    test_adicionar_meses()
+    test_criar_conta_parcelada()
+    print("=" * 50)
+    print("🎉 Todos os testes passaram!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Script para testar a manutenção dos resumos mensais e do saldo acumulado
+"""
+from datetime import date
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from database import Base
+from models import User, ContaPagar, ContaReceber, ResumoFinanceiro, CategoriaConta, StatusConta
+from agregacoes import agregar_resumos
+from resumos import reconstruir_resumos, saldo_acumulado_ate, saldo_acumulado_total
+from routers.financeiro import obter_alertas_mensais
+
+
+def criar_sessao():
+    """Cria um banco SQLite em memória com um usuário"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    user = User(email="teste@erp.com", username="teste", hashed_password="x", full_name="Teste")
+    db.add(user)
+    db.commit()
+    return db, user
+
+
+def conferir(db, user):
+    """Os resumos mantidos a cada escrita devem bater com o recálculo a partir das transações"""
+    esperado = agregar_resumos(db, [user.id])
+    acumulado = 0.0
+    for resumo in db.query(ResumoFinanceiro).order_by(ResumoFinanceiro.ano, ResumoFinanceiro.mes):
+        totais = esperado.get((user.id, resumo.ano, resumo.mes))
+        assert resumo.total_receitas == (totais.total_receitas if totais else 0)
+        assert resumo.total_despesas == (totais.total_despesas if totais else 0)
+        acumulado += resumo.saldo_mensal
+        assert abs(resumo.saldo_acumulado - acumulado) < 1e-6
+
+
+def test_resumos_incrementais():
+    """Testa os resumos e o saldo acumulado ao criar, pagar, alterar e remover contas"""
+    print("🔄 Testando resumos incrementais...")
+    db, user = criar_sessao()
+
+    db.add(ContaReceber(user_id=user.id, descricao="Salário", valor=5000, data_vencimento=date(2023, 12, 5),
+                        data_recebimento=date(2023, 12, 5), categoria=CategoriaConta.OUTROS,
+                        status=StatusConta.PAGO))
+    conta = ContaPagar(user_id=user.id, descricao="Aluguel", valor=1500, data_vencimento=date(2024, 3, 10),
+                       categoria=CategoriaConta.MORADIA)
+    db.add(conta)
+    db.commit()
+    conferir(db, user)
+
+    conta.status = StatusConta.PAGO
+    conta.data_pagamento = date(2024, 3, 9)
+    db.commit()
+    conferir(db, user)
+
+    # Um mês anterior passa a existir depois dos seguintes
+    db.add(ContaReceber(user_id=user.id, descricao="Freela", valor=800, data_vencimento=date(2024, 1, 20),
+                        data_recebimento=date(2024, 1, 20), categoria=CategoriaConta.OUTROS,
+                        status=StatusConta.PAGO))
+    conta.data_pagamento = date(2024, 2, 1)
+    db.commit()
+    conferir(db, user)
+
+    assert saldo_acumulado_ate(db, user.id, 1, 2024) == 5000
+    assert saldo_acumulado_ate(db, user.id, 6, 2024) == 5000 + 800 - 1500
+
+    db.delete(conta)
+    db.commit()
+    conferir(db, user)
+    assert saldo_acumulado_ate(db, user.id, 6, 2024) == 5800
+    print("✅ Resumos incrementais corretos!")
+
+
+def test_reconstruir_resumos():
+    """Testa a reconstrução dos resumos e dos saldos acumulados"""
+    print("🔄 Testando reconstrução dos resumos...")
+    db, user = criar_sessao()
+
+    db.add(ContaReceber(user_id=user.id, descricao="Salário", valor=5000, data_vencimento=date(2024, 3, 5),
+                        data_recebimento=date(2024, 3, 5), categoria=CategoriaConta.OUTROS,
+                        status=StatusConta.PAGO))
+    db.commit()
+    db.query(ResumoFinanceiro).delete()
+    db.commit()
+
+    assert reconstruir_resumos(db, [user.id]) == 1
+    db.commit()
+    conferir(db, user)
+    assert saldo_acumulado_ate(db, user.id, 4, 2024) == 5000
+    print("✅ Reconstrução correta!")
+
+
+def test_saldo_dos_alertas():
+    """Testa que o saldo dos alertas vem dos resumos, sem somar as tabelas de contas"""
+    print("🔄 Testando saldo dos alertas...")
+    db, user = criar_sessao()
+    db.add_all([
+        ContaReceber(user_id=user.id, descricao="Salário", valor=3000, data_vencimento=date(2024, 1, 5),
+                     data_recebimento=date(2024, 1, 5), categoria=CategoriaConta.OUTROS, status=StatusConta.PAGO),
+        ContaPagar(user_id=user.id, descricao="Aluguel", valor=1500, data_vencimento=date(2024, 1, 10),
+                   data_pagamento=date(2024, 1, 10), categoria=CategoriaConta.MORADIA, status=StatusConta.PAGO),
+        ContaPagar(user_id=user.id, descricao="Carro", valor=2500, data_vencimento=date(2024, 3, 10),
+                   data_pagamento=date(2024, 3, 10), categoria=CategoriaConta.TRANSPORTE, status=StatusConta.PAGO),
+    ])
+    db.commit()
+    assert saldo_acumulado_total(db, user.id) == -1000
+
+    consultas = []
+    registrar = lambda conexao, cursor, sql, *args: consultas.append(sql)
+    event.listen(db.get_bind(), "before_cursor_execute", registrar)
+    try:
+        alertas = obter_alertas_mensais(current_user=user, db=db)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", registrar)
+    assert alertas.saldo_negativo and "Saldo negativo detectado!" in alertas.alertas_criticos
+    assert not any("sum(" in sql.lower() for sql in consultas)
+    print("✅ Saldo dos alertas vem dos resumos!")
+
+
+def main():
+    """Executa todos os testes"""
+    print("🧪 Testando resumos mensais...")
+    print("=" * 50)
+    test_resumos_incrementais()
+    test_reconstruir_resumos()
+    test_saldo_dos_alertas()
+    print("=" * 50)
+    print("🎉 Todos os testes passaram!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Script para testar as opções do servidor de produção (run.py)
+"""
+import os
+from database import criar_engine
+import database
+import run
+
+
+def test_opcoes_uvicorn():
+    """Testa que dev usa reload e produção usa workers e encerramento gracioso"""
+    print("🔄 Testando opções do uvicorn...")
+    dev = run.opcoes_uvicorn(run.argumentos(["--dev"]))
+    assert dev["reload"] and "workers" not in dev
+
+    cache_original, run.CACHE_BACKEND = run.CACHE_BACKEND, "redis"
+    try:
+        producao = run.opcoes_uvicorn(run.argumentos(["--producao", "--workers", "3", "--loop", "asyncio",
+                                                      "--http", "h11", "--timeout-encerramento", "12"]))
+    finally:
+        run.CACHE_BACKEND = cache_original
+    assert "reload" not in producao
+    assert producao["workers"] == 3 and producao["timeout_graceful_shutdown"] == 12
+    assert producao["loop"] == "asyncio" and producao["http"] == "h11"
+    print("✅ Opções do uvicorn corretas!")
+
+
+def test_workers_exigem_redis():
+    """Testa que vários workers sem Redis são recusados (estado em memória por processo)"""
+    print("🔄 Testando workers sem Redis...")
+    cache_original, run.CACHE_BACKEND = run.CACHE_BACKEND, "memoria"
+    try:
+        assert run.argumentos(["--producao", "--workers", "1"]).workers == 1
+        try:
+            run.argumentos(["--producao", "--workers", "2"])
+            assert False, "deveria exigir CACHE_BACKEND=redis"
+        except SystemExit:
+            pass
+    finally:
+        run.CACHE_BACKEND = cache_original
+    print("✅ Vários workers exigem Redis!")
+
+
+def test_opcoes_gunicorn():
+    """Testa a configuração do gunicorn (preload, worker do uvicorn, hook pós-fork)"""
+    print("🔄 Testando opções do gunicorn...")
+    if run.WorkerERP is None:
+        print("⚠️  gunicorn não instalado, teste pulado")
+        return
+
+    ambiente = dict(os.environ)
+    try:
+        opcoes = run.opcoes_gunicorn(run.argumentos(["--producao", "--servidor", "gunicorn", "--http", "h11"]))
+        assert opcoes["workers"] == run.SERVIDOR_WORKERS and opcoes["worker_class"] == "run.WorkerERP"
+        assert opcoes["preload_app"] and opcoes["post_fork"] is run.post_fork
+        assert os.environ["SERVIDOR_HTTP"] == "h11"
+
+        sem_preload = run.opcoes_gunicorn(run.argumentos(["--producao", "--servidor", "gunicorn", "--sem-preload"]))
+        assert not sem_preload["preload_app"]
+    finally:
+        os.environ.clear()
+        os.environ.update(ambiente)
+    print("✅ Opções do gunicorn corretas!")
+
+
+def test_descartar_conexoes_herdadas():
+    """Testa que o worker recebe um pool novo sem fechar as conexões do mestre"""
+    print("🔄 Testando pools após o fork...")
+    engine = criar_engine("sqlite://")
+    conexao = engine.connect()
+    pool_mestre = engine.pool
+
+    engine_original, database.engine = database.engine, engine
+    try:
+        database.descartar_conexoes_herdadas()
+    finally:
+        database.engine = engine_original
+    assert engine.pool is not pool_mestre
+    assert not conexao.closed and conexao.exec_driver_sql("SELECT 1").scalar() == 1
+    conexao.close()
+    engine.dispose()
+    print("✅ Pools descartados sem fechar conexões!")
+
+
+def main():
+    """Executa todos os testes"""
+    print("🧪 Testando servidor de produção...")
+    print("=" * 50)
+    test_opcoes_uvicorn()
+    test_workers_exigem_redis()
+    test_opcoes_gunicorn()
+    test_descartar_conexoes_herdadas()
+    print("=" * 50)
+    print("🎉 Todos os testes passaram!")
+
+
+if __name__ == "__main__":
+    main()
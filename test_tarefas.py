@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Script para testar as tarefas em segundo plano e a geração dos meses
+"""
+import threading
+import time
+from datetime import date
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from database import Base
+from models import User, ContaPagar, MetaMensal, ResumoFinanceiro, CategoriaConta, StatusConta
+from tarefas import agendar, gerar_meses, obter_tarefa, _criar_metas_mensais_padrao, CONCLUIDA, EXECUTANDO, PENDENTE
+
+
+def criar_sessao():
+    """Cria um banco SQLite em memória com um usuário, uma conta paga e uma meta de março"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    user = User(email="teste@erp.com", username="teste", hashed_password="x", full_name="Teste")
+    db.add(user)
+    db.commit()
+
+    db.add_all([
+        ContaPagar(user_id=user.id, descricao="Aluguel", valor=1500, data_vencimento=date(2024, 3, 10),
+                   data_pagamento=date(2024, 3, 9), categoria=CategoriaConta.MORADIA, status=StatusConta.PAGO),
+        MetaMensal(user_id=user.id, mes=3, ano=2024, meta_receita=5000, meta_despesa=2000,
+                   meta_investimento=500, meta_poupanca=1000),
+    ])
+    db.commit()
+    return db, user
+
+
+def test_gerar_meses():
+    """Testa que os resumos são recalculados e só as metas que faltam são criadas"""
+    print("🔄 Testando geração dos meses...")
+    db, user = criar_sessao()
+
+    resultado = gerar_meses(db, [user.id], 2023, 2024)
+    assert resultado["metas_criadas"] == 23
+    assert resultado["meses_com_movimento"] == 1
+    assert db.query(MetaMensal).filter_by(user_id=user.id, ano=2024, mes=3).one().meta_receita == 5000
+    assert db.query(ResumoFinanceiro).filter_by(user_id=user.id, ano=2024, mes=3).one().total_despesas == 1500
+
+    # Repetir não cria nada de novo
+    assert gerar_meses(db, [user.id], 2023, 2024)["metas_criadas"] == 0
+    assert db.query(MetaMensal).count() == 24
+    print("✅ Geração dos meses correta!")
+
+
+def test_metas_criadas_concorrentemente():
+    """Testa que uma meta criada entre a leitura e o INSERT é ignorada e não entra na contagem"""
+    print("🔄 Testando metas criadas concorrentemente...")
+    db, user = criar_sessao()
+    engine = db.get_bind()
+
+    criada = []
+
+    def criar_meta_concorrente(conexao, cursor, statement, parametros, contexto, executemany):
+        # Depois da leitura das existentes e antes do INSERT, "outra requisição" cria a meta de abril
+        if not criada and statement.lstrip().upper().startswith("INSERT INTO METAS_MENSAIS"):
+            criada.append(True)
+            conexao.connection.cursor().execute(
+                "INSERT INTO metas_mensais (user_id, mes, ano, meta_receita, meta_despesa, meta_investimento, "
+                "meta_poupanca) VALUES (?, 4, 2024, 1, 1, 1, 1)", (user.id,)
+            )
+
+    event.listen(engine, "before_cursor_execute", criar_meta_concorrente)
+    try:
+        assert _criar_metas_mensais_padrao(db, [user.id], 2024, 2024) == 10
+    finally:
+        event.remove(engine, "before_cursor_execute", criar_meta_concorrente)
+    db.commit()
+    assert db.query(MetaMensal).count() == 12
+    assert db.query(MetaMensal).filter_by(ano=2024, mes=4).one().meta_receita == 1
+    print("✅ Metas concorrentes ignoradas!")
+
+
+def test_agendar_idempotente():
+    """Testa que a mesma chave devolve a tarefa em andamento e que o resultado fica consultável"""
+    print("🔄 Testando tarefas idempotentes...")
+    liberar = threading.Event()
+
+    def esperar(db):
+        liberar.wait(5)
+        return {"ok": True}
+
+    tarefa = agendar("teste", 1, "teste:idempotente", esperar)
+    assert agendar("teste", 1, "teste:idempotente", esperar).id == tarefa.id
+    assert obter_tarefa(tarefa.id).status in (PENDENTE, EXECUTANDO)
+
+    liberar.set()
+    for _ in range(50):
+        if obter_tarefa(tarefa.id).status == CONCLUIDA:
+            break
+        time.sleep(0.05)
+    assert obter_tarefa(tarefa.id).resultado == {"ok": True}
+    assert agendar("teste", 1, "teste:idempotente", esperar).id != tarefa.id
+    print("✅ Tarefas idempotentes!")
+
+
+def main():
+    """Executa todos os testes"""
+    print("🧪 Testando tarefas em segundo plano...")
+    print("=" * 50)
+    test_gerar_meses()
+    test_metas_criadas_concorrentemente()
+    test_agendar_idempotente()
+    print("=" * 50)
+    print("🎉 Todos os testes passaram!")
+
+
+if __name__ == "__main__":
+    main()